@@ -0,0 +1,179 @@
+import os
+import json
+from typing import AsyncIterator
+import anyio
+from pydantic import ValidationError
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.models import Trace
+from app.storage import save_trace, save_traces, append_events
+from app.api.validation import check_trace, parse_events, RejectedInput
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+BULK_BATCH_LINES = int(os.getenv("BULK_BATCH_LINES", "500"))
+BULK_BATCH_BYTES = int(os.getenv("BULK_BATCH_BYTES", str(8 * 1024 * 1024)))
+BULK_MAX_LINE_BYTES = int(os.getenv("BULK_MAX_LINE_BYTES", "10000000"))
+
+
+async def _never_receive():
+    await anyio.sleep_forever()
+
+
+class BodyStreamingResponse(StreamingResponse):
+    # The request body is still being read while this response streams, so the
+    # disconnect listener must not compete with it for receive(); a client that
+    # goes away surfaces as ClientDisconnect from request.stream() instead
+    async def __call__(self, scope, receive, send):
+        await super().__call__(scope, _never_receive, send)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, bytes]]:
+    # Yields (line_number, raw line); an oversized line is yielded as None so
+    # it can be rejected without ever being held in memory
+    buffer = bytearray()
+    oversized = False
+    line_number = 0
+
+    async for chunk in chunks:
+        position = 0
+        while True:
+            newline = chunk.find(b"\n", position)
+            piece = chunk[position:] if newline == -1 else chunk[position:newline]
+            if not oversized:
+                buffer += piece
+                if len(buffer) > BULK_MAX_LINE_BYTES:
+                    oversized = True
+                    buffer.clear()
+            if newline == -1:
+                break
+
+            line_number += 1
+            yield line_number, None if oversized else bytes(buffer)
+            buffer.clear()
+            oversized = False
+            position = newline + 1
+
+    if buffer or oversized:
+        yield line_number + 1, None if oversized else bytes(buffer)
+
+
+def _parse_line(raw: bytes):
+    payload = json.loads(raw)
+    if not isinstance(payload, dict):
+        raise RejectedInput("Each line must be a JSON object")
+
+    if "repo" not in payload and "trace_id" in payload and "events" in payload:
+        events = payload["events"]
+        if not isinstance(events, list) or not events:
+            raise RejectedInput("No events provided")
+        return "events", payload["trace_id"], parse_events(events)
+
+    trace = Trace.model_validate(payload)
+    check_trace(trace)
+    return "trace", trace.trace_id, trace
+
+
+def _error(line_number: int, error: Exception) -> dict:
+    if isinstance(error, ValidationError):
+        message = f"{error.error_count()} validation error(s): {error.errors()[0]['msg']}"
+    else:
+        message = str(error)
+    return {"line": line_number, "status": "error", "error": message}
+
+
+def _store_pending(pending: list[tuple[int, Trace]], results: list[dict]) -> None:
+    if not pending:
+        return
+    try:
+        save_traces([trace for _, trace in pending])
+        stored = [(line_number, trace, None) for line_number, trace in pending]
+    except Exception as e:
+        # Retry one by one so the failure is pinned on the line that caused it
+        logger.warning(f"Batch save of {len(pending)} traces failed, retrying individually: {e}")
+        stored = []
+        for line_number, trace in pending:
+            try:
+                save_trace(trace)
+                stored.append((line_number, trace, None))
+            except Exception as trace_error:
+                stored.append((line_number, trace, trace_error))
+
+    for line_number, trace, error in stored:
+        if error is None:
+            results.append({"line": line_number, "status": "stored", "trace_id": trace.trace_id})
+        else:
+            results.append(_error(line_number, error))
+    pending.clear()
+
+
+def process_batch(lines: list[tuple[int, bytes]]) -> list[dict]:
+    results = []
+    pending = []
+    pending_ids = set()
+
+    for line_number, raw in lines:
+        if raw is None:
+            results.append(_error(line_number, RejectedInput(f"Line exceeds {BULK_MAX_LINE_BYTES} bytes")))
+            continue
+        try:
+            kind, trace_id, item = _parse_line(raw)
+        except ValueError as e:
+            results.append(_error(line_number, e))
+            continue
+
+        if kind == "trace":
+            pending.append((line_number, item))
+            if trace_id:
+                pending_ids.add(trace_id)
+            continue
+
+        # Trace saves are deferred to the end of the batch, so events for a
+        # trace created earlier in the same batch force the save out first
+        if trace_id in pending_ids:
+            _store_pending(pending, results)
+            pending_ids.clear()
+        try:
+            count = append_events(trace_id, item)
+            results.append({"line": line_number, "status": "appended", "trace_id": trace_id, "appended_events": count})
+        except FileNotFoundError:
+            results.append(_error(line_number, RejectedInput(f"Trace {trace_id} not found")))
+        except Exception as e:
+            results.append(_error(line_number, e))
+
+    _store_pending(pending, results)
+    results.sort(key=lambda result: result["line"])
+    return results
+
+
+async def ingest_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    totals = {"lines": 0, "stored": 0, "appended": 0, "errors": 0}
+    batch = []
+    batch_bytes = 0
+
+    async def flush():
+        results = await run_in_threadpool(process_batch, batch)
+        for result in results:
+            totals["lines"] += 1
+            totals["errors" if result["status"] == "error" else result["status"]] += 1
+        return b"".join(json.dumps(result).encode("utf-8") + b"\n" for result in results)
+
+    async for line_number, raw in iter_lines(chunks):
+        if raw is not None and not raw.strip():
+            continue
+        batch.append((line_number, raw))
+        batch_bytes += len(raw or b"")
+        if len(batch) >= BULK_BATCH_LINES or batch_bytes >= BULK_BATCH_BYTES:
+            yield await flush()
+            batch = []
+            batch_bytes = 0
+
+    if batch:
+        yield await flush()
+
+    logger.info(
+        f"Bulk ingest finished: {totals['stored']} traces stored, {totals['appended']} event batches appended, "
+        f"{totals['errors']} errors"
+    )
+    yield json.dumps({"summary": totals}).encode("utf-8") + b"\n"
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from app.models import Trace
-from app.storage import save_trace, load_trace, append_events
-from app.qa import run_tests_in_docker, evaluate_reasoning
+from app.storage import save_trace, load_trace, trace_exists, append_events, list_traces, read_events
+from app.storage.trace_index import InvalidCursor, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.storage.offset_index import EVENT_TYPES
+from app.qa import job_queue
 from app.utils.logger import setup_logger
 from app.utils.auth import verify_api_key
-from app.utils.security import sanitize_file_path, sanitize_command
+from app.api.validation import check_trace, parse_events, RejectedInput
+from app.api.bulk import ingest_ndjson, BodyStreamingResponse
 
 logger = setup_logger(__name__)
 router = APIRouter()
@@ -14,27 +19,77 @@ router = APIRouter()
 def create_trace(trace: Trace, authenticated: bool = Depends(verify_api_key)):
     logger.info(f"Received trace from developer {trace.developer_id} with {len(trace.events)} events")
     
-    if not sanitize_command(trace.repo.test_command):
-        logger.warning(f"Rejected trace with potentially dangerous test command: {trace.repo.test_command}")
-        raise HTTPException(
-            status_code=400,
-            detail="test_command contains potentially dangerous patterns"
-        )
-    
-    for event in trace.events:
-        if event.event_type in ["file_open", "file_close", "code_edit"]:
-            if not sanitize_file_path(event.data.file_path):
-                logger.warning(f"Rejected trace with invalid file path: {event.data.file_path}")
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Invalid file path in {event.event_type} event: {event.data.file_path}"
-                )
-    
+    try:
+        check_trace(trace)
+    except RejectedInput as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     trace_id = save_trace(trace)
     logger.info(f"Trace {trace_id} stored successfully")
     return {"trace_id": trace_id, "status": "stored"}
 
 
+@router.post("/traces:bulk")
+async def bulk_ingest(request: Request, authenticated: bool = Depends(verify_api_key)):
+    logger.info("Starting bulk NDJSON ingest")
+    return BodyStreamingResponse(ingest_ndjson(request.stream()), media_type="application/x-ndjson")
+
+
+@router.get("/traces")
+def query_traces(
+    developer_id: Optional[str] = None,
+    repo: Optional[str] = None,
+    bug_id: Optional[str] = None,
+    tests_passed: Optional[bool] = None,
+    min_score: Optional[float] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    authenticated: bool = Depends(verify_api_key)
+):
+    try:
+        page = list_traces(
+            developer_id=developer_id,
+            repo=repo,
+            bug_id=bug_id,
+            tests_passed=tests_passed,
+            min_score=min_score,
+            since=since,
+            until=until,
+            cursor=cursor,
+            limit=limit
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info(f"Listed {len(page['traces'])} traces")
+    return page
+
+
+@router.get("/traces/{trace_id}/events")
+def get_trace_events(
+    trace_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+    authenticated: bool = Depends(verify_api_key)
+):
+    if event_type is not None and event_type not in EVENT_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown event_type: {event_type}")
+
+    try:
+        page = read_events(trace_id, offset=offset, limit=limit, start=from_, end=to, event_type=event_type)
+    except FileNotFoundError:
+        logger.warning(f"Trace {trace_id} not found")
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found")
+
+    logger.info(f"Read {len(page['events'])} of {page['total']} events from trace {trace_id}")
+    return page
+
+
 @router.get("/traces/{trace_id}")
 def get_trace(trace_id: str, authenticated: bool = Depends(verify_api_key)):
     try:
@@ -55,46 +110,8 @@ def append_trace_events(trace_id: str, payload: dict, authenticated: bool = Depe
         
         logger.info(f"Appending {len(events)} events to trace {trace_id}")
         
-        from app.models import Event
-        validated_events = []
-        for event_data in events:
-            if isinstance(event_data, dict):
-                from app.models import (
-                    FileOpenEvent,
-                    FileCloseEvent,
-                    CodeEditEvent,
-                    TerminalCommandEvent,
-                    TestResultEvent,
-                    ReasoningStepEvent
-                )
-                
-                event_type = event_data.get("event_type")
-                event_map = {
-                    "file_open": FileOpenEvent,
-                    "file_close": FileCloseEvent,
-                    "code_edit": CodeEditEvent,
-                    "terminal_command": TerminalCommandEvent,
-                    "test_result": TestResultEvent,
-                    "reasoning_step": ReasoningStepEvent
-                }
-                
-                if event_type in event_map:
-                    validated_event = event_map[event_type].model_validate(event_data)
-                    
-                    if event_type in ["file_open", "file_close", "code_edit"]:
-                        if not sanitize_file_path(validated_event.data.file_path):
-                            logger.warning(f"Rejected event with invalid file path: {validated_event.data.file_path}")
-                            raise HTTPException(
-                                status_code=400,
-                                detail=f"Invalid file path in {event_type} event"
-                            )
-                    
-                    validated_events.append(validated_event)
-                else:
-                    raise HTTPException(status_code=400, detail=f"Invalid event_type: {event_type}")
-            else:
-                validated_events.append(event_data)
-        
+        validated_events = parse_events(events)
+
         count = append_events(trace_id, validated_events)
         logger.info(f"Successfully appended {count} events to trace {trace_id}")
         return {"trace_id": trace_id, "appended_events": count}
@@ -106,43 +123,21 @@ def append_trace_events(trace_id: str, payload: dict, authenticated: bool = Depe
         logger.error(f"Failed to append events to trace {trace_id}: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/traces/{trace_id}/finalize")
-def finalize_trace(trace_id: str, authenticated: bool = Depends(verify_api_key)):
-    try:
-        logger.info(f"Starting QA pipeline for trace {trace_id}")
-        trace = load_trace(trace_id)
-        
-        logger.info(f"Running Docker tests for trace {trace_id}")
-        test_results = run_tests_in_docker("sample_repo", trace.repo.test_command)
-        logger.info(f"Docker tests completed for trace {trace_id}: tests_passed={test_results['tests_passed']}")
-        
-        reasoning_steps = [
-            event.data.content 
-            for event in trace.events 
-            if event.event_type == "reasoning_step"
-        ]
-        
-        logger.info(f"Evaluating {len(reasoning_steps)} reasoning steps for trace {trace_id}")
-        reasoning_results = evaluate_reasoning(reasoning_steps)
-        logger.info(f"LLM evaluation completed for trace {trace_id}: score={reasoning_results['reasoning_score']}")
-        
-        from app.models import QAResults
-        trace.qa_results = QAResults(
-            tests_passed=test_results["tests_passed"],
-            test_exit_code=test_results["test_exit_code"],
-            test_output_snippet=test_results["test_output_snippet"],
-            reasoning_score=reasoning_results["reasoning_score"],
-            reasoning_feedback=reasoning_results["reasoning_feedback"]
-        )
-        
-        save_trace(trace)
-        logger.info(f"QA pipeline completed for trace {trace_id}")
-        
-        return trace
-        
-    except FileNotFoundError:
+@router.post("/traces/{trace_id}/finalize", status_code=202)
+def finalize_trace(trace_id: str, refresh_judge: bool = False, authenticated: bool = Depends(verify_api_key)):
+    if not trace_exists(trace_id):
         logger.error(f"Trace {trace_id} not found for finalization")
         raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found")
-    except Exception as e:
-        logger.error(f"Finalization failed for trace {trace_id}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Finalization failed: {str(e)}")
\ No newline at end of file
+
+    # refresh_judge re-scores the reasoning instead of reusing a cached verdict
+    job = job_queue.submit(trace_id, refresh_judge)
+    logger.info(f"Finalization of trace {trace_id} accepted as job {job.job_id}")
+    return {"job_id": job.job_id, "trace_id": trace_id, "status": job.status, "estimated_cost": job.estimated_cost}
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, authenticated: bool = Depends(verify_api_key)):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
@@ -0,0 +1,59 @@
+from app.models import (
+    Trace,
+    FileOpenEvent,
+    FileCloseEvent,
+    CodeEditEvent,
+    TerminalCommandEvent,
+    TestResultEvent,
+    ReasoningStepEvent
+)
+from app.utils.logger import setup_logger
+from app.utils.security import sanitize_file_path, sanitize_command
+
+logger = setup_logger(__name__)
+
+EVENT_MODELS = {
+    "file_open": FileOpenEvent,
+    "file_close": FileCloseEvent,
+    "code_edit": CodeEditEvent,
+    "terminal_command": TerminalCommandEvent,
+    "test_result": TestResultEvent,
+    "reasoning_step": ReasoningStepEvent
+}
+
+FILE_EVENT_TYPES = ["file_open", "file_close", "code_edit"]
+
+
+class RejectedInput(ValueError):
+    pass
+
+
+def check_trace(trace: Trace) -> None:
+    if not sanitize_command(trace.repo.test_command):
+        logger.warning(f"Rejected trace with potentially dangerous test command: {trace.repo.test_command}")
+        raise RejectedInput("test_command contains potentially dangerous patterns")
+
+    for event in trace.events:
+        if event.event_type in FILE_EVENT_TYPES and not sanitize_file_path(event.data.file_path):
+            logger.warning(f"Rejected trace with invalid file path: {event.data.file_path}")
+            raise RejectedInput(f"Invalid file path in {event.event_type} event: {event.data.file_path}")
+
+
+def parse_events(events: list) -> list:
+    validated_events = []
+    for event_data in events:
+        if not isinstance(event_data, dict):
+            validated_events.append(event_data)
+            continue
+
+        event_type = event_data.get("event_type")
+        if event_type not in EVENT_MODELS:
+            raise RejectedInput(f"Invalid event_type: {event_type}")
+
+        validated_event = EVENT_MODELS[event_type].model_validate(event_data)
+        if event_type in FILE_EVENT_TYPES and not sanitize_file_path(validated_event.data.file_path):
+            logger.warning(f"Rejected event with invalid file path: {validated_event.data.file_path}")
+            raise RejectedInput(f"Invalid file path in {event_type} event")
+
+        validated_events.append(validated_event)
+    return validated_events
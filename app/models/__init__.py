@@ -1,5 +1,6 @@
 from .trace import Trace, RepoInfo
-from .qa_results import QAResults
+from .qa_results import QAResults, TestCaseResult, SandboxUsage, JudgeUsage
+from .job import QAJob
 from .events import (
     Event,
     FileOpenEvent,
@@ -23,4 +24,8 @@ __all__ = [
     "ReasoningStepEvent",
     "ReasoningStepEventData",  
     "QAResults",
+    "TestCaseResult",
+    "SandboxUsage",
+    "JudgeUsage",
+    "QAJob",
 ]
\ No newline at end of file
@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import Optional, Literal
+from pydantic import BaseModel
+
+
+class QAJob(BaseModel):
+    job_id: str
+    trace_id: str
+    status: Literal["queued", "running", "completed", "failed"] = "queued"
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    refresh_judge: bool = False
+    # Expected test run usage from the repo's cost profile at submission
+    estimated_cost: Optional[dict[str, int]] = None
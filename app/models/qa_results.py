@@ -1,13 +1,51 @@
-from typing import Optional
+from typing import Literal, Optional
 from pydantic import BaseModel, Field
 
 
+class TestCaseResult(BaseModel):
+    classname: str
+    name: str
+    outcome: Literal["passed", "failed", "error", "skipped"]
+    duration_ms: int = 0
+    message: Optional[str] = None
+
+
+class SandboxUsage(BaseModel):
+    wall_ms: int
+    cpu_ms: Optional[int] = None
+    peak_memory_bytes: Optional[int] = None
+    io_read_bytes: Optional[int] = None
+    io_write_bytes: Optional[int] = None
+
+
+class JudgeUsage(BaseModel):
+    mode: Literal["single", "map_reduce", "batch"]
+    windows: int = 1
+    calls: int = 0
+    tokens: int = 0
+    wall_ms: int = 0
+
+
 class QAResults(BaseModel):
     tests_passed: Optional[bool] = None
     test_exit_code: Optional[int] = None
     test_output_snippet: Optional[str] = None
+    test_status: Optional[Literal["passed", "failed", "timeout", "error"]] = None
+    tests_cached: Optional[bool] = None
+    test_shards: Optional[int] = None
+    test_failures: list[str] = []
+    test_cases: list[TestCaseResult] = []
+    test_usage: Optional[SandboxUsage] = None
+    test_scope: Optional[Literal["full", "impacted"]] = None
+    impacted_test_files: list[str] = []
+    impacted_tests_passed: Optional[bool] = None
+    impacted_test_status: Optional[Literal["passed", "failed", "timeout", "error"]] = None
     reasoning_score: Optional[float] = Field(None, ge=1.0, le=5.0)
     reasoning_feedback: Optional[str] = None
+    reasoning_cached: Optional[bool] = None
+    reasoning_usage: Optional[JudgeUsage] = None
+    stage_timings_ms: dict[str, int] = {}
+    stage_errors: dict[str, str] = {}
 
     class Config:
         json_schema_extra = {
@@ -15,7 +53,11 @@ class QAResults(BaseModel):
                 "tests_passed": True,
                 "test_exit_code": 0,
                 "test_output_snippet": "All tests passed.",
+                "test_status": "passed",
+                "tests_cached": False,
                 "reasoning_score": 4.5,
-                "reasoning_feedback": "Clear and methodical reasoning."
+                "reasoning_feedback": "Clear and methodical reasoning.",
+                "stage_timings_ms": {"tests": 8120, "reasoning_steps": 0, "judge": 2410},
+                "stage_errors": {}
             }
         }
\ No newline at end of file
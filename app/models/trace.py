@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Literal
 from pydantic import BaseModel, Field
 from .events import Event
 from .qa_results import QAResults
@@ -36,6 +36,7 @@ class Trace(BaseModel):
     end_time: Optional[datetime] = None
     events: list[Event] = []
     qa_results: Optional[QAResults] = None
+    qa_status: Optional[Literal["queued", "running", "completed", "failed"]] = None
 
     class Config:
         json_schema_extra = {
@@ -55,6 +56,7 @@ class Trace(BaseModel):
                 "start_time": "2025-11-27T15:00:00Z",
                 "end_time": "2025-11-27T15:30:00Z",
                 "events": [],
-                "qa_results": None
+                "qa_results": None,
+                "qa_status": None
             }
         }
\ No newline at end of file
@@ -1,4 +1,6 @@
 from .test_runner import run_tests_in_docker
 from .llm_judge import evaluate_reasoning
+from .pipeline import run_qa_pipeline
+from .jobs import job_queue
 
-__all__ = ["run_tests_in_docker", "evaluate_reasoning"]
\ No newline at end of file
+__all__ = ["run_tests_in_docker", "evaluate_reasoning", "run_qa_pipeline", "job_queue"]
\ No newline at end of file
@@ -0,0 +1,334 @@
+import os
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+from uuid import uuid4
+from app.models import JudgeUsage, QAResults
+from app.storage import list_traces, load_trace, update_qa_state
+from app.storage.durability import FSYNC_ENABLED, atomic_write
+from app.storage.locks import trace_lock
+from app.utils.logger import setup_logger
+from .judge_cache import JUDGE_CACHE_ENABLED
+from .judge_client import JUDGE_CONCURRENCY, estimate_tokens
+from .llm_judge import JUDGE_MODEL, batch_request, completion_verdict, judge_cache, judge_client, reasoning_key
+from .pipeline import reasoning_steps
+
+logger = setup_logger(__name__)
+
+BATCH_DIR = Path(os.getenv("QA_BATCH_DIR", "data/judge_batches"))
+# Provider limits per input file
+BATCH_MAX_REQUESTS = int(os.getenv("QA_BATCH_MAX_REQUESTS", "50000"))
+BATCH_MAX_BYTES = int(os.getenv("QA_BATCH_MAX_BYTES", str(100 * 1024 * 1024)))
+BATCH_WORKERS = int(os.getenv("QA_BATCH_WORKERS", str(os.cpu_count() or 1)))
+BATCH_PAGE_SIZE = 500
+# Verdicts written back per worker task
+BATCH_APPLY_CHUNK = 100
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+STATE_FILE = "state.json"
+APPLIED_FILE = "applied.jsonl"
+SKIP_REASONS = ("no_reasoning", "too_long", "error")
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    # spawn, not fork: children must not inherit the parent's sqlite
+    # connections, trace lock descriptor or judge client loop thread
+    return ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"))
+
+
+def _load_state(run_dir: Path) -> dict:
+    try:
+        return json.loads((run_dir / STATE_FILE).read_text())
+    except FileNotFoundError:
+        raise FileNotFoundError(f"No batch run in {run_dir}")
+
+
+def _save_state(run_dir: Path, state: dict) -> None:
+    with atomic_write(run_dir / STATE_FILE, lambda path: open(path, "w")) as f:
+        json.dump(state, f, indent=2)
+
+
+def _results_name(requests_name: str) -> str:
+    return requests_name.replace("requests-", "results-", 1)
+
+
+def create_run(run_id: Optional[str] = None) -> Path:
+    # An existing run is returned as is, so a repeated command resumes it
+    run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    run_dir = BATCH_DIR / run_id
+    if (run_dir / STATE_FILE).exists():
+        return run_dir
+    run_dir.mkdir(parents=True, exist_ok=True)
+    _save_state(run_dir, {
+        "run_id": run_id,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "model": JUDGE_MODEL,
+        "prepare": {
+            "cursor": None,
+            "done": False,
+            "requests": 0,
+            "files": [],
+            "skipped": {reason: 0 for reason in SKIP_REASONS},
+        },
+    })
+    return run_dir
+
+
+def _extract_request(trace_id: str) -> tuple[str, Optional[dict]]:
+    # Runs in a pool worker: (status, request line). Reasoning steps are
+    # never externalized, so the corpus scan reads no blobs
+    try:
+        steps = reasoning_steps(load_trace(trace_id, resolve_blobs=False))
+        if not steps:
+            return "no_reasoning", None
+        request = batch_request(steps)
+        if request is None:
+            return "too_long", None
+    except Exception as e:
+        logger.error(f"Could not extract reasoning from trace {trace_id}: {e}")
+        return "error", None
+    body, key = request
+    # The key prefix lets ingest notice reasoning that changed in between
+    return "ok", {"custom_id": f"{trace_id}:{key[:16]}", "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+
+def _append_requests(run_dir: Path, progress: dict, lines: list[dict]) -> None:
+    pending = {}
+    for line in lines:
+        data = (json.dumps(line) + "\n").encode("utf-8")
+        current = progress["files"][-1] if progress["files"] else None
+        if current is None or current["requests"] >= BATCH_MAX_REQUESTS or current["bytes"] + len(data) > BATCH_MAX_BYTES:
+            current = {"name": f"requests-{len(progress['files']):04d}.jsonl", "requests": 0, "bytes": 0}
+            progress["files"].append(current)
+        pending.setdefault(current["name"], []).append(data)
+        current["requests"] += 1
+        current["bytes"] += len(data)
+        progress["requests"] += 1
+    for name, chunks in pending.items():
+        with open(run_dir / name, "ab") as f:
+            f.writelines(chunks)
+            f.flush()
+            if FSYNC_ENABLED:
+                os.fsync(f.fileno())
+
+
+def _rewind(run_dir: Path, progress: dict) -> None:
+    # Lines written after the last checkpoint belong to a page that is
+    # extracted again, so they are cut off rather than duplicated
+    sizes = {entry["name"]: entry["bytes"] for entry in progress["files"]}
+    for path in run_dir.glob("requests-*.jsonl"):
+        if path.name not in sizes:
+            path.unlink()
+        elif path.stat().st_size != sizes[path.name]:
+            with open(path, "r+b") as f:
+                f.truncate(sizes[path.name])
+
+
+def prepare_batch(run_dir: Path, workers: Optional[int] = None) -> dict:
+    # Pages through every stored trace and writes one request per trace with
+    # reasoning; checkpoints after each page
+    state = _load_state(run_dir)
+    progress = state["prepare"]
+    if progress["done"]:
+        return progress
+    _rewind(run_dir, progress)
+
+    with _pool(workers or BATCH_WORKERS) as pool:
+        while True:
+            page = list_traces(cursor=progress["cursor"], limit=BATCH_PAGE_SIZE)
+            trace_ids = [summary["trace_id"] for summary in page["traces"]]
+            lines = []
+            for status, line in pool.map(_extract_request, trace_ids, chunksize=16):
+                if status == "ok":
+                    lines.append(line)
+                else:
+                    progress["skipped"][status] += 1
+            _append_requests(run_dir, progress, lines)
+            progress["cursor"] = page["next_cursor"]
+            progress["done"] = page["next_cursor"] is None
+            _save_state(run_dir, state)
+            if progress["done"]:
+                break
+
+    logger.info(f"Prepared batch {state['run_id']}: {progress['requests']} requests in {len(progress['files'])} files, skipped {progress['skipped']}")
+    return progress
+
+
+def _local_complete(body: dict) -> tuple[str, int]:
+    prompt = "".join(message["content"] for message in body["messages"])
+    return judge_client.complete(body, estimate_tokens(prompt))
+
+
+def _answer(line: dict, complete: Callable[[dict], tuple[str, int]]) -> dict:
+    result = {"id": f"batch_req_{uuid4().hex}", "custom_id": line["custom_id"], "response": None, "error": None}
+    try:
+        content, tokens = complete(line["body"])
+    except Exception as e:
+        result["error"] = {"code": e.__class__.__name__, "message": str(e)}
+        return result
+    result["response"] = {
+        "status_code": 200,
+        "request_id": uuid4().hex,
+        "body": {
+            "object": "chat.completion",
+            "model": line["body"]["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"total_tokens": tokens},
+        },
+    }
+    return result
+
+
+def run_local(run_dir: Path, complete: Optional[Callable[[dict], tuple[str, int]]] = None) -> int:
+    # Stand-in for the provider's batch endpoint: answers each request file
+    # through the judge client and writes its results file in the provider's
+    # output format. Existing results files are left alone, so an
+    # interrupted run only redoes the file it was working on
+    state = _load_state(run_dir)
+    if not state["prepare"]["done"]:
+        raise ValueError(f"Batch {state['run_id']} is not fully prepared")
+    complete = complete or _local_complete
+    written = 0
+    for entry in state["prepare"]["files"]:
+        results_path = run_dir / _results_name(entry["name"])
+        if results_path.exists():
+            continue
+        with open(run_dir / entry["name"]) as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        with ThreadPoolExecutor(max_workers=JUDGE_CONCURRENCY) as executor:
+            results = list(executor.map(lambda line: _answer(line, complete), lines))
+        with atomic_write(results_path, lambda path: open(path, "w")) as f:
+            f.writelines(json.dumps(result) + "\n" for result in results)
+        logger.info(f"Answered {len(results)} requests of {entry['name']} locally")
+        written += 1
+    return written
+
+
+def _parse_result(record: dict) -> tuple[Optional[dict], int, Optional[str]]:
+    # (verdict, tokens, error) from one line of a results file
+    response = record.get("response")
+    if record.get("error") or not response or response.get("status_code") != 200:
+        return None, 0, json.dumps(record.get("error") or response)
+    try:
+        verdict = completion_verdict(response["body"])
+    except Exception as e:
+        return None, 0, f"unparseable verdict: {e}"
+    tokens = response["body"].get("usage", {}).get("total_tokens")
+    return verdict, tokens if isinstance(tokens, int) else 0, None
+
+
+def _apply_verdict(trace_id: str, key_prefix: str, verdict: dict, tokens: int) -> str:
+    with trace_lock(trace_id):
+        try:
+            trace = load_trace(trace_id, resolve_blobs=False)
+        except FileNotFoundError:
+            return "stale"
+        key = reasoning_key(reasoning_steps(trace))
+        # The reasoning, prompt or model changed since the request was written
+        if not key.startswith(key_prefix):
+            return "stale"
+        usage = JudgeUsage(mode="batch", calls=1, tokens=tokens)
+        # Built through validation so an out-of-range score is rejected
+        qa_results = QAResults(**{
+            **(trace.qa_results or QAResults()).model_dump(),
+            "reasoning_score": verdict["reasoning_score"],
+            "reasoning_feedback": verdict["reasoning_feedback"],
+            "reasoning_cached": False,
+            "reasoning_usage": usage.model_dump(),
+        })
+        update_qa_state(trace_id, trace.qa_status, qa_results)
+    if JUDGE_CACHE_ENABLED:
+        judge_cache.put(key, {**verdict, "reasoning_usage": usage.model_dump()})
+    return "applied"
+
+
+def _apply(items: list[tuple[str, dict, int]]) -> list[tuple[str, str]]:
+    # Runs in a pool worker: [(custom_id, status)]
+    statuses = []
+    for custom_id, verdict, tokens in items:
+        trace_id, _, key_prefix = custom_id.rpartition(":")
+        try:
+            statuses.append((custom_id, _apply_verdict(trace_id, key_prefix, verdict, tokens)))
+        except Exception as e:
+            logger.error(f"Could not apply batch verdict to trace {trace_id}: {e}")
+            statuses.append((custom_id, "failed"))
+    return statuses
+
+
+def _applied(run_dir: Path) -> set[str]:
+    done = set()
+    try:
+        with open(run_dir / APPLIED_FILE) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line after a crash; that chunk is applied again
+                    continue
+                done.add(record["custom_id"])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def _record(run_dir: Path, statuses: list[tuple[str, str]]) -> None:
+    with open(run_dir / APPLIED_FILE, "a") as f:
+        f.writelines(json.dumps({"custom_id": custom_id, "status": status}) + "\n" for custom_id, status in statuses)
+        f.flush()
+        if FSYNC_ENABLED:
+            os.fsync(f.fileno())
+
+
+def ingest_batch(run_dir: Path, workers: Optional[int] = None) -> dict:
+    # Writes every verdict in the run's results files back to its trace.
+    # Applied and stale results are recorded and skipped next time; failed
+    # ones are retried if a later results file answers them
+    _load_state(run_dir)
+    done = _applied(run_dir)
+    counts = {"applied": 0, "stale": 0, "failed": 0, "skipped": 0}
+    items = []
+    for path in sorted(run_dir.glob("results-*.jsonl")):
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record["custom_id"] in done:
+                    counts["skipped"] += 1
+                    continue
+                verdict, tokens, error = _parse_result(record)
+                if verdict is None:
+                    logger.warning(f"Batch request {record['custom_id']} failed: {error}")
+                    counts["failed"] += 1
+                    continue
+                done.add(record["custom_id"])
+                items.append((record["custom_id"], verdict, tokens))
+
+    chunks = [items[i:i + BATCH_APPLY_CHUNK] for i in range(0, len(items), BATCH_APPLY_CHUNK)]
+    if chunks:
+        with _pool(min(workers or BATCH_WORKERS, len(chunks))) as pool:
+            for statuses in pool.map(_apply, chunks):
+                _record(run_dir, [(custom_id, status) for custom_id, status in statuses if status != "failed"])
+                for _, status in statuses:
+                    counts[status] += 1
+
+    logger.info(f"Ingested batch {run_dir.name}: {counts}")
+    return counts
+
+
+def batch_status(run_dir: Path) -> dict:
+    state = _load_state(run_dir)
+    files = state["prepare"]["files"]
+    return {
+        "run_id": state["run_id"],
+        "model": state["model"],
+        "prepared": state["prepare"]["done"],
+        "requests": state["prepare"]["requests"],
+        "skipped": state["prepare"]["skipped"],
+        "request_files": len(files),
+        "results_files": sum((run_dir / _results_name(entry["name"])).exists() for entry in files),
+        "ingested": len(_applied(run_dir)),
+    }
@@ -0,0 +1,247 @@
+import io
+import os
+import math
+import time
+import shlex
+import socket
+import tarfile
+import threading
+from pathlib import Path
+from uuid import uuid4
+from typing import Optional
+from app.utils.logger import setup_logger
+from .runners import SandboxTimeout
+from .output_capture import BoundedOutput
+from .junit import REPORT_FILE, REPORT_MAX_BYTES
+from .resource_usage import USAGE_FILE, ResourceUsage, with_usage_snapshots
+
+logger = setup_logger(__name__)
+
+SANDBOX_IMAGE = os.getenv("QA_SANDBOX_IMAGE", "python:3.11-slim")
+SANDBOX_LABEL = "pr-telemetry.sandbox"
+OWNER_LABEL = "pr-telemetry.owner"
+CONTAINER_POOL_SIZE = int(os.getenv("QA_CONTAINER_POOL_SIZE", "2"))
+CONTAINER_MAX_USES = int(os.getenv("QA_CONTAINER_MAX_USES", "20"))
+WORKDIR_TMPFS = os.getenv("QA_WORKDIR_TMPFS", "size=512m")
+
+SANDBOX_MEMORY = os.getenv("QA_SANDBOX_MEMORY", "2g")
+SANDBOX_CPUS = float(os.getenv("QA_SANDBOX_CPUS", "2"))
+SANDBOX_PIDS_LIMIT = int(os.getenv("QA_SANDBOX_PIDS_LIMIT", "512"))
+# Containers older than this are considered orphaned by the reaper; the pool
+# retires its own idle containers at half this age so they are never reaped
+SANDBOX_MAX_AGE_SECONDS = float(os.getenv("QA_SANDBOX_MAX_AGE_SECONDS", "3600"))
+TIMEOUT_KILL_GRACE_SECONDS = 10
+
+# Identifies containers started by this process, so the reaper can tell
+# leaked containers of its own from those of other live API processes
+INSTANCE_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:8]}"
+
+REPORT_PATH = f"/tmp/{REPORT_FILE}"
+USAGE_PATH = f"/tmp/{USAGE_FILE}"
+
+# Clears the previous report and the tmpfs workdir (including dotfiles) and
+# copies the read-only repo in
+RESET_COMMAND = f"rm -f {REPORT_PATH} && find /work -mindepth 1 -delete && cp -a /repo/. /work/"
+
+
+def sandbox_limits() -> dict:
+    return {
+        "mem_limit": SANDBOX_MEMORY,
+        "memswap_limit": SANDBOX_MEMORY,
+        "nano_cpus": int(SANDBOX_CPUS * 1e9),
+        "pids_limit": SANDBOX_PIDS_LIMIT,
+        "labels": {SANDBOX_LABEL: "1", OWNER_LABEL: INSTANCE_ID},
+    }
+
+
+def read_report(container, path: str = REPORT_PATH) -> Optional[bytes]:
+    # Works on running and exited containers; a missing file means the
+    # command wrote no report
+    try:
+        stream, stat = container.get_archive(path)
+    except Exception:
+        return None
+    if stat.get("size", 0) > REPORT_MAX_BYTES:
+        return None
+    with tarfile.open(fileobj=io.BytesIO(b"".join(stream))) as tar:
+        member = tar.next()
+        return tar.extractfile(member).read() if member is not None else None
+
+
+def read_usage(container) -> Optional[str]:
+    usage = read_report(container, USAGE_PATH)
+    return usage.decode("utf-8", "replace") if usage is not None else None
+
+
+def with_deadline(command: str, timeout: float) -> str:
+    # GNU timeout exits 124 when it had to stop the command
+    return f"timeout -k 5 {math.ceil(timeout)} sh -c {shlex.quote(command)}"
+
+
+class PooledContainer:
+    def __init__(self, container, key: tuple):
+        self.container = container
+        self.key = key
+        self.uses = 0
+        self.started_at = time.monotonic()
+
+
+class ContainerPool:
+    def __init__(self, client_factory, size: int = CONTAINER_POOL_SIZE, max_uses: int = CONTAINER_MAX_USES):
+        self._client_factory = client_factory
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = {}
+        self._in_use = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.recycled = 0
+        self.timeouts = 0
+
+    def _start(self, repo_path: Path, image: str, network: bool = True) -> PooledContainer:
+        container = self._client_factory().containers.run(
+            image=image,
+            command=["sleep", "infinity"],
+            volumes={str(repo_path): {"bind": "/repo", "mode": "ro"}},
+            tmpfs={"/work": WORKDIR_TMPFS},
+            working_dir="/work",
+            network_disabled=not network,
+            detach=True,
+            **sandbox_limits(),
+        )
+        self.started += 1
+        logger.info(f"Started sandbox container {container.short_id} for {repo_path}")
+        return PooledContainer(container, (str(repo_path), image, network))
+
+    def _discard(self, pooled: PooledContainer) -> None:
+        self.recycled += 1
+        try:
+            pooled.container.remove(force=True)
+        except Exception as e:
+            logger.warning(f"Failed to remove sandbox container {pooled.container.short_id}: {e}")
+
+    def _expired(self, pooled: PooledContainer) -> bool:
+        return time.monotonic() - pooled.started_at > SANDBOX_MAX_AGE_SECONDS / 2
+
+    def acquire(self, repo_path: Path, image: str = SANDBOX_IMAGE, network: bool = True) -> PooledContainer:
+        key = (str(repo_path), image, network)
+        stale = []
+        with self._lock:
+            idle = self._idle.get(key, [])
+            pooled = idle.pop() if idle else None
+            while pooled is not None and self._expired(pooled):
+                stale.append(pooled)
+                pooled = idle.pop() if idle else None
+        for container in stale:
+            self._discard(container)
+        if pooled is None:
+            pooled = self._start(repo_path, image, network)
+        with self._lock:
+            self._in_use[pooled.container.id] = pooled
+        return pooled
+
+    def release(self, pooled: PooledContainer, healthy: bool = True) -> None:
+        pooled.uses += 1
+        with self._lock:
+            self._in_use.pop(pooled.container.id, None)
+        if healthy and pooled.uses < self.max_uses and not self._expired(pooled):
+            with self._lock:
+                idle = self._idle.setdefault(pooled.key, [])
+                if len(idle) < self.size:
+                    idle.append(pooled)
+                    return
+        self._discard(pooled)
+
+    def _exec(self, pooled: PooledContainer, command: str, output: BoundedOutput) -> int:
+        # Streams the output through the bounded buffer instead of holding
+        # all of it the way exec_run does
+        api = self._client_factory().api
+        exec_id = api.exec_create(pooled.container.id, ["sh", "-c", command], workdir="/work")["Id"]
+        for chunk in api.exec_start(exec_id, stream=True):
+            output.feed(chunk)
+        return api.exec_inspect(exec_id)["ExitCode"]
+
+    def run(
+        self,
+        repo_path: Path,
+        command: str,
+        image: str = SANDBOX_IMAGE,
+        network: bool = True,
+        timeout: Optional[float] = None,
+        usage: Optional[ResourceUsage] = None,
+    ) -> tuple[int, str, Optional[bytes]]:
+        # Returns (exit code, bounded output, JUnit report if one was written)
+        pooled = self.acquire(repo_path, image, network)
+        output = BoundedOutput()
+        healthy = False
+        timer = None
+        expired = threading.Event()
+        try:
+            reset_code, reset_output = pooled.container.exec_run(["sh", "-c", RESET_COMMAND])
+            if reset_code != 0:
+                raise RuntimeError(f"Sandbox reset failed: {reset_output.decode('utf-8', 'replace')}")
+
+            if usage is not None:
+                command = with_usage_snapshots(command, USAGE_PATH)
+            if timeout is not None:
+                command = with_deadline(command, timeout)
+
+                # An exec has no timeout of its own; if the in-container
+                # deadline does not end the exec, killing the container does
+                def kill():
+                    expired.set()
+                    pooled.container.kill()
+
+                timer = threading.Timer(timeout + TIMEOUT_KILL_GRACE_SECONDS, kill)
+                timer.daemon = True
+                timer.start()
+
+            exit_code = self._exec(pooled, command, output)
+            if timeout is not None and (expired.is_set() or exit_code == 124):
+                self.timeouts += 1
+                raise SandboxTimeout(timeout, output.text())
+            report = read_report(pooled.container)
+            if usage is not None:
+                usage.add_cgroup(read_usage(pooled.container))
+            healthy = True
+            return exit_code, output.text(), report
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self.release(pooled, healthy)
+
+    def prewarm(self, repo_path: Path, image: str = SANDBOX_IMAGE, network: bool = True) -> int:
+        key = (str(repo_path), image, network)
+        started = 0
+        while True:
+            with self._lock:
+                if len(self._idle.get(key, [])) >= self.size:
+                    return started
+            pooled = self._start(repo_path, image, network)
+            with self._lock:
+                self._idle.setdefault(key, []).append(pooled)
+            started += 1
+
+    def live_ids(self) -> set:
+        with self._lock:
+            idle = {pooled.container.id for containers in self._idle.values() for pooled in containers}
+            return idle | set(self._in_use)
+
+    def close(self) -> None:
+        with self._lock:
+            idle = [pooled for containers in self._idle.values() for pooled in containers]
+            self._idle.clear()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = sum(len(containers) for containers in self._idle.values())
+            in_use = len(self._in_use)
+        return {
+            "idle": idle,
+            "in_use": in_use,
+            "started": self.started,
+            "recycled": self.recycled,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,171 @@
+import io
+import os
+import json
+import time
+import tarfile
+import hashlib
+import threading
+import docker
+from pathlib import Path
+from typing import Optional
+from app.storage.durability import atomic_write
+from app.utils.logger import setup_logger
+from .container_pool import SANDBOX_IMAGE, SANDBOX_LABEL
+
+logger = setup_logger(__name__)
+
+IMAGE_CACHE_ENABLED = os.getenv("QA_IMAGE_CACHE", "1") == "1"
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("QA_IMAGE_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))
+IMAGE_CACHE_INDEX = Path(os.getenv("QA_IMAGE_CACHE_INDEX", "data/qa/image_cache.json"))
+IMAGE_REPOSITORY = "pr-telemetry-deps"
+
+REQUIREMENTS_PATTERNS = ["requirements*.txt"]
+
+DOCKERFILE_TEMPLATE = """FROM {base_image}
+COPY deps/ /deps/
+RUN {install}
+"""
+
+
+class ImageCache:
+    def __init__(self, client_factory, base_image: str = SANDBOX_IMAGE, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self._client_factory = client_factory
+        self.base_image = base_image
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._building = {}
+        self.builds = 0
+        self.hits = 0
+
+    def requirements_files(self, repo_path: Path) -> list[Path]:
+        files = set()
+        for pattern in REQUIREMENTS_PATTERNS:
+            files.update(path for path in repo_path.glob(pattern) if path.is_file())
+        return sorted(files)
+
+    def image_tag(self, repo_path: Path) -> Optional[str]:
+        # The base image pins the Python version, so it is part of the key
+        files = self.requirements_files(repo_path)
+        if not files:
+            return None
+        digest = hashlib.sha256(self.base_image.encode("utf-8"))
+        for path in files:
+            digest.update(b"\0" + path.name.encode("utf-8") + b"\0" + path.read_bytes())
+        return f"{IMAGE_REPOSITORY}:{digest.hexdigest()[:16]}"
+
+    def _load_index(self) -> dict:
+        try:
+            return json.loads(IMAGE_CACHE_INDEX.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self, index: dict) -> None:
+        IMAGE_CACHE_INDEX.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(IMAGE_CACHE_INDEX, lambda path: open(path, "w")) as f:
+            json.dump(index, f)
+
+    def _touch(self, tag: str, size: int) -> None:
+        with self._lock:
+            index = self._load_index()
+            index[tag] = {"last_used": time.time(), "size": size}
+            self._save_index(index)
+
+    def _build_context(self, files: list[Path]) -> io.BytesIO:
+        install = " && ".join(f"pip install --no-cache-dir -r /deps/{path.name}" for path in files)
+        dockerfile = DOCKERFILE_TEMPLATE.format(base_image=self.base_image, install=install).encode("utf-8")
+
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for name, content in [("Dockerfile", dockerfile)] + [(f"deps/{p.name}", p.read_bytes()) for p in files]:
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+        buffer.seek(0)
+        return buffer
+
+    def _build(self, tag: str, files: list[Path]) -> int:
+        started = time.perf_counter()
+        image, _ = self._client_factory().images.build(
+            fileobj=self._build_context(files),
+            custom_context=True,
+            tag=tag,
+            labels={SANDBOX_LABEL: "deps"},
+            rm=True,
+        )
+        self.builds += 1
+        logger.info(f"Built dependency image {tag} in {time.perf_counter() - started:.1f}s")
+        return image.attrs.get("Size", 0)
+
+    def ensure_image(self, repo_path: Path) -> Optional[str]:
+        tag = self.image_tag(repo_path)
+        if tag is None:
+            return None
+
+        client = self._client_factory()
+        try:
+            image = client.images.get(tag)
+            self.hits += 1
+            self._touch(tag, image.attrs.get("Size", 0))
+            return tag
+        except docker.errors.ImageNotFound:
+            pass
+
+        # Concurrent finalizes for the same requirements wait for one build
+        with self._lock:
+            event = self._building.get(tag)
+            leader = event is None
+            if leader:
+                event = self._building[tag] = threading.Event()
+
+        if not leader:
+            event.wait()
+            client.images.get(tag)
+            return tag
+
+        try:
+            size = self._build(tag, self.requirements_files(repo_path))
+            self._touch(tag, size)
+        finally:
+            with self._lock:
+                del self._building[tag]
+            event.set()
+
+        self.evict()
+        return tag
+
+    def evict(self) -> list[str]:
+        with self._lock:
+            index = self._load_index()
+        total = sum(entry["size"] for entry in index.values())
+        removed = []
+        for tag, entry in sorted(index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                self._client_factory().images.remove(tag)
+            except Exception as e:
+                # Images still used by a running sandbox cannot be removed yet
+                logger.warning(f"Could not evict dependency image {tag}: {e}")
+                continue
+            total -= entry["size"]
+            removed.append(tag)
+
+        if removed:
+            with self._lock:
+                index = self._load_index()
+                for tag in removed:
+                    index.pop(tag, None)
+                self._save_index(index)
+            logger.info(f"Evicted {len(removed)} dependency images to stay under {self.max_bytes} bytes")
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            index = self._load_index()
+        return {
+            "images": len(index),
+            "bytes": sum(entry["size"] for entry in index.values()),
+            "max_bytes": self.max_bytes,
+            "builds": self.builds,
+            "hits": self.hits,
+        }
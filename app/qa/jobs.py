@@ -0,0 +1,177 @@
+import os
+import time
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from uuid import UUID, uuid4
+from concurrent.futures import ThreadPoolExecutor
+from app.models import QAJob
+from app.storage import update_qa_state
+from app.storage.durability import atomic_write
+from app.utils.logger import setup_logger
+from . import pipeline
+
+logger = setup_logger(__name__)
+
+JOBS_DIR = Path(os.getenv("QA_JOBS_DIR", "data/jobs"))
+QA_WORKERS = int(os.getenv("QA_WORKERS", "4"))
+# Finished jobs stay readable through GET /jobs for this long
+JOB_RETENTION_SECONDS = float(os.getenv("QA_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+PRUNE_INTERVAL_SECONDS = 3600
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _finished_dir() -> Path:
+    return JOBS_DIR / "finished"
+
+
+class JobQueue:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._active = {}
+        self._pruned_at = None
+
+    def _path(self, job_id: str, finished: bool = False) -> Path:
+        # Only unfinished jobs live directly in JOBS_DIR, so recover() never
+        # scans the finished ones
+        return (_finished_dir() if finished else JOBS_DIR) / f"{job_id}.json"
+
+    def _save(self, job: QAJob, finished: bool = False) -> None:
+        path = self._path(job.job_id, finished)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path, lambda tmp: open(tmp, "w")) as f:
+            f.write(job.model_dump_json())
+
+    def _archive(self, job: QAJob) -> None:
+        # Written before the unfinished file goes away, so get() always
+        # finds one of the two
+        self._save(job, finished=True)
+        self._path(job.job_id).unlink(missing_ok=True)
+        if self._pruned_at is None or time.monotonic() - self._pruned_at >= PRUNE_INTERVAL_SECONDS:
+            self.prune()
+
+    def prune(self) -> int:
+        self._pruned_at = time.monotonic()
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        removed = 0
+        for path in _finished_dir().glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        if removed:
+            logger.info(f"Removed {removed} finished QA jobs older than {JOB_RETENTION_SECONDS:.0f}s")
+        return removed
+
+    def get(self, job_id: str) -> Optional[QAJob]:
+        try:
+            UUID(job_id)
+        except ValueError:
+            return None
+        for finished in (False, True):
+            try:
+                return QAJob.model_validate_json(self._path(job_id, finished).read_text())
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _enqueue(self, job: QAJob) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qa-worker")
+            self._active[job.trace_id] = job.job_id
+        self._executor.submit(self._run, job.job_id)
+
+    def submit(self, trace_id: str, refresh_judge: bool = False) -> QAJob:
+        # A trace with a job already waiting or running gets that job back
+        with self._lock:
+            active_id = self._active.get(trace_id)
+            active = self.get(active_id) if active_id is not None else None
+            if active is not None and active.status in ACTIVE_STATUSES:
+                return active
+
+            job = QAJob(
+                job_id=str(uuid4()),
+                trace_id=trace_id,
+                created_at=_now(),
+                estimated_cost=pipeline.estimate_test_cost(),
+                refresh_judge=refresh_judge,
+            )
+            self._save(job)
+            self._active[trace_id] = job.job_id
+
+        update_qa_state(trace_id, "queued")
+        self._enqueue(job)
+        logger.info(f"Queued QA job {job.job_id} for trace {trace_id}")
+        return job
+
+    def _run(self, job_id: str) -> None:
+        job = self.get(job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return
+
+        job.status = "running"
+        job.started_at = _now()
+        self._save(job)
+        try:
+            update_qa_state(job.trace_id, "running")
+            pipeline.run_qa_pipeline(job.trace_id, refresh_judge=job.refresh_judge)
+            job.status = "completed"
+        except Exception as e:
+            logger.error(f"QA job {job_id} for trace {job.trace_id} failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+            try:
+                update_qa_state(job.trace_id, "failed")
+            except Exception as state_error:
+                logger.error(f"Could not mark trace {job.trace_id} as failed: {str(state_error)}")
+
+        job.finished_at = _now()
+        self._archive(job)
+        with self._lock:
+            if self._active.get(job.trace_id) == job_id:
+                del self._active[job.trace_id]
+        logger.info(f"QA job {job_id} finished with status {job.status}")
+
+    def recover(self) -> int:
+        # Jobs that were queued or mid-run when the process stopped are run
+        # again from the start. Results of stages that finished before the
+        # stop stay on the trace until the re-run overwrites them
+        self.prune()
+        count = 0
+        for path in sorted(JOBS_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime):
+            try:
+                job = QAJob.model_validate_json(path.read_text())
+            except Exception as e:
+                logger.warning(f"Skipping unreadable job file {path}: {e}")
+                continue
+            if job.status == "running":
+                job.status = "queued"
+                job.started_at = None
+                self._save(job)
+            self._enqueue(job)
+            count += 1
+        if count:
+            logger.info(f"Recovered {count} unfinished QA jobs")
+        return count
+
+    def shutdown(self, wait: bool = False) -> None:
+        # Without waiting, jobs that have not started stay queued on disk and
+        # are picked up again by recover() on the next start
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+job_queue = JobQueue(QA_WORKERS)
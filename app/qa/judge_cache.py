@@ -0,0 +1,34 @@
+import os
+import hashlib
+from pathlib import Path
+from .result_cache import ResultCache
+
+JUDGE_CACHE_ENABLED = os.getenv("QA_JUDGE_CACHE", "1") == "1"
+JUDGE_CACHE_DIR = Path(os.getenv("QA_JUDGE_CACHE_DIR", "data/judge_results"))
+JUDGE_CACHE_TTL_SECONDS = float(os.getenv("QA_JUDGE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+JUDGE_CACHE_MAX_ENTRIES = int(os.getenv("QA_JUDGE_CACHE_MAX_ENTRIES", "10000"))
+# The judge's scale, and the bounds QAResults.reasoning_score accepts
+SCORE_MIN = 1.0
+SCORE_MAX = 5.0
+
+
+def valid_score(score) -> bool:
+    return isinstance(score, (int, float)) and SCORE_MIN <= score <= SCORE_MAX
+
+
+def judge_key(reasoning_text: str, prompt_template: str, model: str, temperature: float) -> str:
+    # The template's own hash is its version, so editing the prompt
+    # invalidates every earlier verdict without a manual version bump
+    prompt_version = hashlib.sha256(prompt_template.encode("utf-8")).hexdigest()
+    parts = [reasoning_text, prompt_version, model, repr(temperature)]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class JudgeCache(ResultCache):
+    # Same storage, TTL, eviction and in-flight coalescing as the test
+    # result cache, in its own directory
+    def __init__(self, ttl_seconds: float = JUDGE_CACHE_TTL_SECONDS, max_entries: int = JUDGE_CACHE_MAX_ENTRIES):
+        super().__init__(ttl_seconds, max_entries)
+
+    def _directory(self) -> Path:
+        return JUDGE_CACHE_DIR
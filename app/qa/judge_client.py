@@ -0,0 +1,196 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Optional
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+JUDGE_CONCURRENCY = int(os.getenv("QA_JUDGE_CONCURRENCY", "4"))
+JUDGE_REQUESTS_PER_MINUTE = float(os.getenv("QA_JUDGE_RPM", "500"))
+JUDGE_TOKENS_PER_MINUTE = float(os.getenv("QA_JUDGE_TPM", "200000"))
+JUDGE_MAX_RETRIES = int(os.getenv("QA_JUDGE_MAX_RETRIES", "4"))
+JUDGE_BACKOFF_BASE_SECONDS = float(os.getenv("QA_JUDGE_BACKOFF_BASE_SECONDS", "0.5"))
+JUDGE_BACKOFF_MAX_SECONDS = float(os.getenv("QA_JUDGE_BACKOFF_MAX_SECONDS", "20"))
+JUDGE_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("QA_JUDGE_ATTEMPT_TIMEOUT_SECONDS", "30"))
+# Covers every attempt, backoff and rate-limit wait of one call; a map-reduce
+# evaluation makes one call per window plus the reduce, each with its own
+JUDGE_DEADLINE_SECONDS = float(os.getenv("QA_JUDGE_DEADLINE_SECONDS", "90"))
+# Reserved per call for the completion on top of the prompt estimate
+JUDGE_OUTPUT_TOKENS = 300
+
+
+def count_tokens(text: str) -> int:
+    # ~4 characters per token for English text; budgets only need to be
+    # roughly right, the provider's own limits are the hard ones
+    return len(text) // 4
+
+
+def estimate_tokens(prompt: str) -> int:
+    return count_tokens(prompt) + JUDGE_OUTPUT_TOKENS
+
+
+def total_tokens(response, estimate: int) -> int:
+    # Some OpenAI-compatible servers omit usage
+    tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+    return tokens if isinstance(tokens, int) else estimate
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, (RateLimitError, APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers["retry-after"])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    # Refills continuously at per_minute / 60 per second; waiters are served
+    # in arrival order
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float) -> float:
+        # Returns the seconds spent waiting
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                delay = (amount - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self.tokens -= amount
+        return waited
+
+
+class JudgeClient:
+    # One AsyncOpenAI client on a dedicated event loop thread, shared by all
+    # evaluations in the process. Sync callers block only their own thread;
+    # concurrency, rate limits and retries are enforced on the loop
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        concurrency: int = JUDGE_CONCURRENCY,
+        requests_per_minute: float = JUDGE_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = JUDGE_TOKENS_PER_MINUTE,
+        max_retries: int = JUDGE_MAX_RETRIES,
+        deadline_seconds: float = JUDGE_DEADLINE_SECONDS,
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.deadline_seconds = deadline_seconds
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="qa-judge", daemon=True)
+                self._thread.start()
+                asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+                self._loop = loop
+            return self._loop
+
+    async def _setup(self) -> None:
+        self._client = AsyncOpenAI(
+            api_key=self.api_key or os.getenv("OPENAI_API_KEY"),
+            base_url=self.base_url or os.getenv("OPENAI_BASE_URL") or None,
+            max_retries=0,
+        )
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._request_bucket = TokenBucket(self.requests_per_minute)
+        self._token_bucket = TokenBucket(self.tokens_per_minute)
+
+    async def _attempt(self, request: dict, tokens: int, timeout: float) -> tuple[str, int]:
+        self.throttled_seconds += await self._request_bucket.acquire(1)
+        self.throttled_seconds += await self._token_bucket.acquire(tokens)
+        async with self._slots:
+            self.requests += 1
+            response = await self._client.chat.completions.create(**request, timeout=timeout)
+        return response.choices[0].message.content, total_tokens(response, tokens)
+
+    async def _complete(self, request: dict, tokens: int) -> tuple[str, int]:
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 0
+        try:
+            async with asyncio.timeout(self.deadline_seconds):
+                while True:
+                    timeout = max(0.1, min(JUDGE_ATTEMPT_TIMEOUT_SECONDS, deadline - time.monotonic()))
+                    try:
+                        return await self._attempt(request, tokens, timeout)
+                    except Exception as e:
+                        if attempt >= self.max_retries or not _retryable(e):
+                            raise
+                        # Full jitter spreads out callers that failed together;
+                        # a server-sent Retry-After takes precedence
+                        cap = min(JUDGE_BACKOFF_MAX_SECONDS, JUDGE_BACKOFF_BASE_SECONDS * 2 ** attempt)
+                        delay = _retry_after(e) or random.uniform(0, cap)
+                        attempt += 1
+                        self.retries += 1
+                        logger.warning(f"Judge call failed ({e.__class__.__name__}), retry {attempt} in {delay:.2f}s")
+                        await asyncio.sleep(delay)
+        except TimeoutError:
+            self.failures += 1
+            raise TimeoutError(f"Judge call exceeded {self.deadline_seconds}s deadline after {attempt + 1} attempts")
+        except Exception:
+            self.failures += 1
+            raise
+
+    def _submit(self, request: dict, tokens: int):
+        return asyncio.run_coroutine_threadsafe(self._complete(request, tokens), self._ensure_loop())
+
+    def complete(self, request: dict, tokens: int) -> tuple[str, int]:
+        # Blocking: returns (message content, tokens used) or raises
+        return self._submit(request, tokens).result()
+
+    async def complete_async(self, request: dict, tokens: int) -> tuple[str, int]:
+        # For callers on another event loop, e.g. an async route
+        return await asyncio.wrap_future(self._submit(request, tokens))
+
+    def close(self) -> None:
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join()
+            loop.close()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+        }
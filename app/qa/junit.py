@@ -0,0 +1,53 @@
+import os
+import xml.etree.ElementTree as ET
+from typing import Optional
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+REPORT_FILE = "pr-telemetry-report.xml"
+# Expanded by the sandbox shell: the local runner sets TMPDIR to its private
+# directory, containers fall back to /tmp
+REPORT_OPTION = f'--junitxml="${{TMPDIR:-/tmp}}/{REPORT_FILE}"'
+REPORT_MAX_BYTES = int(os.getenv("QA_REPORT_MAX_BYTES", str(10 * 1024 * 1024)))
+MESSAGE_CHARS = 500
+
+
+def junit_key(node_id: str) -> tuple[str, str]:
+    # "tests/test_a.py::TestX::test_y[1]" -> ("tests.test_a.TestX", "test_y[1]"),
+    # the classname/name pair pytest writes into JUnit XML
+    parts = node_id.split("::")
+    module = parts[0][:-3] if parts[0].endswith(".py") else parts[0]
+    classname = ".".join([module.replace("/", ".")] + parts[1:-1])
+    return classname, parts[-1]
+
+
+def parse_junit(report: Optional[bytes]) -> list[dict]:
+    if not report:
+        return []
+    if len(report) > REPORT_MAX_BYTES:
+        logger.warning(f"Ignoring JUnit report of {len(report)} bytes")
+        return []
+    try:
+        root = ET.fromstring(report)
+    except ET.ParseError as e:
+        logger.warning(f"Could not parse JUnit report: {e}")
+        return []
+
+    cases = []
+    for case in root.iter("testcase"):
+        outcome, message = "passed", None
+        for tag in ("failure", "error", "skipped"):
+            element = case.find(tag)
+            if element is not None:
+                outcome = "failed" if tag == "failure" else tag
+                message = (element.get("message") or element.text or "")[:MESSAGE_CHARS]
+                break
+        cases.append({
+            "classname": case.get("classname", ""),
+            "name": case.get("name", ""),
+            "outcome": outcome,
+            "duration_ms": int(float(case.get("time") or 0) * 1000),
+            "message": message,
+        })
+    return cases
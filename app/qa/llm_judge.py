@@ -1,14 +1,36 @@
 import os
 import json
+import time
+import asyncio
+import threading
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from dotenv import load_dotenv
 from app.utils.logger import setup_logger
+from .judge_cache import JUDGE_CACHE_ENABLED, SCORE_MAX, SCORE_MIN, JudgeCache, judge_key, valid_score
+from .judge_client import JUDGE_CONCURRENCY, JudgeClient, count_tokens, estimate_tokens, total_tokens
 
 load_dotenv()
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 logger = setup_logger(__name__)
 
+JUDGE_MODEL = "gpt-4o-mini"
+JUDGE_TEMPERATURE = 0.3
+# 0 falls back to one blocking call on the sync client, with no rate
+# limiting or retries
+JUDGE_ASYNC = os.getenv("QA_JUDGE_ASYNC", "1") == "1"
+
+# Logs longer than this many (estimated) tokens are judged map-reduce:
+# overlapping windows are summarized in parallel, then scored as a whole
+JUDGE_MAP_REDUCE_TOKENS = int(os.getenv("QA_JUDGE_MAP_REDUCE_TOKENS", "24000"))
+JUDGE_WINDOW_TOKENS = int(os.getenv("QA_JUDGE_WINDOW_TOKENS", "6000"))
+JUDGE_WINDOW_OVERLAP_TOKENS = int(os.getenv("QA_JUDGE_WINDOW_OVERLAP_TOKENS", "500"))
+
+judge_cache = JudgeCache()
+judge_client = JudgeClient()
+
 JUDGE_PROMPT_TEMPLATE = """You are evaluating a software developer's reasoning process while fixing a bug.
 
 Below is their chronological reasoning log:
@@ -31,42 +53,301 @@ Respond with JSON in this exact format:
   "feedback": "<2-3 sentence explanation of the score>"
 }}"""
 
+WINDOW_PROMPT_TEMPLATE = """You are reviewing part {index} of {count} of a software developer's chronological reasoning log while fixing a bug. Steps keep their numbers from the full log, and neighbouring parts overlap by a few steps.
 
-def evaluate_reasoning(reasoning_steps: list[str]) -> dict:
-    if not reasoning_steps:
-        logger.warning("No reasoning steps provided for evaluation")
-        return {
-            "reasoning_score": None,
-            "reasoning_feedback": "No reasoning steps provided"
-        }
-    
-    logger.info(f"Evaluating {len(reasoning_steps)} reasoning steps with GPT-4o-mini")
-    reasoning_text = "\n\n".join([f"[{i+1}] {step}" for i, step in enumerate(reasoning_steps)])
+---
+{reasoning_text}
+---
+
+Summarize what this part shows about their hypothesis formation, evidence gathering, logical coherence, validation of the fix and depth. Later parts may resolve what is still open here, so describe rather than judge the whole session.
+
+Respond with JSON in this exact format:
+{{
+  "summary": "<4-6 sentence summary of this part>",
+  "score": <1.0-5.0 for this part alone>
+}}"""
+
+REDUCE_PROMPT_TEMPLATE = """You are evaluating a software developer's reasoning process while fixing a bug.
+
+Their reasoning log was too long to read at once, so it was split into {count} overlapping parts. Summaries of the parts, in order, with a score for each part alone:
+
+---
+{summaries}
+---
+
+Evaluate the reasoning of the whole session on these five dimensions (0-1 point each):
+
+1. **Hypothesis Formation**: Did they form clear, testable hypotheses about the root cause?
+2. **Evidence Gathering**: Did they systematically explore files/logs/commands to validate hypotheses?
+3. **Logical Coherence**: Is the reasoning chain clear and logical?
+4. **Validation**: Did they test their fix and verify it works?
+5. **Depth**: Did they consider edge cases or alternative explanations?
+
+Respond with JSON in this exact format:
+{{
+  "score": <sum of dimensions, 1.0-5.0>,
+  "feedback": "<2-3 sentence explanation of the score>"
+}}"""
+
+
+def _request(prompt: str) -> dict:
+    return {
+        "model": JUDGE_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {"type": "json_object"},
+        "temperature": JUDGE_TEMPERATURE,
+    }
+
+
+def _score(result: dict) -> float:
+    # A missing, non-numeric or out-of-range score makes the evaluation
+    # unavailable, and so never cached, rather than a made-up or rejected verdict
+    score = result.get("score")
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        raise ValueError(f"Judge response has no numeric score: {score!r}")
+    if not valid_score(score):
+        raise ValueError(f"Judge score {score} is outside {SCORE_MIN}-{SCORE_MAX}")
+    return float(score)
+
+
+def _verdict(content: str) -> dict:
+    result = json.loads(content)
+    score = _score(result)
     
-    prompt = JUDGE_PROMPT_TEMPLATE.format(reasoning_text=reasoning_text)
+    logger.info(f"LLM evaluation successful: score={score}")
     
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            temperature=0.3,
-            timeout=30
-        )
-        
-        result = json.loads(response.choices[0].message.content)
-        score = float(result.get("score", 3.0))
-        
-        logger.info(f"LLM evaluation successful: score={score}")
-        
+    return {
+        "reasoning_score": score,
+        "reasoning_feedback": result.get("feedback", "No feedback provided")
+    }
+
+
+def _unavailable(error: Exception) -> dict:
+    logger.error(f"LLM evaluation failed: {str(error)}")
+    return {
+        "reasoning_score": None,
+        "reasoning_feedback": f"Reasoning evaluation unavailable: {str(error)}"
+    }
+
+
+def _is_verdict(result: dict) -> bool:
+    # Failed or unavailable evaluations are retried, never served as scores
+    return valid_score(result["reasoning_score"])
+
+
+def _format_steps(reasoning_steps: list[str], indices) -> str:
+    return "\n\n".join(f"[{i+1}] {reasoning_steps[i]}" for i in indices)
+
+
+def _clip(text: str, tokens: int) -> str:
+    # A single step bigger than a window keeps its start and end
+    chars = tokens * 4
+    if len(text) <= chars:
+        return text
+    return f"{text[:chars // 2]}\n[... {len(text) - chars} characters omitted ...]\n{text[-(chars // 2):]}"
+
+
+def split_windows(reasoning_steps: list[str], window_tokens: int, overlap_tokens: int) -> list[list[int]]:
+    # Consecutive runs of whole steps of up to window_tokens each; a window
+    # starts with the trailing steps (up to overlap_tokens) of the previous one
+    sizes = [count_tokens(step) for step in reasoning_steps]
+    windows = []
+    start = 0
+    while start < len(sizes):
+        end, size = start, 0
+        while end < len(sizes) and (end == start or size + sizes[end] <= window_tokens):
+            size += sizes[end]
+            end += 1
+        windows.append(list(range(start, end)))
+        if end == len(sizes):
+            break
+        back, overlap = end, 0
+        while back - 1 > start and overlap + sizes[back - 1] <= overlap_tokens:
+            back -= 1
+            overlap += sizes[back]
+        start = back
+    return windows
+
+
+def _window_prompts(reasoning_steps: list[str], windows: list[list[int]]) -> list[str]:
+    clipped = [_clip(step, JUDGE_WINDOW_TOKENS) for step in reasoning_steps]
+    return [
+        WINDOW_PROMPT_TEMPLATE.format(index=index + 1, count=len(windows), reasoning_text=_format_steps(clipped, window))
+        for index, window in enumerate(windows)
+    ]
+
+
+def _reduce_prompt(parts: list[str]) -> str:
+    summaries = []
+    for index, content in enumerate(parts):
+        part = json.loads(content)
+        summaries.append(f"Part {index + 1} (score {_score(part):.1f}): {part.get('summary', '')}")
+    return REDUCE_PROMPT_TEMPLATE.format(count=len(parts), summaries="\n\n".join(summaries))
+
+
+class _Meter:
+    # Calls and tokens of one evaluation, shared by its parallel map calls
+    def __init__(self, mode: str, windows: int):
+        self.mode = mode
+        self.windows = windows
+        self.calls = 0
+        self.tokens = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, tokens: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.tokens += tokens
+
+    def usage(self) -> dict:
         return {
-            "reasoning_score": score,
-            "reasoning_feedback": result.get("feedback", "No feedback provided")
+            "mode": self.mode,
+            "windows": self.windows,
+            "calls": self.calls,
+            "tokens": self.tokens,
+            "wall_ms": int((time.perf_counter() - self.started) * 1000),
         }
-        
+
+
+class _Plan:
+    # How one reasoning log is judged: in a single call, or map-reduce over
+    # windows when it is over JUDGE_MAP_REDUCE_TOKENS
+    def __init__(self, reasoning_steps: list[str]):
+        self.reasoning_steps = reasoning_steps
+        self.reasoning_text = _format_steps(reasoning_steps, range(len(reasoning_steps)))
+        self.prompt = JUDGE_PROMPT_TEMPLATE.format(reasoning_text=self.reasoning_text)
+        self.windows = None
+        version = JUDGE_PROMPT_TEMPLATE
+        if count_tokens(self.prompt) > JUDGE_MAP_REDUCE_TOKENS:
+            self.windows = split_windows(reasoning_steps, JUDGE_WINDOW_TOKENS, JUDGE_WINDOW_OVERLAP_TOKENS)
+            version = "\0".join([WINDOW_PROMPT_TEMPLATE, REDUCE_PROMPT_TEMPLATE, str(JUDGE_WINDOW_TOKENS), str(JUDGE_WINDOW_OVERLAP_TOKENS)])
+        self.key = judge_key(self.reasoning_text, version, JUDGE_MODEL, JUDGE_TEMPERATURE)
+
+    def meter(self) -> _Meter:
+        mode = "map_reduce" if self.windows else "single"
+        logger.info(f"Evaluating {len(self.reasoning_steps)} reasoning steps with {JUDGE_MODEL} ({mode}, {len(self.windows or [0])} windows)")
+        return _Meter(mode, len(self.windows or [0]))
+
+
+def _call(prompt: str, meter: _Meter) -> str:
+    if JUDGE_ASYNC:
+        content, tokens = judge_client.complete(_request(prompt), estimate_tokens(prompt))
+    else:
+        response = client.chat.completions.create(**_request(prompt), timeout=30)
+        content, tokens = response.choices[0].message.content, total_tokens(response, estimate_tokens(prompt))
+    meter.add(tokens)
+    return content
+
+
+async def _call_async(prompt: str, meter: _Meter) -> str:
+    content, tokens = await judge_client.complete_async(_request(prompt), estimate_tokens(prompt))
+    meter.add(tokens)
+    return content
+
+
+def _judge(plan: _Plan) -> dict:
+    meter = plan.meter()
+    try:
+        if plan.windows is None:
+            result = _verdict(_call(plan.prompt, meter))
+        else:
+            prompts = _window_prompts(plan.reasoning_steps, plan.windows)
+            with ThreadPoolExecutor(max_workers=min(len(prompts), JUDGE_CONCURRENCY), thread_name_prefix="qa-judge-map") as pool:
+                parts = list(pool.map(lambda prompt: _call(prompt, meter), prompts))
+            result = _verdict(_call(_reduce_prompt(parts), meter))
     except Exception as e:
-        logger.error(f"LLM evaluation failed: {str(e)}")
-        return {
-            "reasoning_score": None,
-            "reasoning_feedback": f"Reasoning evaluation unavailable: {str(e)}"
-        }
\ No newline at end of file
+        result = _unavailable(e)
+    return {**result, "reasoning_usage": meter.usage()}
+
+
+async def _judge_async(plan: _Plan) -> dict:
+    meter = plan.meter()
+    try:
+        if plan.windows is None:
+            result = _verdict(await _call_async(plan.prompt, meter))
+        else:
+            prompts = _window_prompts(plan.reasoning_steps, plan.windows)
+            parts = await asyncio.gather(*(_call_async(prompt, meter) for prompt in prompts))
+            result = _verdict(await _call_async(_reduce_prompt(parts), meter))
+    except Exception as e:
+        result = _unavailable(e)
+    return {**result, "reasoning_usage": meter.usage()}
+
+
+def _from_cache(result: dict, started: float) -> dict:
+    # A cached verdict cost nothing this time
+    usage = result.get("reasoning_usage") or {"mode": "single", "windows": 1}
+    usage = {**usage, "calls": 0, "tokens": 0, "wall_ms": int((time.perf_counter() - started) * 1000)}
+    return {**result, "reasoning_usage": usage, "reasoning_cached": True}
+
+
+def _no_steps() -> dict:
+    logger.warning("No reasoning steps provided for evaluation")
+    return {
+        "reasoning_score": None,
+        "reasoning_feedback": "No reasoning steps provided"
+    }
+
+
+def evaluate_reasoning(reasoning_steps: list[str], use_cache: bool = True) -> dict:
+    # use_cache=False skips the lookup (a requested re-score) but still
+    # stores the fresh verdict
+    if not reasoning_steps:
+        return _no_steps()
+    started = time.perf_counter()
+    plan = _Plan(reasoning_steps)
+
+    if not JUDGE_CACHE_ENABLED:
+        return {**_judge(plan), "reasoning_cached": False}
+
+    if not use_cache:
+        result = _judge(plan)
+        if _is_verdict(result):
+            judge_cache.put(plan.key, result)
+        return {**result, "reasoning_cached": False}
+
+    result, cached = judge_cache.run(plan.key, lambda: _judge(plan), _is_verdict)
+    if cached:
+        logger.info(f"Served reasoning evaluation from cache: score={result['reasoning_score']}")
+        return _from_cache(result, started)
+    return {**result, "reasoning_cached": False}
+
+
+async def evaluate_reasoning_async(reasoning_steps: list[str], use_cache: bool = True) -> dict:
+    # Same verdicts and cache as evaluate_reasoning for callers on an event
+    # loop; the call itself never blocks the loop
+    if not reasoning_steps:
+        return _no_steps()
+    started = time.perf_counter()
+    plan = _Plan(reasoning_steps)
+
+    if JUDGE_CACHE_ENABLED and use_cache:
+        cached = judge_cache.get(plan.key)
+        if cached is not None:
+            judge_cache.hits += 1
+            return _from_cache(cached, started)
+        judge_cache.misses += 1
+
+    result = await _judge_async(plan)
+    if JUDGE_CACHE_ENABLED and _is_verdict(result):
+        judge_cache.put(plan.key, result)
+    return {**result, "reasoning_cached": False}
+
+
+def reasoning_key(reasoning_steps: list[str]) -> str:
+    return _Plan(reasoning_steps).key
+
+
+def batch_request(reasoning_steps: list[str]) -> Optional[tuple[dict, str]]:
+    # (chat completion request body, cache key) for offline batch judging;
+    # logs long enough for map-reduce need several rounds and return None
+    plan = _Plan(reasoning_steps)
+    if plan.windows is not None:
+        return None
+    return _request(plan.prompt), plan.key
+
+
+def completion_verdict(completion: dict) -> dict:
+    # Verdict from a chat completion body, e.g. one line of a batch result file
+    return _verdict(completion["choices"][0]["message"]["content"])
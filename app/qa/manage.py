@@ -0,0 +1,53 @@
+import json
+import argparse
+from pathlib import Path
+from app.utils.logger import setup_logger
+from .test_runner import image_cache
+from . import batch_judge
+
+logger = setup_logger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.qa.manage")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    prebuild = subparsers.add_parser("prebuild-images", help="Build the cached dependency images for repos")
+    prebuild.add_argument("repos", nargs="*", default=["sample_repo"])
+    subparsers.add_parser("evict-images", help="Remove least recently used dependency images over the budget")
+    prepare = subparsers.add_parser("judge-batch-prepare", help="Write batch judge request files for every stored trace")
+    prepare.add_argument("--run-id", help="Resume or name a run (default: current UTC time)")
+    prepare.add_argument("--workers", type=int)
+    run_local = subparsers.add_parser("judge-batch-run-local", help="Answer a run's request files locally through the judge client")
+    run_local.add_argument("run_id")
+    ingest = subparsers.add_parser("judge-batch-ingest", help="Write a run's batch results back to the traces")
+    ingest.add_argument("run_id")
+    ingest.add_argument("--workers", type=int)
+    status = subparsers.add_parser("judge-batch-status", help="Show a batch run's progress")
+    status.add_argument("run_id")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "prebuild-images":
+        for repo in args.repos:
+            repo_path = Path(repo).absolute()
+            if not repo_path.is_dir():
+                parser.error(f"Repository path not found: {repo_path}")
+            tag = image_cache.ensure_image(repo_path)
+            print(f"{repo}: {tag or 'no requirements files, using ' + image_cache.base_image}")
+    elif args.command == "evict-images":
+        for tag in image_cache.evict():
+            print(f"removed {tag}")
+    elif args.command == "judge-batch-prepare":
+        run_dir = batch_judge.create_run(args.run_id)
+        batch_judge.prepare_batch(run_dir, args.workers)
+        print(json.dumps(batch_judge.batch_status(run_dir), indent=2))
+    elif args.command == "judge-batch-run-local":
+        print(f"wrote {batch_judge.run_local(batch_judge.BATCH_DIR / args.run_id)} results files")
+    elif args.command == "judge-batch-ingest":
+        print(json.dumps(batch_judge.ingest_batch(batch_judge.BATCH_DIR / args.run_id, args.workers)))
+    elif args.command == "judge-batch-status":
+        print(json.dumps(batch_judge.batch_status(batch_judge.BATCH_DIR / args.run_id), indent=2))
+
+
+if __name__ == "__main__":
+    main()
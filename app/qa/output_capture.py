@@ -0,0 +1,56 @@
+import os
+
+OUTPUT_HEAD_BYTES = int(os.getenv("QA_OUTPUT_HEAD_BYTES", str(8 * 1024)))
+OUTPUT_TAIL_BYTES = int(os.getenv("QA_OUTPUT_TAIL_BYTES", str(64 * 1024)))
+SNIPPET_HEAD_CHARS = 500
+SNIPPET_CHARS = 2000
+
+
+class BoundedOutput:
+    # Keeps the first head_bytes and the last tail_bytes of a stream, so a
+    # chatty suite costs constant memory and the failure summary at the end
+    # is never lost
+    def __init__(self, head_bytes: int = OUTPUT_HEAD_BYTES, tail_bytes: int = OUTPUT_TAIL_BYTES):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self._head = bytearray()
+        self._tail = bytearray()
+        self.total_bytes = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self.total_bytes += len(chunk)
+        if len(self._head) < self.head_bytes:
+            room = self.head_bytes - len(self._head)
+            self._head += chunk[:room]
+            chunk = chunk[room:]
+        if not chunk:
+            return
+        self._tail += chunk[-self.tail_bytes:] if self.tail_bytes else b""
+        # Trimming only once the buffer doubles keeps feeding amortised O(1)
+        if len(self._tail) > 2 * self.tail_bytes:
+            del self._tail[:len(self._tail) - self.tail_bytes]
+
+    @property
+    def omitted_bytes(self) -> int:
+        return self.total_bytes - len(self._head) - min(len(self._tail), self.tail_bytes)
+
+    def text(self) -> str:
+        tail = bytes(self._tail[-self.tail_bytes:]) if self.tail_bytes else b""
+        head = bytes(self._head).decode("utf-8", "replace")
+        if self.omitted_bytes > 0:
+            return f"{head}\n... [{self.omitted_bytes} bytes omitted] ...\n{tail.decode('utf-8', 'replace')}"
+        return head + tail.decode("utf-8", "replace")
+
+
+def capture_text(data: bytes) -> str:
+    output = BoundedOutput()
+    output.feed(data)
+    return output.text()
+
+
+def snippet(output: str, limit: int = SNIPPET_CHARS) -> str:
+    # The start shows what ran; the end holds pytest's failure summary
+    if len(output) <= limit:
+        return output
+    tail_chars = limit - SNIPPET_HEAD_CHARS
+    return f"{output[:SNIPPET_HEAD_CHARS]}\n...\n{output[-tail_chars:]}"
@@ -0,0 +1,212 @@
+import os
+import time
+import threading
+from pathlib import Path
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Optional
+from app.models import Trace, QAResults
+from app.storage import load_trace, update_qa_state
+from app.utils.logger import setup_logger
+from .test_runner import run_tests_in_docker, result_cache
+from .test_impact import TEST_IMPACT_ENABLED, TEST_IMPACT_FULL_RUN, impacted_command, select_impacted_tests
+from .resource_usage import estimate_cost, record_cost_profile
+from .llm_judge import evaluate_reasoning
+
+logger = setup_logger(__name__)
+
+QA_DOCKER_CONCURRENCY = int(os.getenv("QA_DOCKER_CONCURRENCY", "2"))
+QA_LLM_CONCURRENCY = int(os.getenv("QA_LLM_CONCURRENCY", "4"))
+
+docker_slots = threading.BoundedSemaphore(QA_DOCKER_CONCURRENCY)
+llm_slots = threading.BoundedSemaphore(QA_LLM_CONCURRENCY)
+
+
+class Stage:
+    # run(trace, outputs) gets the outputs of the stages it depends on and
+    # returns a dict; keys that are QAResults fields are merged into qa_results
+    def __init__(self, name: str, run: Callable[[Trace, dict], dict], depends_on: tuple = ()):
+        self.name = name
+        self.run = run
+        self.depends_on = depends_on
+
+
+class StageFailed(RuntimeError):
+    pass
+
+
+def _run_impacted_tests(trace: Trace, outputs: dict) -> dict:
+    # Best effort: the full suite depends on this stage, so it never fails;
+    # without a usable selection it produces nothing and the full suite decides
+    try:
+        edited = [event.data.file_path for event in trace.events if event.event_type == "code_edit"]
+        repo_path = Path("sample_repo").absolute()
+        test_files = select_impacted_tests(repo_path, result_cache.content_hash(repo_path), edited)
+        command = impacted_command(trace.repo.test_command, test_files) if test_files else None
+        if command is None:
+            logger.info(f"No impacted test selection for trace {trace.trace_id}, full suite decides")
+            return {}
+
+        with docker_slots:
+            logger.info(f"Running {len(test_files)} impacted test files for trace {trace.trace_id}")
+            test_results = run_tests_in_docker("sample_repo", command)
+    except Exception as e:
+        logger.warning(f"Impacted test run failed for trace {trace.trace_id}: {str(e)}")
+        return {}
+
+    logger.info(f"Impacted tests completed for trace {trace.trace_id}: tests_passed={test_results['tests_passed']}")
+    return {
+        "impacted_test_files": test_files,
+        "impacted_tests_passed": test_results["tests_passed"],
+        "impacted_test_status": test_results.get("test_status"),
+        "results": test_results,
+    }
+
+
+def _run_tests(trace: Trace, outputs: dict) -> dict:
+    impacted = outputs.get("impacted_tests", {})
+    if impacted and not TEST_IMPACT_FULL_RUN:
+        logger.info(f"Using impacted test results as the verdict for trace {trace.trace_id}")
+        return {**impacted["results"], "test_scope": "impacted"}
+
+    with docker_slots:
+        logger.info(f"Running Docker tests for trace {trace.trace_id}")
+        test_results = run_tests_in_docker("sample_repo", trace.repo.test_command)
+    logger.info(f"Docker tests completed for trace {trace.trace_id}: tests_passed={test_results['tests_passed']}")
+    # Only fresh full-suite runs that got to run the tests shape the profile
+    usage = test_results.get("test_usage")
+    if usage and not test_results.get("tests_cached") and test_results.get("test_status") in ("passed", "failed", "timeout"):
+        record_cost_profile("sample_repo", usage)
+    return {**test_results, "test_scope": "full"}
+
+
+def estimate_test_cost() -> Optional[dict]:
+    # Expected usage of a full test run, from the repo's cost profile
+    return estimate_cost("sample_repo")
+
+
+def reasoning_steps(trace: Trace) -> list[str]:
+    return [event.data.content for event in trace.events if event.event_type == "reasoning_step"]
+
+
+def _extract_reasoning(trace: Trace, outputs: dict) -> dict:
+    return {"reasoning_steps": reasoning_steps(trace)}
+
+
+def _judge_reasoning(trace: Trace, outputs: dict, use_cache: bool = True) -> dict:
+    reasoning_steps = outputs["reasoning_steps"]["reasoning_steps"]
+    with llm_slots:
+        logger.info(f"Evaluating {len(reasoning_steps)} reasoning steps for trace {trace.trace_id}")
+        reasoning_results = evaluate_reasoning(reasoning_steps, use_cache=use_cache)
+    logger.info(f"LLM evaluation completed for trace {trace.trace_id}: score={reasoning_results['reasoning_score']}")
+    return reasoning_results
+
+
+STAGES = [
+    Stage("tests", _run_tests),
+    Stage("reasoning_steps", _extract_reasoning),
+    Stage("judge", _judge_reasoning, depends_on=("reasoning_steps",)),
+]
+
+# The impacted subset runs first and is persisted as a preliminary verdict
+# while the full suite (if enabled) is still running
+IMPACT_STAGES = [
+    Stage("impacted_tests", _run_impacted_tests),
+    Stage("tests", _run_tests, depends_on=("impacted_tests",)),
+    Stage("reasoning_steps", _extract_reasoning),
+    Stage("judge", _judge_reasoning, depends_on=("reasoning_steps",)),
+]
+
+
+def default_stages() -> list[Stage]:
+    return IMPACT_STAGES if TEST_IMPACT_ENABLED else STAGES
+
+
+def _timed(stage: Stage, trace: Trace, outputs: dict) -> tuple:
+    started = time.perf_counter()
+    try:
+        return stage.run(trace, outputs), None, time.perf_counter() - started
+    except Exception as e:
+        return None, e, time.perf_counter() - started
+
+
+def run_stages(stages: list[Stage], trace: Trace, on_stage_done: Callable) -> dict:
+    # Every stage whose dependencies have finished is started at once, so
+    # independent stages overlap; dependents of a failed stage are skipped
+    outputs = {}
+    failed = set()
+    pending = {stage.name: stage for stage in stages}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, len(stages)), thread_name_prefix="qa-stage") as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                blocked_by = [dep for dep in stage.depends_on if dep in failed]
+                if blocked_by:
+                    del pending[name]
+                    failed.add(name)
+                    on_stage_done(stage, None, StageFailed(f"skipped because {blocked_by[0]} failed"), 0.0)
+                elif all(dep in outputs for dep in stage.depends_on):
+                    del pending[name]
+                    running[pool.submit(_timed, stage, trace, dict(outputs))] = stage
+
+            if not running:
+                raise StageFailed(f"Unsatisfiable stage dependencies: {sorted(pending)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                result, error, elapsed = future.result()
+                if error is None:
+                    outputs[stage.name] = result
+                else:
+                    failed.add(stage.name)
+                on_stage_done(stage, result, error, elapsed)
+
+    return outputs
+
+
+def run_qa_pipeline(trace_id: str, stages: list[Stage] = None, refresh_judge: bool = False) -> QAResults:
+    logger.info(f"Starting QA pipeline for trace {trace_id}")
+    stages = stages or default_stages()
+    if refresh_judge:
+        stages = [
+            Stage(stage.name, partial(_judge_reasoning, use_cache=False), stage.depends_on)
+            if stage.run is _judge_reasoning else stage
+            for stage in stages
+        ]
+    trace = load_trace(trace_id, resolve_blobs=False)
+    started = time.perf_counter()
+
+    state = {"qa_results": QAResults()}
+
+    def on_stage_done(stage: Stage, result: dict, error: Exception, elapsed: float) -> None:
+        # Each finished stage is persisted right away, so a later failure
+        # keeps the results that were already produced
+        qa_results = state["qa_results"]
+        if error is None:
+            fields = {field: value for field, value in result.items() if field in QAResults.model_fields}
+            try:
+                qa_results = QAResults.model_validate({**qa_results.model_dump(), **fields})
+            except ValueError as e:
+                error = e
+        qa_results.stage_timings_ms[stage.name] = int(elapsed * 1000)
+
+        if error is None:
+            logger.info(f"Stage {stage.name} for trace {trace_id} finished in {elapsed:.2f}s")
+        else:
+            qa_results.stage_errors[stage.name] = str(error)
+            logger.error(f"Stage {stage.name} for trace {trace_id} failed: {str(error)}")
+        state["qa_results"] = qa_results
+        update_qa_state(trace_id, "running", qa_results)
+
+    run_stages(stages, trace, on_stage_done)
+
+    qa_results = state["qa_results"]
+    if qa_results.stage_errors:
+        failures = "; ".join(f"{name}: {error}" for name, error in sorted(qa_results.stage_errors.items()))
+        raise StageFailed(f"QA stages failed: {failures}")
+
+    update_qa_state(trace_id, "completed", qa_results)
+    logger.info(f"QA pipeline completed for trace {trace_id} in {time.perf_counter() - started:.2f}s")
+    return qa_results
@@ -0,0 +1,58 @@
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Callable
+from app.utils.logger import setup_logger
+from .container_pool import SANDBOX_LABEL, OWNER_LABEL, INSTANCE_ID, SANDBOX_MAX_AGE_SECONDS
+
+logger = setup_logger(__name__)
+
+REAPER_INTERVAL_SECONDS = float(os.getenv("QA_REAPER_INTERVAL_SECONDS", "60"))
+# A container of our own that is not tracked yet may just be starting
+OWN_CONTAINER_GRACE_SECONDS = 60
+
+
+def _age_seconds(container) -> float:
+    # Docker reports nanosecond precision ("2025-11-27T10:00:00.123456789Z")
+    created = datetime.strptime(container.attrs["Created"][:19], "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - created).total_seconds()
+
+
+def reap_orphans(client, live_ids: set, max_age: float = SANDBOX_MAX_AGE_SECONDS) -> list[str]:
+    # Our own containers are orphans as soon as nothing tracks them; those of
+    # other API processes (or of crashed ones) only once they are too old
+    removed = []
+    for container in client.containers.list(all=True, filters={"label": SANDBOX_LABEL}):
+        if container.id in live_ids:
+            continue
+        age = _age_seconds(container)
+        own = container.labels.get(OWNER_LABEL) == INSTANCE_ID
+        if age < (OWN_CONTAINER_GRACE_SECONDS if own else max_age):
+            continue
+        try:
+            container.remove(force=True)
+            removed.append(container.id)
+            logger.warning(f"Removed orphaned sandbox container {container.short_id} ({age:.0f}s old)")
+        except Exception as e:
+            logger.warning(f"Failed to remove orphaned sandbox container {container.short_id}: {e}")
+    return removed
+
+
+class SandboxReaper(threading.Thread):
+    def __init__(self, client_factory, live_ids: Callable[[], set], interval: float = REAPER_INTERVAL_SECONDS):
+        super().__init__(name="sandbox-reaper", daemon=True)
+        self.client_factory = client_factory
+        self.live_ids = live_ids
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                reap_orphans(self.client_factory(), self.live_ids())
+            except Exception as e:
+                logger.debug(f"Sandbox reaper pass failed: {e}")
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,185 @@
+import os
+import json
+import shlex
+import threading
+from pathlib import Path
+from typing import Optional
+from app.storage.durability import atomic_write
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+COST_PROFILES_PATH = Path(os.getenv("QA_COST_PROFILES_PATH", "data/qa/cost_profiles.json"))
+# Weight of the newest run in a repo's moving averages
+COST_PROFILE_WEIGHT = float(os.getenv("QA_COST_PROFILE_WEIGHT", "0.2"))
+
+USAGE_FILE = "pr-telemetry-usage"
+USAGE_FIELDS = ("wall_ms", "cpu_ms", "peak_memory_bytes", "io_read_bytes", "io_write_bytes")
+
+# cgroup v2 files first, then their v1 equivalents
+CGROUP_FILES = (
+    "cpu.stat",
+    "io.stat",
+    "memory.peak",
+    "cpuacct/cpuacct.usage",
+    "blkio/blkio.throttle.io_service_bytes",
+    "memory/memory.max_usage_in_bytes",
+)
+
+_profiles_lock = threading.Lock()
+
+
+def _snapshot(label: str) -> str:
+    files = " ".join(CGROUP_FILES)
+    return f'for f in {files}; do [ -r /sys/fs/cgroup/$f ] && echo "## {label} $f" && cat /sys/fs/cgroup/$f; done 2>/dev/null'
+
+
+def with_usage_snapshots(command: str, path: str) -> str:
+    # The container's own cgroup counters are read before and after the
+    # command; the command's exit status is passed through
+    return (
+        f"{_snapshot('before')} > {path}; sh -c {shlex.quote(command)}; status=$?; "
+        f"{_snapshot('after')} >> {path}; exit $status"
+    )
+
+
+def _parse_counters(name: str, lines: list[str]) -> dict[str, int]:
+    counters = {}
+    if name == "cpu.stat":
+        for line in lines:
+            key, _, value = line.partition(" ")
+            if key == "usage_usec":
+                counters["cpu_us"] = int(value)
+    elif name == "cpuacct/cpuacct.usage" and lines:
+        counters["cpu_us"] = int(lines[0]) // 1000
+    elif name == "io.stat":
+        for line in lines:
+            for field in line.split()[1:]:
+                key, _, value = field.partition("=")
+                if key in ("rbytes", "wbytes"):
+                    counters[key] = counters.get(key, 0) + int(value)
+    elif name == "blkio/blkio.throttle.io_service_bytes":
+        for line in lines:
+            parts = line.split()
+            if len(parts) == 3 and parts[1] in ("Read", "Write"):
+                key = "rbytes" if parts[1] == "Read" else "wbytes"
+                counters[key] = counters.get(key, 0) + int(parts[2])
+    elif name in ("memory.peak", "memory/memory.max_usage_in_bytes") and lines:
+        counters["memory_peak"] = int(lines[0])
+    return counters
+
+
+def parse_cgroup_snapshots(text: str) -> dict[str, dict[str, int]]:
+    # {"before": {...}, "after": {...}} with cpu_us, rbytes, wbytes and
+    # memory_peak where the cgroup exposes them
+    snapshots = {}
+    sections = []
+    for line in text.splitlines():
+        if line.startswith("## "):
+            label, _, name = line[3:].partition(" ")
+            sections.append((label, name, []))
+        elif sections:
+            sections[-1][2].append(line.strip())
+    for label, name, lines in sections:
+        try:
+            snapshots.setdefault(label, {}).update(_parse_counters(name, lines))
+        except ValueError:
+            continue
+    return snapshots
+
+
+class ResourceUsage:
+    # Accumulates the usage of every command run in one sandbox, shards
+    # included: CPU and I/O add up, peak memory is the largest single peak
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cpu_ms = None
+        self.peak_memory_bytes = None
+        self.io_read_bytes = None
+        self.io_write_bytes = None
+
+    def add(self, cpu_ms: Optional[int] = None, peak_memory_bytes: Optional[int] = None,
+            io_read_bytes: Optional[int] = None, io_write_bytes: Optional[int] = None) -> None:
+        with self._lock:
+            if cpu_ms is not None:
+                self.cpu_ms = (self.cpu_ms or 0) + cpu_ms
+            if peak_memory_bytes is not None:
+                self.peak_memory_bytes = max(self.peak_memory_bytes or 0, peak_memory_bytes)
+            if io_read_bytes is not None:
+                self.io_read_bytes = (self.io_read_bytes or 0) + io_read_bytes
+            if io_write_bytes is not None:
+                self.io_write_bytes = (self.io_write_bytes or 0) + io_write_bytes
+
+    def add_rusage(self, rusage) -> None:
+        # Linux reports ru_maxrss in KiB and block counts in 512-byte units
+        self.add(
+            cpu_ms=int((rusage.ru_utime + rusage.ru_stime) * 1000),
+            peak_memory_bytes=rusage.ru_maxrss * 1024,
+            io_read_bytes=rusage.ru_inblock * 512,
+            io_write_bytes=rusage.ru_oublock * 512,
+        )
+
+    def add_cgroup(self, text: Optional[str]) -> None:
+        if not text:
+            return
+        snapshots = parse_cgroup_snapshots(text)
+        before, after = snapshots.get("before", {}), snapshots.get("after", {})
+
+        def delta(key):
+            return max(0, after[key] - before.get(key, 0)) if key in after else None
+
+        cpu_us = delta("cpu_us")
+        # The cgroup peak covers the container's lifetime, so for a reused
+        # pool container it is an upper bound for this command
+        self.add(
+            cpu_ms=cpu_us // 1000 if cpu_us is not None else None,
+            peak_memory_bytes=after.get("memory_peak"),
+            io_read_bytes=delta("rbytes"),
+            io_write_bytes=delta("wbytes"),
+        )
+
+    def result(self, wall_seconds: float) -> dict:
+        with self._lock:
+            return {
+                "wall_ms": int(wall_seconds * 1000),
+                "cpu_ms": self.cpu_ms,
+                "peak_memory_bytes": self.peak_memory_bytes,
+                "io_read_bytes": self.io_read_bytes,
+                "io_write_bytes": self.io_write_bytes,
+            }
+
+
+def load_cost_profiles() -> dict[str, dict]:
+    try:
+        return json.loads(COST_PROFILES_PATH.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def record_cost_profile(repo_key: str, usage: dict) -> None:
+    # Per repo: run count, exponential moving averages and the maximum of
+    # every measured field
+    with _profiles_lock:
+        profiles = load_cost_profiles()
+        profile = profiles.setdefault(repo_key, {"runs": 0, "avg": {}, "max": {}})
+        profile["runs"] += 1
+        for field in USAGE_FIELDS:
+            value = usage.get(field)
+            if value is None:
+                continue
+            previous = profile["avg"].get(field)
+            profile["avg"][field] = value if previous is None else round(
+                previous + COST_PROFILE_WEIGHT * (value - previous)
+            )
+            profile["max"][field] = max(profile["max"].get(field, 0), value)
+        COST_PROFILES_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(COST_PROFILES_PATH, lambda path: open(path, "w"), durable=False) as f:
+            json.dump(profiles, f)
+
+
+def estimate_cost(repo_key: str) -> Optional[dict]:
+    # Expected usage of the repo's next test run, or None without history
+    profile = load_cost_profiles().get(repo_key)
+    if not profile or not profile["avg"]:
+        return None
+    return {"runs": profile["runs"], **profile["avg"]}
@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+from app.storage.durability import atomic_write
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+RESULT_CACHE_ENABLED = os.getenv("QA_RESULT_CACHE", "1") == "1"
+RESULT_CACHE_DIR = Path(os.getenv("QA_RESULT_CACHE_DIR", "data/test_results"))
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("QA_RESULT_CACHE_TTL_SECONDS", str(24 * 3600)))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("QA_RESULT_CACHE_MAX_ENTRIES", "1000"))
+
+IGNORED_DIRS = {".git", "__pycache__", ".pytest_cache", ".mypy_cache", ".venv", "node_modules"}
+
+
+def _repo_files(repo_path: Path) -> list[Path]:
+    files = []
+    for root, dirs, names in os.walk(repo_path):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+        files.extend(Path(root) / name for name in sorted(names) if not name.endswith(".pyc"))
+    return files
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResultCache:
+    def __init__(self, ttl_seconds: float = RESULT_CACHE_TTL_SECONDS, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._content_hashes = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def content_hash(self, repo_path: Path) -> str:
+        # File contents are only re-read when a file's size or mtime changed
+        files = _repo_files(repo_path)
+        signature = hashlib.sha256()
+        for path in files:
+            stat = path.stat()
+            signature.update(f"{path.relative_to(repo_path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode("utf-8"))
+        signature = signature.hexdigest()
+
+        cached = self._content_hashes.get(str(repo_path))
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        digest = hashlib.sha256()
+        for path in files:
+            digest.update(str(path.relative_to(repo_path)).encode("utf-8") + b"\0" + path.read_bytes() + b"\0")
+        content_hash = digest.hexdigest()
+        self._content_hashes[str(repo_path)] = (signature, content_hash)
+        return content_hash
+
+    def key(self, repo_path: Path, test_command: str, image: str) -> str:
+        parts = [self.content_hash(repo_path), test_command, image]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _directory(self) -> Path:
+        return RESULT_CACHE_DIR
+
+    def _path(self, key: str) -> Path:
+        return self._directory() / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if time.time() - entry["stored_at"] > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        return entry["result"]
+
+    def put(self, key: str, result: dict) -> None:
+        self._directory().mkdir(parents=True, exist_ok=True)
+        with atomic_write(self._path(key), lambda path: open(path, "w")) as f:
+            json.dump({"stored_at": time.time(), "result": result}, f)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = list(self._directory().glob("*.json"))
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda path: path.stat().st_mtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            path.unlink(missing_ok=True)
+
+    def run(self, key: str, execute: Callable[[], dict], cacheable: Callable[[dict], bool]) -> tuple[dict, bool]:
+        # Returns (result, served_from_cache). Identical runs that overlap
+        # share the one in flight instead of starting their own container
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached, True
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            self.coalesced += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.result), True
+
+        try:
+            # The previous leader may have stored its result after our lookup
+            cached = self.get(key)
+            if cached is not None:
+                self.hits += 1
+                flight.result = cached
+                return dict(cached), True
+            self.misses += 1
+            flight.result = execute()
+            if cacheable(flight.result):
+                self.put(key, flight.result)
+            return dict(flight.result), False
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
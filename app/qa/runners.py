@@ -0,0 +1,178 @@
+import os
+import sys
+import shutil
+import signal
+import platform
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from typing import Callable, Optional
+from app.utils.logger import setup_logger
+from .output_capture import BoundedOutput
+from .junit import REPORT_FILE, REPORT_MAX_BYTES
+from .resource_usage import ResourceUsage
+
+logger = setup_logger(__name__)
+
+RUNNER_BACKEND = os.getenv("QA_RUNNER_BACKEND", "docker")
+# Per-repo overrides, e.g. "sample_repo=local,other_repo=docker"
+RUNNER_BACKENDS = os.getenv("QA_RUNNER_BACKENDS", "")
+
+LOCAL_CPU_SECONDS = int(os.getenv("QA_LOCAL_CPU_SECONDS", "300"))
+LOCAL_MEMORY_BYTES = int(os.getenv("QA_LOCAL_MEMORY_BYTES", str(2 * 1024 ** 3)))
+LOCAL_FILE_BYTES = int(os.getenv("QA_LOCAL_FILE_BYTES", str(100 * 1024 ** 2)))
+
+COPY_IGNORE = shutil.ignore_patterns(".git", "__pycache__", ".pytest_cache", "*.pyc")
+
+
+def parse_backend_overrides(value: str) -> dict[str, str]:
+    overrides = {}
+    for item in value.split(","):
+        repo, _, backend = item.partition("=")
+        if repo.strip() and backend.strip():
+            overrides[repo.strip()] = backend.strip()
+    return overrides
+
+
+def backend_for_repo(repo_path: str) -> str:
+    return parse_backend_overrides(RUNNER_BACKENDS).get(Path(repo_path).name, RUNNER_BACKEND)
+
+
+class SandboxTimeout(Exception):
+    def __init__(self, timeout: float, output: str = ""):
+        super().__init__(f"Test run exceeded {timeout}s timeout")
+        self.timeout = timeout
+        self.output = output
+
+
+class Sandbox:
+    # One prepared test environment: command is what runs the suite there,
+    # and run executes any shell command (e.g. a shard) in a fresh copy and
+    # returns (exit code, bounded output, JUnit report or None); the usage of
+    # every run is added to usage
+    def __init__(
+        self,
+        command: str,
+        run: Callable[[str], tuple[int, str, Optional[bytes]]],
+        shardable: bool = True,
+        usage: Optional[ResourceUsage] = None,
+    ):
+        self.command = command
+        self.run = run
+        self.shardable = shardable
+        self.usage = usage or ResourceUsage()
+
+
+def _limited_shell(command: str) -> list[str]:
+    # Limits are set by the shell itself rather than a preexec_fn, which can
+    # deadlock a child forked from this multi-threaded server before exec.
+    # ulimit -v counts KiB and -f counts 512-byte blocks
+    limits = " && ".join([
+        f"ulimit -t {LOCAL_CPU_SECONDS}",
+        f"ulimit -v {LOCAL_MEMORY_BYTES // 1024}",
+        f"ulimit -f {LOCAL_FILE_BYTES // 512}",
+        "ulimit -c 0",
+    ])
+    return ["sh", "-c", f'{limits} && exec sh -c "$1"', "sh", command]
+
+
+def _drain(stream, output: BoundedOutput) -> None:
+    with stream:
+        for chunk in iter(lambda: stream.read1(65536), b""):
+            output.feed(chunk)
+
+
+def _wait(process: subprocess.Popen, timeout: Optional[float]):
+    # wait4 reaps the child and returns its rusage (which includes every
+    # descendant it waited for); Popen is then told the exit status
+    waited = {}
+
+    def reap():
+        _, status, rusage = os.wait4(process.pid, 0)
+        waited["status"], waited["rusage"] = status, rusage
+
+    waiter = threading.Thread(target=reap, daemon=True)
+    waiter.start()
+    waiter.join(timeout)
+    if waiter.is_alive():
+        _kill_group(process.pid)
+        waiter.join()
+        raise subprocess.TimeoutExpired(process.args, timeout)
+    process.returncode = os.waitstatus_to_exitcode(waited["status"])
+    return waited["rusage"]
+
+
+def _kill_group(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class LocalRunner:
+    # For trusted repos only: the process is resource-limited and works on a
+    # private copy, but it shares the host kernel, network and interpreter
+    name = "local"
+
+    def environment(self) -> str:
+        return f"local:{sys.executable}:{platform.python_version()}"
+
+    def resolve(self, repo_path: str) -> tuple[Path, bool]:
+        return Path(repo_path).absolute(), False
+
+    def _env(self, home: Path) -> dict:
+        # Nothing from the API process (tokens, API keys) leaks into the tests
+        path = os.pathsep.join([str(Path(sys.executable).parent), "/usr/local/bin", "/usr/bin", "/bin"])
+        return {
+            "PATH": path,
+            "HOME": str(home),
+            "TMPDIR": str(home),
+            "LANG": "C.UTF-8",
+            "PYTHONDONTWRITEBYTECODE": "1",
+            "PYTHONHASHSEED": "0",
+        }
+
+    def run_command(
+        self,
+        abs_repo_path: Path,
+        command: str,
+        timeout: Optional[float] = None,
+        usage: Optional[ResourceUsage] = None,
+    ) -> tuple[int, str, Optional[bytes]]:
+        with tempfile.TemporaryDirectory(prefix="qa-local-") as tmp:
+            workdir = Path(tmp) / "repo"
+            shutil.copytree(abs_repo_path, workdir, ignore=COPY_IGNORE, symlinks=True)
+
+            process = subprocess.Popen(
+                _limited_shell(command),
+                cwd=workdir,
+                env=self._env(Path(tmp)),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+            output = BoundedOutput()
+            reader = threading.Thread(target=_drain, args=(process.stdout, output), daemon=True)
+            reader.start()
+            try:
+                rusage = _wait(process, timeout)
+            except subprocess.TimeoutExpired:
+                reader.join()
+                raise SandboxTimeout(timeout, output.text())
+            finally:
+                # Background processes the tests started die with the group
+                _kill_group(process.pid)
+            reader.join()
+            if usage is not None:
+                usage.add_rusage(rusage)
+
+            report_path = Path(tmp) / REPORT_FILE
+            report = report_path.read_bytes() if report_path.is_file() and report_path.stat().st_size <= REPORT_MAX_BYTES else None
+
+        return process.returncode, output.text(), report
+
+    def sandbox(self, repo_path: str, abs_repo_path: Path, test_command: str, timeout: Optional[float] = None) -> Sandbox:
+        usage = ResourceUsage()
+        return Sandbox(test_command, lambda command: self.run_command(abs_repo_path, command, timeout, usage), usage=usage)
@@ -0,0 +1,163 @@
+import os
+import re
+import json
+import heapq
+import shlex
+import threading
+from pathlib import Path
+from statistics import median
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from app.storage.durability import atomic_write
+from app.utils.logger import setup_logger
+from .junit import REPORT_OPTION, junit_key, parse_junit
+
+logger = setup_logger(__name__)
+
+TEST_SHARDING_ENABLED = os.getenv("QA_TEST_SHARDING", "0") == "1"
+SHARD_CPU_BUDGET = int(os.getenv("QA_SHARD_CPU_BUDGET", str(os.cpu_count() or 1)))
+SHARD_MAX = int(os.getenv("QA_SHARD_MAX", "8"))
+SHARD_MIN_TESTS = int(os.getenv("QA_SHARD_MIN_TESTS", "20"))
+TEST_DURATIONS_PATH = Path(os.getenv("QA_TEST_DURATIONS_PATH", "data/qa/test_durations.json"))
+
+DEFAULT_TEST_SECONDS = 1.0
+
+# Every shard container counts against one CPU budget shared by all finalizes
+shard_slots = threading.BoundedSemaphore(SHARD_CPU_BUDGET)
+_durations_lock = threading.Lock()
+
+DURATION_LINE = re.compile(r"^\s*([0-9.]+)s\s+(?:setup|call|teardown)\s+(\S.*?)\s*$")
+FAILED_LINE = re.compile(r"^(?:FAILED|ERROR) (\S+?)(?: - .*)?$")
+SHARD_OPTIONS = "-rfE --durations=0 --durations-min=0 -p no:cacheprovider"
+
+RunCommand = Callable[[str], tuple[int, str, Optional[bytes]]]
+
+
+def is_pytest(test_command: str) -> bool:
+    try:
+        args = shlex.split(test_command)
+    except ValueError:
+        return False
+    return bool(args) and (args[0] == "pytest" or args[:3] == ["python", "-m", "pytest"])
+
+
+def shard_count(test_count: int, cpu_budget: Optional[int] = None) -> int:
+    cpu_budget = SHARD_CPU_BUDGET if cpu_budget is None else cpu_budget
+    return max(1, min(cpu_budget, SHARD_MAX, test_count // max(1, SHARD_MIN_TESTS)))
+
+
+def parse_collected(output: str) -> list[str]:
+    return [line.strip() for line in output.splitlines() if "::" in line and not line.startswith(" ")]
+
+
+def parse_durations(output: str) -> dict[str, float]:
+    durations = {}
+    for line in output.splitlines():
+        match = DURATION_LINE.match(line)
+        if match:
+            durations[match.group(2)] = durations.get(match.group(2), 0.0) + float(match.group(1))
+    return durations
+
+
+def parse_failures(output: str) -> list[str]:
+    return [match.group(1) for match in map(FAILED_LINE.match, output.splitlines()) if match]
+
+
+def load_durations(repo_key: str) -> dict[str, float]:
+    try:
+        return json.loads(TEST_DURATIONS_PATH.read_text()).get(repo_key, {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def record_durations(repo_key: str, durations: dict[str, float]) -> None:
+    if not durations:
+        return
+    with _durations_lock:
+        try:
+            stored = json.loads(TEST_DURATIONS_PATH.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            stored = {}
+        stored.setdefault(repo_key, {}).update(durations)
+        TEST_DURATIONS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(TEST_DURATIONS_PATH, lambda path: open(path, "w"), durable=False) as f:
+            json.dump(stored, f)
+
+
+def split_shards(node_ids: list[str], shards: int, durations: dict[str, float]) -> list[list[str]]:
+    # Longest tests first onto the least loaded shard; tests without
+    # history are assumed to take the median known duration
+    default = median(durations.values()) if durations else DEFAULT_TEST_SECONDS
+    weighted = sorted(node_ids, key=lambda node_id: (-durations.get(node_id, default), node_id))
+    heap = [(0.0, index) for index in range(shards)]
+    assignment = [[] for _ in range(shards)]
+    for node_id in weighted:
+        load, index = heapq.heappop(heap)
+        assignment[index].append(node_id)
+        heapq.heappush(heap, (load + durations.get(node_id, default), index))
+    return [shard for shard in assignment if shard]
+
+
+def report_durations(node_ids: list[str], test_cases: list[dict]) -> dict[str, float]:
+    by_key = {(case["classname"], case["name"]): case["duration_ms"] / 1000 for case in test_cases}
+    return {node_id: by_key[junit_key(node_id)] for node_id in node_ids if junit_key(node_id) in by_key}
+
+
+def merge_results(results: list[tuple[int, str]]) -> tuple[int, str, list[str]]:
+    exit_codes = [exit_code for exit_code, _ in results]
+    # A crashed shard (-1) or any pytest error code outranks plain test failures
+    exit_code = 0 if not any(exit_codes) else (-1 if -1 in exit_codes else max(exit_codes))
+    failures = [failure for _, output in results for failure in parse_failures(output)]
+
+    sections = [f"{len(results)} shards, exit codes {exit_codes}"]
+    if failures:
+        sections.append("Failures:\n" + "\n".join(failures))
+    sections.extend(
+        f"=== shard {index + 1}/{len(results)} (exit {code}) ===\n{output}"
+        for index, (code, output) in enumerate(results)
+    )
+    return exit_code, "\n".join(sections), failures
+
+
+def run_sharded(repo_key: str, test_command: str, run_command: RunCommand) -> Optional[dict]:
+    # Returns None when the suite is too small to shard or collection fails,
+    # and the caller then runs the command unsharded
+    exit_code, output, _ = run_command(f"{test_command} --collect-only -q -p no:cacheprovider")
+    node_ids = parse_collected(output)
+    if exit_code != 0 or not node_ids:
+        logger.warning(f"Test collection for {repo_key} failed (exit {exit_code}), running unsharded")
+        return None
+
+    shards = shard_count(len(node_ids))
+    if shards <= 1:
+        return None
+
+    groups = split_shards(node_ids, shards, load_durations(repo_key))
+    logger.info(f"Running {len(node_ids)} tests for {repo_key} in {len(groups)} shards")
+
+    def run_shard(node_ids: list[str]) -> tuple[int, str, Optional[bytes]]:
+        with shard_slots:
+            return run_command(f"pytest {SHARD_OPTIONS} {REPORT_OPTION} " + " ".join(shlex.quote(n) for n in node_ids))
+
+    with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="qa-shard") as pool:
+        results = list(pool.map(run_shard, groups))
+
+    # The JUnit report is exact; the --durations text may have been cut
+    # from the bounded output, so it only fills in what the report lacks
+    durations = {}
+    test_cases = []
+    for group, (_, shard_output, report) in zip(groups, results):
+        shard_cases = parse_junit(report)
+        test_cases.extend(shard_cases)
+        durations.update(parse_durations(shard_output))
+        durations.update(report_durations(group, shard_cases))
+    record_durations(repo_key, durations)
+
+    exit_code, output, failures = merge_results([(code, shard_output) for code, shard_output, _ in results])
+    return {
+        "exit_code": exit_code,
+        "output": output,
+        "test_shards": len(groups),
+        "test_failures": failures,
+        "test_cases": test_cases,
+    }
@@ -0,0 +1,190 @@
+import os
+import ast
+import json
+import shlex
+import threading
+from pathlib import Path
+from collections import deque
+from typing import Optional
+from app.storage.durability import atomic_write
+from app.utils.logger import setup_logger
+from .result_cache import IGNORED_DIRS
+
+logger = setup_logger(__name__)
+
+TEST_IMPACT_ENABLED = os.getenv("QA_TEST_IMPACT", "0") == "1"
+# With 0 the impacted subset's verdict is final and the full suite is skipped
+TEST_IMPACT_FULL_RUN = os.getenv("QA_TEST_IMPACT_FULL_RUN", "1") == "1"
+IMPORT_GRAPH_DIR = Path(os.getenv("QA_IMPORT_GRAPH_DIR", "data/import_graphs"))
+
+SOURCE_ROOTS = ("", "src")
+
+# pytest options that change neither which tests run nor how they pass;
+# they are kept on the narrowed command
+OUTPUT_OPTIONS = ("-q", "-qq", "-v", "-vv", "-s", "--no-header", "--color=no")
+OUTPUT_OPTION_PREFIXES = ("--tb=", "-r")
+
+_graphs = {}
+_graphs_lock = threading.Lock()
+
+
+def is_test_file(path: str) -> bool:
+    name = path.rsplit("/", 1)[-1]
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def _python_files(repo_path: Path) -> list[str]:
+    files = []
+    for root, dirs, names in os.walk(repo_path):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS)
+        for name in sorted(names):
+            if name.endswith(".py"):
+                files.append((Path(root) / name).relative_to(repo_path).as_posix())
+    return files
+
+
+def _module_candidates(module: str, base_dirs: list[str]) -> list[str]:
+    relative = module.replace(".", "/")
+    candidates = []
+    for base in base_dirs:
+        prefix = f"{base}/" if base else ""
+        candidates += [f"{prefix}{relative}.py", f"{prefix}{relative}/__init__.py"]
+    return candidates
+
+
+def _imports(source: str, path: str) -> list[tuple[str, list[str]]]:
+    # (module, imported names) pairs with relative imports made absolute
+    tree = ast.parse(source, filename=path)
+    package = path.rsplit("/", 1)[0].replace("/", ".") if "/" in path else ""
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.extend((alias.name, []) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            if node.level:
+                parts = package.split(".") if package else []
+                parts = parts[:len(parts) - (node.level - 1)] if node.level > 1 else parts
+                module = ".".join(p for p in parts + [module] if p)
+            found.append((module, [alias.name for alias in node.names]))
+    return found
+
+
+def build_import_graph(repo_path: Path) -> dict[str, list[str]]:
+    # file -> repo files it imports, resolved against the repo root, a src/
+    # layout and the importing file's own directory
+    files = _python_files(repo_path)
+    known = set(files)
+    graph = {}
+    for path in files:
+        try:
+            imports = _imports((repo_path / path).read_text(encoding="utf-8", errors="replace"), path)
+        except SyntaxError:
+            graph[path] = []
+            continue
+        base_dirs = list(SOURCE_ROOTS) + [path.rsplit("/", 1)[0] if "/" in path else ""]
+        edges = set()
+        for module, names in imports:
+            for target in [module] + [f"{module}.{name}" if module else name for name in names]:
+                edges.update(c for c in _module_candidates(target, base_dirs) if c in known)
+        # Importing a.b.c runs the __init__ of every parent package too
+        for target in list(edges):
+            parent = target.rsplit("/", 1)[0] if "/" in target else ""
+            while parent:
+                if f"{parent}/__init__.py" in known:
+                    edges.add(f"{parent}/__init__.py")
+                parent = parent.rsplit("/", 1)[0] if "/" in parent else ""
+        edges.discard(path)
+        graph[path] = sorted(edges)
+    return graph
+
+
+def load_import_graph(repo_path: Path, revision: str) -> dict[str, list[str]]:
+    # Built once per repo revision and kept in memory and on disk
+    with _graphs_lock:
+        graph = _graphs.get(revision)
+    if graph is not None:
+        return graph
+
+    cache_path = IMPORT_GRAPH_DIR / f"{revision}.json"
+    try:
+        graph = json.loads(cache_path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        graph = build_import_graph(repo_path)
+        IMPORT_GRAPH_DIR.mkdir(parents=True, exist_ok=True)
+        with atomic_write(cache_path, lambda path: open(path, "w"), durable=False) as f:
+            json.dump(graph, f)
+        logger.info(f"Built import graph for {repo_path} ({len(graph)} files)")
+
+    with _graphs_lock:
+        _graphs[revision] = graph
+    return graph
+
+
+def match_repo_file(edited_path: str, repo_files: set) -> Optional[str]:
+    # Edited paths come from the developer's machine, so they are matched on
+    # the longest trailing run of path components
+    parts = Path(edited_path.replace("\\", "/")).parts
+    for start in range(len(parts)):
+        candidate = "/".join(parts[start:])
+        if candidate in repo_files:
+            return candidate
+    return None
+
+
+def affected_tests(graph: dict[str, list[str]], edited_paths: list[str]) -> Optional[list[str]]:
+    # None means the impact cannot be determined (e.g. a non-Python file or
+    # a file outside the repo changed) and the full suite has to run
+    repo_files = set(graph)
+    dependents = {}
+    for path, imports in graph.items():
+        for target in imports:
+            dependents.setdefault(target, set()).add(path)
+
+    seeds = set()
+    for edited in edited_paths:
+        path = match_repo_file(edited, repo_files)
+        if path is None:
+            return None
+        seeds.add(path)
+
+    affected = set()
+    queue = deque(seeds)
+    while queue:
+        path = queue.popleft()
+        if path in affected:
+            continue
+        affected.add(path)
+        queue.extend(dependents.get(path, ()))
+
+    tests = {path for path in affected if is_test_file(path)}
+    # A conftest.py applies to every test below its directory
+    for path in affected:
+        if path.endswith("conftest.py"):
+            directory = path[:-len("conftest.py")]
+            tests.update(p for p in repo_files if p.startswith(directory) and is_test_file(p))
+    return sorted(tests)
+
+
+def impacted_command(test_command: str, test_files: list[str]) -> Optional[str]:
+    # Only pytest invocations without their own selection can be narrowed:
+    # paths, node ids, -k, -m and other options may exclude impacted tests
+    # or change the verdict, so such commands get no subset run
+    try:
+        args = shlex.split(test_command)
+    except ValueError:
+        return None
+    for prefix in (["pytest"], ["python", "-m", "pytest"]):
+        if args[:len(prefix)] != prefix:
+            continue
+        options = args[len(prefix):]
+        if not all(option in OUTPUT_OPTIONS or option.startswith(OUTPUT_OPTION_PREFIXES) for option in options):
+            return None
+        return " ".join(prefix + [shlex.quote(arg) for arg in options + test_files])
+    return None
+
+
+def select_impacted_tests(repo_path: Path, revision: str, edited_paths: list[str]) -> Optional[list[str]]:
+    if not edited_paths:
+        return None
+    return affected_tests(load_import_graph(repo_path, revision), edited_paths)
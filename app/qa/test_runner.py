@@ -1,91 +1,282 @@
+import time
 from pathlib import Path
 import docker
 import socket
+import requests
+import threading
 from typing import Optional
 from app.utils.logger import setup_logger
+from .container_pool import ContainerPool, CONTAINER_POOL_SIZE, SANDBOX_IMAGE, sandbox_limits, read_report, read_usage, USAGE_PATH
+from .output_capture import BoundedOutput, snippet
+from .junit import REPORT_OPTION, parse_junit
+from .image_cache import ImageCache, IMAGE_CACHE_ENABLED
+from .result_cache import ResultCache, RESULT_CACHE_ENABLED
+from .sharding import TEST_SHARDING_ENABLED, is_pytest, run_sharded
+from .runners import LocalRunner, Sandbox, SandboxTimeout, backend_for_repo
+from .resource_usage import ResourceUsage, with_usage_snapshots
 
 logger = setup_logger(__name__)
 
+_client = None
+_client_lock = threading.Lock()
+_host_paths = {}
+_oneshot_ids = set()
+_oneshot_lock = threading.Lock()
+
+
+def get_docker_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = docker.from_env()
+        return _client
+
 
 def _get_host_sample_repo_path() -> Optional[Path]:
+    # The API container's mounts never change while it runs, so a successful
+    # lookup (including "not mounted") is kept for the life of the process
+    if "sample_repo" in _host_paths:
+        return _host_paths["sample_repo"]
     try:
-        client = docker.from_env()
+        client = get_docker_client()
         hostname = socket.gethostname()
         container = client.containers.get(hostname)
         mounts = container.attrs.get("Mounts", [])
+        host_path = None
         for mount in mounts:
             if mount.get("Destination") == "/app/sample_repo":
                 source = mount.get("Source")
                 if source:
-                    return Path(source)
+                    host_path = Path(source)
+                    break
+        _host_paths["sample_repo"] = host_path
+        return host_path
+    except docker.errors.NotFound:
+        _host_paths["sample_repo"] = None
     except Exception as e:
         logger.debug(f"Failed to detect host sample_repo path: {e}")
     return None
 
 
-def run_tests_in_docker(repo_path: str, test_command: str, timeout: int = 300) -> dict:
+container_pool = ContainerPool(get_docker_client)
+image_cache = ImageCache(get_docker_client)
+result_cache = ResultCache()
+
+
+def resolve_repo_path(repo_path: str) -> tuple[Path, bool]:
+    if repo_path == "sample_repo":
+        host_repo_path = _get_host_sample_repo_path()
+        if host_repo_path is not None:
+            logger.info(f"Using host sample_repo path: {host_repo_path}")
+            return host_repo_path, True
+    return Path(repo_path).absolute(), False
+
+
+def select_sandbox(repo_path: str, test_command: str) -> tuple[str, str, bool]:
+    # Returns (image, command, network). With a cached dependency image the
+    # tests run without an install step and without network access
+    if IMAGE_CACHE_ENABLED:
+        try:
+            image = image_cache.ensure_image(Path(repo_path).absolute())
+            if image is None:
+                return SANDBOX_IMAGE, test_command, True
+            return image, test_command, False
+        except Exception as e:
+            logger.warning(f"Dependency image unavailable for {repo_path}, installing at run time: {e}")
+    return SANDBOX_IMAGE, f"pip install -q -r requirements.txt 2>/dev/null && {test_command}", True
+
+
+def prewarm_container_pool() -> int:
+    if CONTAINER_POOL_SIZE <= 0 or backend_for_repo("sample_repo") != "docker":
+        return 0
     try:
-        logger.info(f"Starting Docker test execution: repo={repo_path}, command={test_command}")
-        client = docker.from_env()
-
-        is_host_path = False
-
-        if repo_path == "sample_repo":
-            host_repo_path = _get_host_sample_repo_path()
-            if host_repo_path is not None:
-                abs_repo_path = host_repo_path
-                is_host_path = True
-                logger.info(f"Using host sample_repo path: {abs_repo_path}")
-            else:
-                abs_repo_path = Path(repo_path).absolute()
+        abs_repo_path, _ = resolve_repo_path("sample_repo")
+        image, _, network = select_sandbox("sample_repo", "")
+        started = container_pool.prewarm(abs_repo_path, image, network)
+        logger.info(f"Pre-warmed {started} sandbox containers")
+        return started
+    except Exception as e:
+        logger.warning(f"Could not pre-warm sandbox containers: {e}")
+        return 0
+
+
+def _run_command(
+    abs_repo_path: Path,
+    command: str,
+    image: str,
+    network: bool,
+    timeout: Optional[float] = None,
+    usage: Optional[ResourceUsage] = None,
+) -> tuple[int, str, Optional[bytes]]:
+    if CONTAINER_POOL_SIZE > 0:
+        return container_pool.run(abs_repo_path, command, image, network, timeout, usage)
+
+    client = get_docker_client()
+    full_command = f"cd /app && {command}"
+    if usage is not None:
+        full_command = with_usage_snapshots(full_command, USAGE_PATH)
+    try:
+        container = client.containers.run(
+            image=image,
+            command=["sh", "-c", full_command],
+            volumes={str(abs_repo_path): {"bind": "/app", "mode": "ro"}},
+            working_dir="/app",
+            network_disabled=not network,
+            detach=True,
+            **sandbox_limits(),
+        )
+    except Exception as e:
+        return -1, str(e), None
+
+    with _oneshot_lock:
+        _oneshot_ids.add(container.id)
+    try:
+        timed_out = False
+        try:
+            status = container.wait(timeout=timeout)
+        except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
+            container.kill()
+            timed_out = True
+
+        output = BoundedOutput()
+        for chunk in container.logs(stream=True, follow=False):
+            output.feed(chunk)
+        if timed_out:
+            raise SandboxTimeout(timeout, output.text())
+        if usage is not None:
+            usage.add_cgroup(read_usage(container))
+        return status["StatusCode"], output.text(), read_report(container)
+    finally:
+        try:
+            container.remove(force=True)
+        except Exception as e:
+            logger.warning(f"Failed to remove sandbox container {container.short_id}: {e}")
+        with _oneshot_lock:
+            _oneshot_ids.discard(container.id)
+
+
+def live_sandbox_ids() -> set:
+    with _oneshot_lock:
+        return container_pool.live_ids() | _oneshot_ids
+
+
+class DockerRunner:
+    name = "docker"
+
+    def environment(self) -> str:
+        return SANDBOX_IMAGE
+
+    def resolve(self, repo_path: str) -> tuple[Path, bool]:
+        return resolve_repo_path(repo_path)
+
+    def sandbox(self, repo_path: str, abs_repo_path: Path, test_command: str, timeout: Optional[float] = None) -> Sandbox:
+        image, command, network = select_sandbox(repo_path, test_command)
+        usage = ResourceUsage()
+        # With the install fallback every shard would repeat the pip install
+        return Sandbox(
+            command,
+            lambda shard_command: _run_command(abs_repo_path, shard_command, image, network, timeout, usage),
+            shardable=command == test_command,
+            usage=usage,
+        )
+
+
+runners = {"docker": DockerRunner(), "local": LocalRunner()}
+
+
+def get_runner(repo_path: str, backend: Optional[str] = None):
+    name = backend or backend_for_repo(repo_path)
+    if name not in runners:
+        raise ValueError(f"Unknown test runner backend: {name}")
+    return runners[name]
+
+
+def _execute_tests(repo_path: str, abs_repo_path: Path, test_command: str, runner=None, timeout: Optional[float] = None) -> dict:
+    runner = runner or runners["docker"]
+    sandbox = runner.sandbox(repo_path, abs_repo_path, test_command, timeout)
+    sharded = None
+    pytest_run = is_pytest(test_command)
+    started = time.perf_counter()
+
+    try:
+        if TEST_SHARDING_ENABLED and sandbox.shardable and pytest_run:
+            sharded = run_sharded(repo_path, test_command, sandbox.run)
+
+        if sharded is not None:
+            exit_code, output, test_cases = sharded["exit_code"], sharded["output"], sharded["test_cases"]
         else:
-            abs_repo_path = Path(repo_path).absolute()
+            # pytest also writes a JUnit report, parsed into per-test outcomes
+            command = f"{sandbox.command} {REPORT_OPTION}" if pytest_run else sandbox.command
+            exit_code, output, report = sandbox.run(command)
+            test_cases = parse_junit(report)
+    except SandboxTimeout as e:
+        logger.warning(f"Tests on {runner.name} runner timed out after {e.timeout}s")
+        return {
+            "tests_passed": False,
+            "test_exit_code": -1,
+            "test_status": "timeout",
+            "test_output_snippet": snippet(f"{e.output}\n{e}" if e.output else str(e)),
+            "test_usage": sandbox.usage.result(time.perf_counter() - started),
+        }
+
+    usage = sandbox.usage.result(time.perf_counter() - started)
+    output_snippet = snippet(output) if output else "No output"
+
+    logger.info(f"Tests completed on {runner.name} runner: exit_code={exit_code}, usage={usage}")
+
+    result = {
+        "tests_passed": exit_code == 0,
+        "test_exit_code": exit_code,
+        "test_status": "passed" if exit_code == 0 else ("error" if exit_code == -1 else "failed"),
+        "test_output_snippet": output_snippet,
+        "test_cases": test_cases,
+        "test_usage": usage,
+    }
+    if sharded is not None:
+        result["test_shards"] = sharded["test_shards"]
+        result["test_failures"] = sharded["test_failures"]
+    return result
+
+
+def run_tests_in_docker(repo_path: str, test_command: str, timeout: int = 300, backend: Optional[str] = None) -> dict:
+    # Kept under its original name; the backend comes from QA_RUNNER_BACKEND,
+    # a per-repo QA_RUNNER_BACKENDS entry or the explicit argument
+    try:
+        runner = get_runner(repo_path, backend)
+        logger.info(f"Starting test execution: runner={runner.name}, repo={repo_path}, command={test_command}")
+        abs_repo_path, is_host_path = runner.resolve(repo_path)
 
         if not is_host_path and not abs_repo_path.exists():
             logger.error(f"Repository path not found: {abs_repo_path}")
             return {
                 "tests_passed": False,
                 "test_exit_code": -1,
+                "test_status": "error",
                 "test_output_snippet": f"Repository path not found: {abs_repo_path}"
             }
 
-        full_command = f"cd /app && pip install -q -r requirements.txt 2>/dev/null && {test_command}"
-
-        try:
-            container = client.containers.run(
-                image="python:3.11-slim",
-                command=["sh", "-c", full_command],
-                volumes={str(abs_repo_path): {"bind": "/app", "mode": "ro"}},
-                working_dir="/app",
-                detach=False,
-                stdout=True,
-                stderr=True,
-                remove=True
+        local_repo_path = Path(repo_path).absolute()
+        if RESULT_CACHE_ENABLED and local_repo_path.is_dir():
+            # Timeouts and infrastructure failures are not cached so they are retried
+            key = result_cache.key(local_repo_path, test_command, runner.environment())
+            result, cached = result_cache.run(
+                key,
+                lambda: _execute_tests(repo_path, abs_repo_path, test_command, runner, timeout),
+                lambda result: result["test_status"] in ("passed", "failed"),
             )
-            output = container.decode("utf-8")
-            exit_code = 0
-        except docker.errors.ContainerError as e:
-            output = e.stderr.decode("utf-8") if e.stderr else str(e)
-            exit_code = e.exit_status
-        except Exception as e:
-            output = str(e)
-            exit_code = -1
-
-        output_snippet = output[:2000] if output else "No output"
-
-        logger.info(f"Docker tests completed: exit_code={exit_code}")
+            if cached:
+                logger.info(f"Served test results from cache: exit_code={result['test_exit_code']}")
+        else:
+            result, cached = _execute_tests(repo_path, abs_repo_path, test_command, runner, timeout), False
 
-        return {
-            "tests_passed": exit_code == 0,
-            "test_exit_code": exit_code,
-            "test_output_snippet": output_snippet
-        }
+        return {**result, "tests_cached": cached}
 
     except docker.errors.DockerException as e:
         logger.error(f"Docker error: {str(e)}")
         return {
             "tests_passed": False,
             "test_exit_code": -1,
+            "test_status": "error",
             "test_output_snippet": f"Docker error: {str(e)}"
         }
     except Exception as e:
@@ -93,5 +284,6 @@ def run_tests_in_docker(repo_path: str, test_command: str, timeout: int = 300) -
         return {
             "tests_passed": False,
             "test_exit_code": -1,
+            "test_status": "error",
             "test_output_snippet": f"Unexpected error: {str(e)}"
         }
\ No newline at end of file
@@ -1,3 +1,46 @@
-from .file_store import save_trace, load_trace, trace_exists, append_events
+import os
+from dotenv import load_dotenv
 
-__all__ = ["save_trace", "load_trace", "trace_exists", "append_events"]
\ No newline at end of file
+load_dotenv()
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "file")
+
+if STORAGE_BACKEND == "sqlite":
+    from .sqlite_store import (
+        save_trace,
+        save_traces,
+        load_trace,
+        trace_exists,
+        append_events,
+        compact_trace,
+        list_traces,
+        read_events,
+        update_qa_state,
+    )
+elif STORAGE_BACKEND == "file":
+    from .file_store import (
+        save_trace,
+        save_traces,
+        load_trace,
+        trace_exists,
+        append_events,
+        compact_trace,
+        list_traces,
+        read_events,
+        update_qa_state,
+    )
+else:
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+__all__ = [
+    "save_trace",
+    "save_traces",
+    "load_trace",
+    "trace_exists",
+    "append_events",
+    "compact_trace",
+    "list_traces",
+    "read_events",
+    "update_qa_state",
+    "STORAGE_BACKEND",
+]
@@ -0,0 +1,60 @@
+import os
+import zlib
+import hashlib
+from pathlib import Path
+from .durability import atomic_write
+
+BLOB_DIR = Path(os.getenv("BLOB_DIR", "data/blobs"))
+BLOB_MIN_CHARS = int(os.getenv("BLOB_MIN_CHARS", "4096"))
+BLOB_REF_PREFIX = "blob:sha256:"
+
+EXTERNALIZED_FIELDS = {
+    "code_edit": ("diff", "snapshot_after"),
+    "terminal_command": ("output",),
+}
+
+
+def _blob_path(digest: str) -> Path:
+    return BLOB_DIR / digest[:2] / f"{digest}.z"
+
+
+def is_blob_ref(value) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_REF_PREFIX)
+
+
+def put_blob(content: str) -> str:
+    raw = content.encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    path = _blob_path(digest)
+
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path, lambda tmp_path: open(tmp_path, "wb")) as f:
+            f.write(zlib.compress(raw, 6))
+
+    return BLOB_REF_PREFIX + digest
+
+
+def get_blob(ref: str) -> str:
+    digest = ref[len(BLOB_REF_PREFIX):]
+    path = _blob_path(digest)
+    if not path.exists():
+        raise FileNotFoundError(f"Blob {digest} not found")
+    return zlib.decompress(path.read_bytes()).decode("utf-8")
+
+
+def externalize_event(event: dict) -> dict:
+    data = event.get("data") or {}
+    for field in EXTERNALIZED_FIELDS.get(event.get("event_type"), ()):
+        value = data.get(field)
+        if isinstance(value, str) and not is_blob_ref(value) and len(value) >= BLOB_MIN_CHARS:
+            data[field] = put_blob(value)
+    return event
+
+
+def resolve_event(event: dict) -> dict:
+    data = event.get("data") or {}
+    for field in EXTERNALIZED_FIELDS.get(event.get("event_type"), ()):
+        if is_blob_ref(data.get(field)):
+            data[field] = get_blob(data[field])
+    return event
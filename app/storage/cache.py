@@ -0,0 +1,93 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+from app.models import Trace
+
+TRACE_CACHE_MAX_BYTES = int(os.getenv("TRACE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def _detached(trace: Trace) -> Trace:
+    # Events are never mutated in place, so copying the containers callers
+    # do mutate keeps the cached object safe without a deep copy
+    update = {"events": list(trace.events)}
+    if trace.qa_results is not None:
+        update["qa_results"] = trace.qa_results.model_copy(deep=True)
+    return trace.model_copy(update=update)
+
+
+class TraceCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, trace_id: str, variant: Hashable, token: Hashable) -> Optional[Trace]:
+        key = (trace_id, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            cached_token, size, trace = entry
+            if cached_token != token:
+                del self._entries[key]
+                self.current_bytes -= size
+                self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _detached(trace)
+
+    def put(self, trace_id: str, variant: Hashable, token: Hashable, trace: Trace, size: int) -> Trace:
+        if size > self.max_bytes:
+            return trace
+
+        key = (trace_id, variant)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+
+            self._entries[key] = (token, size, trace)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+        return _detached(trace)
+
+    def invalidate(self, trace_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == trace_id]:
+                self.current_bytes -= self._entries.pop(key)[1]
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+trace_cache = TraceCache(TRACE_CACHE_MAX_BYTES)
@@ -0,0 +1,43 @@
+import os
+import gzip
+import lzma
+from pathlib import Path
+from typing import IO
+
+TRACE_CODEC = os.getenv("TRACE_CODEC", "json")
+
+CODEC_SUFFIXES = {
+    "json": ".json",
+    "gzip": ".json.gz",
+    "lzma": ".json.xz",
+}
+
+
+def suffix_for(codec: str) -> str:
+    if codec not in CODEC_SUFFIXES:
+        raise ValueError(f"Unknown trace codec: {codec}")
+    return CODEC_SUFFIXES[codec]
+
+
+def codec_for(path: Path) -> str:
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if codec != "json" and path.name.endswith(suffix):
+            return codec
+    return "json"
+
+
+def open_write(path: Path, codec: str) -> IO[str]:
+    if codec == "gzip":
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    if codec == "lzma":
+        return lzma.open(path, "wt", encoding="utf-8", preset=3)
+    return open(path, "w", encoding="utf-8")
+
+
+def open_read(path: Path) -> IO[str]:
+    codec = codec_for(path)
+    if codec == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if codec == "lzma":
+        return lzma.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
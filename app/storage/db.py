@@ -0,0 +1,34 @@
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+_local = threading.local()
+
+
+def connect(path: Path, schema: str) -> sqlite3.Connection:
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    key = str(path)
+    conn = connections.get(key)
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(key, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(schema)
+        connections[key] = conn
+    return conn
+
+
+def utc(value: datetime) -> datetime:
+    # Naive timestamps are taken to be UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def epoch(value: datetime) -> float:
+    return utc(value).timestamp()
@@ -0,0 +1,118 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from uuid import uuid4
+from app.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+FSYNC_ENABLED = os.getenv("TRACE_FSYNC", "1") == "1"
+GROUP_COMMIT_MS = float(os.getenv("TRACE_GROUP_COMMIT_MS", "0"))
+
+
+def fsync_path(path: Path) -> None:
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(directory: Path) -> None:
+    try:
+        fsync_path(directory)
+    except OSError:
+        # Directories cannot be opened for fsync on every platform
+        pass
+
+
+@contextmanager
+def atomic_write(path: Path, opener, durable: bool = True):
+    # durable=False still never exposes a torn file, but after a crash the
+    # rename may be lost or the file empty; only for derived data
+    tmp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+    try:
+        with opener(tmp_path) as f:
+            yield f
+        if FSYNC_ENABLED and durable:
+            fsync_path(tmp_path)
+        os.replace(tmp_path, path)
+        if FSYNC_ENABLED and durable:
+            _fsync_dir(path.parent)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class GroupCommitter:
+    def __init__(self, window_ms: float):
+        self.window = window_ms / 1000
+        self._cond = threading.Condition()
+        self._pending = set()
+        self._open_generation = 1
+        self._committed_generation = 0
+        self._leader_active = False
+        self._failed = {}
+        self.batches = 0
+
+    def sync(self, path: Path) -> None:
+        with self._cond:
+            self._pending.add(str(path))
+            generation = self._open_generation
+            while self._committed_generation < generation:
+                if not self._leader_active:
+                    self._leader_active = True
+                    break
+                self._cond.wait()
+            else:
+                error = self._failed.get(generation)
+                if error is not None:
+                    raise error
+                return
+
+        time.sleep(self.window)
+
+        with self._cond:
+            batch, self._pending = self._pending, set()
+            generation = self._open_generation
+            self._open_generation += 1
+
+        error = None
+        for pending_path in batch:
+            try:
+                fsync_path(Path(pending_path))
+            except FileNotFoundError:
+                # Compacted away in the meantime; its replacement was synced on write
+                continue
+            except OSError as e:
+                logger.error(f"Group commit fsync failed for {pending_path}: {e}")
+                error = e
+
+        with self._cond:
+            self._committed_generation = generation
+            self._leader_active = False
+            self.batches += 1
+            if error is not None:
+                self._failed[generation] = error
+            for stale in [g for g in self._failed if g < generation - 64]:
+                del self._failed[stale]
+            self._cond.notify_all()
+
+        if error is not None:
+            raise error
+
+
+group_committer = GroupCommitter(GROUP_COMMIT_MS)
+
+
+def sync_append(path: Path) -> None:
+    if not FSYNC_ENABLED:
+        return
+    if group_committer.window > 0:
+        group_committer.sync(path)
+        return
+    try:
+        fsync_path(path)
+    except FileNotFoundError:
+        pass
@@ -1,42 +1,540 @@
+import os
 import json
+import hashlib
 from pathlib import Path
+from typing import Optional
 from uuid import uuid4
-from app.models import Trace
+from datetime import datetime
+from pydantic import BaseModel, TypeAdapter
+from app.models import Trace, Event, QAResults
+from app.utils.logger import setup_logger
+from . import trace_index, codec, offset_index
+from .blob_store import externalize_event, resolve_event
+from .cache import trace_cache
+from .locks import trace_lock
+from .durability import atomic_write, sync_append
+from .db import epoch, utc
+
+logger = setup_logger(__name__)
 
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 
+APPEND_MODE = os.getenv("TRACE_APPEND_MODE", "segment")
+SEGMENT_COMPACT_BYTES = int(os.getenv("TRACE_SEGMENT_COMPACT_BYTES", str(4 * 1024 * 1024)))
+SHARD_DEPTH = int(os.getenv("TRACE_SHARD_DEPTH", "0"))
+SHARD_WIDTH = int(os.getenv("TRACE_SHARD_WIDTH", "2"))
+
+_event_adapter = TypeAdapter(Event)
+
+
+def _shard_dir(trace_id: str, depth: int = None) -> Path:
+    depth = SHARD_DEPTH if depth is None else depth
+    if depth <= 0:
+        return DATA_DIR
+    digest = hashlib.sha1(trace_id.encode("utf-8")).hexdigest()
+    parts = [digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(depth)]
+    return DATA_DIR.joinpath(*parts)
+
+
+def _candidate_dirs(trace_id: str) -> list[Path]:
+    # New writes go to the configured layout; the other layout is still read
+    # so traces stay reachable while a layout migration is running
+    preferred = _shard_dir(trace_id)
+    legacy = _shard_dir(trace_id, depth=0)
+    return [preferred] if preferred == legacy else [preferred, legacy]
+
+
+def _trace_path(trace_id: str, codec_name: str = None, directory: Path = None) -> Path:
+    directory = directory or _shard_dir(trace_id)
+    return directory / f"{trace_id}{codec.suffix_for(codec_name or codec.TRACE_CODEC)}"
+
+
+def _existing_trace_paths(trace_id: str) -> list[Path]:
+    paths = [
+        _trace_path(trace_id, codec_name, directory)
+        for directory in _candidate_dirs(trace_id)
+        for codec_name in codec.CODEC_SUFFIXES
+    ]
+    return [path for path in paths if path.exists()]
+
+
+def _find_trace_file(trace_id: str) -> Path:
+    preferred = _trace_path(trace_id)
+    if preferred.exists():
+        return preferred
+    existing = _existing_trace_paths(trace_id)
+    if not existing:
+        raise FileNotFoundError(f"Trace {trace_id} not found")
+    return existing[0]
+
+
+def _write_document(trace_id: str, data: dict, codec_name: str = None) -> Path:
+    codec_name = codec_name or codec.TRACE_CODEC
+    file_path = _trace_path(trace_id, codec_name)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    records = None
+    if codec_name == "json":
+        with atomic_write(file_path, lambda path: open(path, "wb")) as f:
+            records = offset_index.dump_document(data, f)
+    else:
+        with atomic_write(file_path, lambda path: codec.open_write(path, codec_name)) as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    for stale_path in _existing_trace_paths(trace_id):
+        if stale_path != file_path:
+            stale_path.unlink(missing_ok=True)
+
+    index_path = _offset_index_path(trace_id, file_path.parent)
+    if records is None:
+        index_path.unlink(missing_ok=True)
+    else:
+        # A segment left behind (re-encoding keeps it) is picked up by the
+        # catch-up scan on the next range read
+        stat = file_path.stat()
+        offset_index.write_index(
+            index_path, offset_index.OffsetIndex((stat.st_mtime_ns, stat.st_size), 0, records)
+        )
+    return file_path
+
+
+def _read_document_text(trace_id: str) -> str:
+    # Decompression streams, but the decoded document is held in full: the
+    # stdlib json parser has no incremental mode, and the text length sizes
+    # the trace cache entry
+    with codec.open_read(_find_trace_file(trace_id)) as f:
+        return f.read()
+
+
+def _read_document(trace_id: str) -> dict:
+    return json.loads(_read_document_text(trace_id))
+
+
+def _segment_path(trace_id: str, directory: Path = None) -> Path:
+    if directory is None:
+        directory = _find_trace_file(trace_id).parent
+    return directory / f"{trace_id}.events.jsonl"
+
+
+def _offset_index_path(trace_id: str, directory: Path) -> Path:
+    return directory / f"{trace_id}.idx"
+
+
+def _existing_segment_paths(trace_id: str) -> list[Path]:
+    paths = [_segment_path(trace_id, directory) for directory in _candidate_dirs(trace_id)]
+    return [path for path in paths if path.exists()]
+
+
+def _cache_token(trace_id: str) -> tuple:
+    file_path = _find_trace_file(trace_id)
+    stat = file_path.stat()
+    segment_tokens = []
+    for segment_path in _existing_segment_paths(trace_id):
+        try:
+            segment_stat = segment_path.stat()
+        except FileNotFoundError:
+            continue
+        segment_tokens.append((str(segment_path), segment_stat.st_mtime_ns, segment_stat.st_size))
+    return (str(file_path), stat.st_mtime_ns, stat.st_size, tuple(segment_tokens))
+
+
+def _event_json(event) -> str:
+    data = event.model_dump(mode="json") if isinstance(event, BaseModel) else event
+    return json.dumps(externalize_event(data), default=str)
+
+
+def _load_offset_index(trace_id: str, file_path: Path) -> Optional[offset_index.OffsetIndex]:
+    index_path = _offset_index_path(trace_id, file_path.parent)
+    segment_path = _segment_path(trace_id, file_path.parent)
+    stat = file_path.stat()
+    document_token = (stat.st_mtime_ns, stat.st_size)
+    segment_size = segment_path.stat().st_size if segment_path.exists() else 0
+
+    index = offset_index.read_index(index_path)
+    if index is not None and index.document_token == document_token and index.segment_bytes <= segment_size:
+        if index.segment_bytes == segment_size:
+            return index
+
+        # Catch up on segment lines appended while the index was not updated,
+        # dropping any records a crash left beyond the recorded watermark
+        with open(segment_path, "rb") as f:
+            f.seek(index.segment_bytes)
+            tail = f.read()
+        new_records, covered = offset_index.scan_segment(tail, base=index.segment_bytes)
+        index.records = [
+            record for record in index.records
+            if record[1] == offset_index.SOURCE_DOCUMENT or record[2] < index.segment_bytes
+        ] + new_records
+        index.segment_bytes = covered
+        offset_index.write_index(index_path, index)
+        return index
+
+    try:
+        records = offset_index.scan_document(file_path.read_bytes())
+    except (ValueError, IndexError, KeyError) as e:
+        logger.warning(f"Could not scan trace {trace_id} for event offsets: {e}")
+        records = None
+    if records is None:
+        return None
+
+    covered = 0
+    if segment_path.exists():
+        segment_records, covered = offset_index.scan_segment(segment_path.read_bytes())
+        records += segment_records
+
+    index = offset_index.OffsetIndex(document_token, covered, records)
+    offset_index.write_index(index_path, index)
+    logger.info(f"Rebuilt event offset index for trace {trace_id} ({len(records)} events)")
+    return index
+
+
+def _read_segment_file(trace_id: str, segment_path: Path) -> list[dict]:
+    try:
+        with open(segment_path, "r") as f:
+            lines = f.read().split("\n")
+    except FileNotFoundError:
+        return []
+
+    events = []
+    for index, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError:
+            # Only the trailing line can be torn by a crash mid-append
+            if index == len(lines) - 1:
+                logger.warning(f"Ignoring torn trailing line in event segment for trace {trace_id}")
+                break
+            raise
+    return events
+
+
+def _read_segment(trace_id: str) -> list[dict]:
+    events = []
+    for segment_path in _existing_segment_paths(trace_id):
+        events.extend(_read_segment_file(trace_id, segment_path))
+    return events
+
+
+def _store_trace(trace: Trace) -> None:
+    if not trace.trace_id:
+        trace.trace_id = str(uuid4())
+
+    data = trace.model_dump(mode="json")
+    data["events"] = [externalize_event(event) for event in data["events"]]
+
+    with trace_lock(trace.trace_id):
+        _write_document(trace.trace_id, data)
+        trace_cache.invalidate(trace.trace_id)
+
+        # The saved document is the full trace, so any pending segment is now stale
+        for segment_path in _existing_segment_paths(trace.trace_id):
+            segment_path.unlink(missing_ok=True)
+
 
 def save_trace(trace: Trace) -> str:
     if not trace.trace_id:
         trace.trace_id = str(uuid4())
-    
-    file_path = DATA_DIR / f"{trace.trace_id}.json"
-    with open(file_path, "w") as f:
-        json.dump(json.loads(trace.model_dump_json()), f, indent=2)
-    
+
+    with trace_lock(trace.trace_id):
+        _store_trace(trace)
+        trace_index.index_trace(trace)
+
     return trace.trace_id
 
 
-def load_trace(trace_id: str) -> Trace:
-    file_path = DATA_DIR / f"{trace_id}.json"
-    
-    if not file_path.exists():
-        raise FileNotFoundError(f"Trace {trace_id} not found")
-    
-    with open(file_path, "r") as f:
-        data = json.load(f)
-    
-    return Trace.model_validate(data)
+def save_traces(traces: list[Trace]) -> list[str]:
+    # Documents are written one by one, but the listing index is updated in a
+    # single transaction for the whole batch
+    for trace in traces:
+        _store_trace(trace)
+    trace_index.index_traces(traces)
+    return [trace.trace_id for trace in traces]
+
+
+def load_trace(trace_id: str, resolve_blobs: bool = True) -> Trace:
+    token = _cache_token(trace_id)
+    cached = trace_cache.get(trace_id, resolve_blobs, token)
+    if cached is not None:
+        return cached
+
+    # Reading under the trace lock keeps a concurrent save from pairing the
+    # new document with the segment it is about to delete
+    with trace_lock(trace_id):
+        token = _cache_token(trace_id)
+        text = _read_document_text(trace_id)
+        segment_events = _read_segment(trace_id)
+
+    data = json.loads(text)
+    data["events"] = data.get("events", []) + segment_events
+    if resolve_blobs:
+        data["events"] = [resolve_event(event) for event in data["events"]]
+
+    trace = Trace.model_validate(data)
+    if segment_events:
+        # Stored events may be naive while appended ones are UTC-aware
+        trace.events.sort(key=lambda e: epoch(e.timestamp))
+
+    size = len(text) + sum(segment[2] for segment in token[3])
+    return trace_cache.put(trace_id, resolve_blobs, token, trace, size)
 
 
 def trace_exists(trace_id: str) -> bool:
-    file_path = DATA_DIR / f"{trace_id}.json"
-    return file_path.exists()
+    return bool(_existing_trace_paths(trace_id))
+
+
+def compact_trace(trace_id: str) -> int:
+    with trace_lock(trace_id):
+        segment_events = len(_read_segment(trace_id))
+        if segment_events:
+            save_trace(load_trace(trace_id, resolve_blobs=False))
+            logger.info(f"Compacted {segment_events} segment events into trace {trace_id}")
+    return segment_events
+
+
+def update_qa_state(trace_id: str, qa_status: str, qa_results: QAResults = None) -> None:
+    with trace_lock(trace_id):
+        trace = load_trace(trace_id, resolve_blobs=False)
+        trace.qa_status = qa_status
+        if qa_results is not None:
+            trace.qa_results = qa_results
+        save_trace(trace)
+
+
+def _extend_offset_index(trace_id: str, segment_path: Path, segment_start: int, lines: str) -> None:
+    index_path = _offset_index_path(trace_id, segment_path.parent)
+    header = offset_index.read_header(index_path)
+    if header is None or header[1] != segment_start:
+        # Stale or missing indexes are repaired on the next range read
+        return
+    records, covered = offset_index.scan_segment(lines.encode("utf-8"), base=segment_start)
+    offset_index.append_to_index(index_path, records, covered)
+
+
+def _trim_torn_tail(trace_id: str, segment_path: Path) -> int:
+    # A crash mid-append can leave a partial last line; appending after it
+    # would bury the fragment mid-segment where reads no longer skip it
+    try:
+        f = open(segment_path, "r+b")
+    except FileNotFoundError:
+        return 0
+    with f:
+        size = f.seek(0, 2)
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        if end != size:
+            logger.warning(f"Truncating torn trailing line in event segment for trace {trace_id}")
+            f.truncate(end)
+    return end
+
+
+def _utc_events(events: list) -> list:
+    # Appends may mix naive and aware timestamps with the stored events, so
+    # they are written in UTC and merged by epoch
+    events = [event if isinstance(event, BaseModel) else _event_adapter.validate_python(event) for event in events]
+    return [event.model_copy(update={"timestamp": utc(event.timestamp)}) for event in events]
+
 
 def append_events(trace_id: str, events: list) -> int:
-    trace = load_trace(trace_id)
-    trace.events.extend(events)
-    trace.events.sort(key=lambda e: e.timestamp)
-    save_trace(trace)
-    return len(events)
\ No newline at end of file
+    events = _utc_events(events)
+    if APPEND_MODE != "segment":
+        with trace_lock(trace_id):
+            trace = load_trace(trace_id)
+            trace.events.extend(events)
+            trace.events.sort(key=lambda e: epoch(e.timestamp))
+            save_trace(trace)
+        return len(events)
+
+    lines = "".join(_event_json(event) + "\n" for event in events)
+
+    with trace_lock(trace_id):
+        if not trace_exists(trace_id):
+            raise FileNotFoundError(f"Trace {trace_id} not found")
+
+        segment_path = _segment_path(trace_id)
+        segment_start = _trim_torn_tail(trace_id, segment_path)
+        with open(segment_path, "a") as f:
+            f.write(lines)
+        trace_cache.invalidate(trace_id)
+        _extend_offset_index(trace_id, segment_path, segment_start, lines)
+        trace_index.index_append(trace_id, len(events))
+
+        if segment_path.stat().st_size >= SEGMENT_COMPACT_BYTES:
+            compact_trace(trace_id)
+
+    # Durability is awaited outside the lock so appends to the same trace can
+    # share one fsync when group commit is enabled
+    sync_append(segment_path)
+
+    return len(events)
+
+
+def list_traces(**filters) -> dict:
+    return trace_index.list_traces(**filters)
+
+
+def _read_span(f, offset: int, length: int) -> dict:
+    f.seek(offset)
+    return json.loads(f.read(length))
+
+
+def _read_events_from_trace(trace_id: str, offset: int, limit: int, **filters) -> tuple[list, int]:
+    events = load_trace(trace_id).events
+    records = [
+        (epoch(event.timestamp), offset_index.SOURCE_DOCUMENT, i, 0,
+         offset_index.EVENT_TYPE_CODES.get(event.event_type, 255))
+        for i, event in enumerate(events)
+    ]
+    page, total = offset_index.select(records, offset, limit, **filters)
+    return [events[record[2]] for record in page], total
+
+
+def read_events(
+    trace_id: str,
+    offset: int = 0,
+    limit: int = 100,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+) -> dict:
+    filters = {"start": start, "end": end, "event_type": event_type}
+
+    with trace_lock(trace_id):
+        file_path = _find_trace_file(trace_id)
+        index = None
+        # Compressed documents have no stable byte offsets, and a trace caught
+        # mid-migration has segments in two places; both take the full load
+        if codec.codec_for(file_path) == "json" and len(_existing_segment_paths(trace_id)) <= 1:
+            index = _load_offset_index(trace_id, file_path)
+
+        if index is None:
+            events, total = _read_events_from_trace(trace_id, offset, limit, **filters)
+        else:
+            page, total = offset_index.select(index.records, offset, limit, **filters)
+            raw_events = []
+            with open(file_path, "rb") as document:
+                segment = None
+                try:
+                    for _, source, position, length, _ in page:
+                        if source == offset_index.SOURCE_SEGMENT:
+                            if segment is None:
+                                segment = open(_segment_path(trace_id, file_path.parent), "rb")
+                            raw_events.append(_read_span(segment, position, length))
+                        else:
+                            raw_events.append(_read_span(document, position, length))
+                finally:
+                    if segment is not None:
+                        segment.close()
+            events = [_event_adapter.validate_python(resolve_event(event)) for event in raw_events]
+
+    return {"trace_id": trace_id, "offset": offset, "limit": limit, "total": total, "events": events}
+
+
+def _layout_pattern(depth: int) -> str:
+    return "/".join(["[0-9a-f]" * SHARD_WIDTH] * depth + ["*"])
+
+
+def _iter_trace_ids_at_depth(depth: int):
+    seen = set()
+    for suffix in codec.CODEC_SUFFIXES.values():
+        for file_path in DATA_DIR.glob(f"{_layout_pattern(depth)}{suffix}"):
+            trace_id = file_path.name[: -len(suffix)]
+            if trace_id not in seen:
+                seen.add(trace_id)
+                yield trace_id
+
+
+def iter_trace_ids():
+    seen = set()
+    for depth in sorted({0, SHARD_DEPTH}):
+        for trace_id in _iter_trace_ids_at_depth(depth):
+            if trace_id not in seen:
+                seen.add(trace_id)
+                yield trace_id
+
+
+def iter_unmigrated_trace_ids():
+    if SHARD_DEPTH <= 0:
+        return
+    yield from _iter_trace_ids_at_depth(0)
+
+
+def migrate_trace_layout(trace_id: str) -> int:
+    with trace_lock(trace_id):
+        return _migrate_trace_layout(trace_id)
+
+
+def _migrate_trace_layout(trace_id: str) -> int:
+    target_dir = _shard_dir(trace_id)
+    legacy_dir = _shard_dir(trace_id, depth=0)
+    if target_dir == legacy_dir:
+        return 0
+
+    moved_bytes = 0
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for codec_name in codec.CODEC_SUFFIXES:
+        source = _trace_path(trace_id, codec_name, legacy_dir)
+        if source.exists():
+            moved_bytes += source.stat().st_size
+            os.replace(source, _trace_path(trace_id, codec_name, target_dir))
+
+    # Appends may already have started a segment in the new location, so the
+    # legacy segment is folded into it rather than renamed over it
+    legacy_segment = _segment_path(trace_id, legacy_dir)
+    if legacy_segment.exists():
+        target_segment = _segment_path(trace_id, target_dir)
+        moved_bytes += legacy_segment.stat().st_size
+        if target_segment.exists():
+            with open(target_segment, "a") as f:
+                f.write(legacy_segment.read_text())
+            legacy_segment.unlink()
+        else:
+            os.replace(legacy_segment, target_segment)
+
+    _offset_index_path(trace_id, legacy_dir).unlink(missing_ok=True)
+    trace_cache.invalidate(trace_id)
+    return moved_bytes
+
+
+def rebuild_index() -> int:
+    count = 0
+    for trace_id in iter_trace_ids():
+        try:
+            trace_index.index_trace(load_trace(trace_id))
+            count += 1
+        except Exception as e:
+            logger.warning(f"Skipping trace {trace_id} during index rebuild: {e}")
+    logger.info(f"Rebuilt trace index with {count} traces")
+    return count
+
+
+def reencode_trace(trace_id: str, codec_name: str) -> bool:
+    with trace_lock(trace_id):
+        current = _find_trace_file(trace_id)
+        if current == _trace_path(trace_id, codec_name):
+            return False
+        _write_document(trace_id, _read_document(trace_id), codec_name)
+        trace_cache.invalidate(trace_id)
+    return True
+
+
+def reencode_corpus(codec_name: str) -> int:
+    codec.suffix_for(codec_name)
+    count = 0
+    for trace_id in list(iter_trace_ids()):
+        try:
+            if reencode_trace(trace_id, codec_name):
+                count += 1
+        except Exception as e:
+            logger.warning(f"Skipping trace {trace_id} during re-encode: {e}")
+    logger.info(f"Re-encoded {count} traces with codec {codec_name}")
+    return count
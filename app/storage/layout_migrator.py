@@ -0,0 +1,72 @@
+import os
+import time
+import threading
+from typing import Optional
+from app.utils.logger import setup_logger
+from . import file_store
+
+logger = setup_logger(__name__)
+
+MIGRATION_MAX_FILES_PER_SEC = float(os.getenv("TRACE_MIGRATION_MAX_FILES_PER_SEC", "200"))
+MIGRATION_MAX_BYTES_PER_SEC = float(os.getenv("TRACE_MIGRATION_MAX_BYTES_PER_SEC", str(20 * 1024 * 1024)))
+
+
+def migrate_layout(
+    max_files_per_sec: float = MIGRATION_MAX_FILES_PER_SEC,
+    max_bytes_per_sec: float = MIGRATION_MAX_BYTES_PER_SEC,
+    limit: Optional[int] = None,
+    stop_event: Optional[threading.Event] = None,
+) -> dict:
+    # Migrated traces leave the legacy directory, so an interrupted run picks
+    # up where it stopped simply by scanning again
+    started = time.monotonic()
+    migrated = 0
+    moved_bytes = 0
+    failed = 0
+
+    for trace_id in file_store.iter_unmigrated_trace_ids():
+        if stop_event is not None and stop_event.is_set():
+            break
+        if limit is not None and migrated >= limit:
+            break
+
+        try:
+            moved_bytes += file_store.migrate_trace_layout(trace_id)
+            migrated += 1
+        except Exception as e:
+            failed += 1
+            logger.warning(f"Failed to migrate trace {trace_id} to sharded layout: {e}")
+            continue
+
+        elapsed = time.monotonic() - started
+        budget = max(
+            migrated / max_files_per_sec if max_files_per_sec > 0 else 0,
+            moved_bytes / max_bytes_per_sec if max_bytes_per_sec > 0 else 0,
+        )
+        if budget > elapsed:
+            if stop_event is not None:
+                stop_event.wait(budget - elapsed)
+            else:
+                time.sleep(budget - elapsed)
+
+    logger.info(f"Layout migration pass finished: migrated={migrated} failed={failed} bytes={moved_bytes}")
+    return {"migrated": migrated, "failed": failed, "bytes": moved_bytes}
+
+
+class LayoutMigrator(threading.Thread):
+    def __init__(self, interval: float = 60.0, **limits):
+        super().__init__(name="trace-layout-migrator", daemon=True)
+        self.interval = interval
+        self.limits = limits
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            result = migrate_layout(stop_event=self.stop_event, **self.limits)
+            if result["migrated"] == 0 and result["failed"] == 0:
+                logger.info("No legacy traces left to migrate")
+                return
+            self.stop_event.wait(self.interval if result["failed"] else 0)
+
+    def stop(self):
+        self.stop_event.set()
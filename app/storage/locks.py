@@ -0,0 +1,55 @@
+import os
+import zlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+LOCK_STRIPES = int(os.getenv("TRACE_LOCK_STRIPES", "256"))
+LOCK_FILE = Path(os.getenv("TRACE_LOCK_FILE", "data/.trace_locks"))
+
+_stripe_locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+_held = threading.local()
+_lock_fds = {}
+_lock_fds_guard = threading.Lock()
+
+
+def _stripe(trace_id: str) -> int:
+    return zlib.crc32(trace_id.encode("utf-8")) % LOCK_STRIPES
+
+
+def _lock_fd() -> int:
+    # POSIX record locks are dropped when *any* descriptor for the file is
+    # closed, so each process keeps a single descriptor open for its lifetime
+    key = str(LOCK_FILE)
+    with _lock_fds_guard:
+        fd = _lock_fds.get(key)
+        if fd is None:
+            LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(key, os.O_RDWR | os.O_CREAT, 0o644)
+            _lock_fds[key] = fd
+        return fd
+
+
+@contextmanager
+def trace_lock(trace_id: str):
+    stripe = _stripe(trace_id)
+    depths = getattr(_held, "depths", None)
+    if depths is None:
+        depths = _held.depths = {}
+
+    with _stripe_locks[stripe]:
+        depth = depths.get(stripe, 0)
+        if depth == 0 and fcntl is not None:
+            fcntl.lockf(_lock_fd(), fcntl.LOCK_EX, 1, stripe, os.SEEK_SET)
+        depths[stripe] = depth + 1
+        try:
+            yield
+        finally:
+            depths[stripe] = depth
+            if depth == 0 and fcntl is not None:
+                fcntl.lockf(_lock_fd(), fcntl.LOCK_UN, 1, stripe, os.SEEK_SET)
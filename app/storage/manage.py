@@ -0,0 +1,36 @@
+import argparse
+from app.utils.logger import setup_logger
+from . import file_store, codec, layout_migrator
+
+logger = setup_logger(__name__)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.storage.manage")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild-index", help="Rebuild the trace listing index from data/")
+    reencode = subparsers.add_parser("reencode", help="Re-encode stored traces with another codec")
+    reencode.add_argument("--codec", required=True, choices=sorted(codec.CODEC_SUFFIXES))
+    migrate = subparsers.add_parser("migrate-layout", help="Move flat data/ traces into the sharded layout")
+    migrate.add_argument("--max-files-per-sec", type=float, default=layout_migrator.MIGRATION_MAX_FILES_PER_SEC)
+    migrate.add_argument("--max-bytes-per-sec", type=float, default=layout_migrator.MIGRATION_MAX_BYTES_PER_SEC)
+    migrate.add_argument("--limit", type=int, default=None)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild-index":
+        file_store.rebuild_index()
+    elif args.command == "reencode":
+        file_store.reencode_corpus(args.codec)
+    elif args.command == "migrate-layout":
+        if file_store.SHARD_DEPTH <= 0:
+            parser.error("Set TRACE_SHARD_DEPTH to a positive value before migrating")
+        layout_migrator.migrate_layout(
+            max_files_per_sec=args.max_files_per_sec,
+            max_bytes_per_sec=args.max_bytes_per_sec,
+            limit=args.limit,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from .db import epoch
+from .durability import atomic_write
+
+EVENT_TYPES = [
+    "file_open",
+    "file_close",
+    "code_edit",
+    "terminal_command",
+    "test_result",
+    "reasoning_step",
+]
+EVENT_TYPE_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+
+SOURCE_DOCUMENT = 0
+SOURCE_SEGMENT = 1
+
+MAGIC = b"TIDX"
+HEADER = struct.Struct("<4sHqqq")
+RECORD = struct.Struct("<dBQIB")
+
+_EVENTS_KEY = re.compile(rb'"events"\s*:\s*\[')
+_decoder = json.JSONDecoder()
+
+
+class OffsetIndex:
+    def __init__(self, document_token: tuple, segment_bytes: int, records: list[tuple]):
+        self.document_token = document_token
+        self.segment_bytes = segment_bytes
+        self.records = records
+
+
+def event_record(event: dict, source: int, offset: int, length: int) -> tuple:
+    timestamp = epoch(datetime.fromisoformat(event["timestamp"]))
+    return (timestamp, source, offset, length, EVENT_TYPE_CODES.get(event.get("event_type"), 255))
+
+
+def dump_document(data: dict, f) -> list[tuple]:
+    # Events go last so each one's byte span can be recorded while writing
+    events = data.get("events", [])
+    header = {key: value for key, value in data.items() if key != "events"}
+    head = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    prefix = head[:-1] + (b"," if header else b"") + b'"events":['
+    f.write(prefix)
+
+    position = len(prefix)
+    records = []
+    for i, event in enumerate(events):
+        if i:
+            f.write(b",")
+            position += 1
+        raw = json.dumps(event, separators=(",", ":")).encode("utf-8")
+        f.write(raw)
+        records.append(event_record(event, SOURCE_DOCUMENT, position, len(raw)))
+        position += len(raw)
+
+    f.write(b"]}")
+    return records
+
+
+def scan_document(raw: bytes) -> Optional[list[tuple]]:
+    match = _EVENTS_KEY.search(raw)
+    if match is None:
+        return None
+
+    text = raw.decode("utf-8")
+    if len(text) != len(raw):
+        # Character positions from the decoder only equal byte offsets for ASCII
+        return None
+
+    records = []
+    position = match.end()
+    while True:
+        while text[position] in " \t\r\n,":
+            position += 1
+        if text[position] == "]":
+            return records
+        event, end = _decoder.raw_decode(text, position)
+        records.append(event_record(event, SOURCE_DOCUMENT, position, end - position))
+        position = end
+
+
+def scan_segment(raw: bytes, base: int = 0) -> tuple[list[tuple], int]:
+    records = []
+    position = 0
+    while position < len(raw):
+        newline = raw.find(b"\n", position)
+        if newline == -1:
+            # Torn or still-being-written trailing line
+            break
+        line = raw[position:newline]
+        if line.strip():
+            event = json.loads(line)
+            records.append(event_record(event, SOURCE_SEGMENT, base + position, len(line)))
+        position = newline + 1
+    return records, base + position
+
+
+def select(
+    records: list[tuple],
+    offset: int,
+    limit: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+) -> tuple[list[tuple], int]:
+    # Mirrors load_trace: saved order is kept unless appended events are present
+    ordered = list(records)
+    if any(record[1] == SOURCE_SEGMENT for record in ordered):
+        ordered.sort(key=lambda record: record[0])
+
+    start_ts = epoch(start) if start is not None else None
+    end_ts = epoch(end) if end is not None else None
+    type_code = EVENT_TYPE_CODES.get(event_type) if event_type is not None else None
+
+    matched = [
+        record
+        for record in ordered
+        if (type_code is None or record[4] == type_code)
+        and (start_ts is None or record[0] >= start_ts)
+        and (end_ts is None or record[0] < end_ts)
+    ]
+    return matched[offset:offset + limit], len(matched)
+
+
+def write_index(path: Path, index: OffsetIndex) -> None:
+    # The index is rebuilt whenever it is missing or stale, so it skips fsync
+    with atomic_write(path, lambda tmp_path: open(tmp_path, "wb"), durable=False) as f:
+        f.write(HEADER.pack(MAGIC, 1, *index.document_token, index.segment_bytes))
+        f.write(b"".join(RECORD.pack(*record) for record in index.records))
+
+
+def append_to_index(path: Path, records: list[tuple], segment_bytes: int) -> None:
+    with open(path, "r+b") as f:
+        f.seek(0, 2)
+        f.write(b"".join(RECORD.pack(*record) for record in records))
+        f.seek(0)
+        magic, version, mtime_ns, size, _ = HEADER.unpack(f.read(HEADER.size))
+        f.seek(0)
+        f.write(HEADER.pack(magic, version, mtime_ns, size, segment_bytes))
+
+
+def read_header(path: Path) -> Optional[tuple[tuple, int]]:
+    # Appends only need the covered segment length, not the records
+    try:
+        with open(path, "rb") as f:
+            raw = f.read(HEADER.size)
+            file_size = os.fstat(f.fileno()).st_size
+    except FileNotFoundError:
+        return None
+    if len(raw) < HEADER.size:
+        return None
+
+    magic, version, mtime_ns, size, segment_bytes = HEADER.unpack(raw)
+    if magic != MAGIC or version != 1 or (file_size - HEADER.size) % RECORD.size:
+        return None
+    return (mtime_ns, size), segment_bytes
+
+
+def read_index(path: Path) -> Optional[OffsetIndex]:
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    if len(raw) < HEADER.size:
+        return None
+
+    magic, version, mtime_ns, size, segment_bytes = HEADER.unpack_from(raw)
+    if magic != MAGIC or version != 1 or (len(raw) - HEADER.size) % RECORD.size:
+        return None
+
+    records = list(RECORD.iter_unpack(memoryview(raw)[HEADER.size:]))
+    return OffsetIndex((mtime_ns, size), segment_bytes, records)
@@ -0,0 +1,297 @@
+import os
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+from pydantic import BaseModel, TypeAdapter
+from app.models import Trace, Event, QAResults
+from app.utils.logger import setup_logger
+from .db import connect, epoch, utc
+from .trace_index import query_traces
+from .blob_store import externalize_event, resolve_event
+from .cache import trace_cache
+
+logger = setup_logger(__name__)
+
+DB_PATH = Path(os.getenv("SQLITE_DB_PATH", "data/traces.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS traces (
+    trace_id TEXT PRIMARY KEY,
+    developer_id TEXT NOT NULL,
+    bug_id TEXT,
+    repo_name TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    tests_passed INTEGER,
+    reasoning_score REAL,
+    event_count INTEGER NOT NULL DEFAULT 0,
+    header TEXT NOT NULL,
+    pending_appends INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_traces_developer ON traces(developer_id, start_time, trace_id);
+CREATE INDEX IF NOT EXISTS idx_traces_bug ON traces(bug_id, start_time, trace_id);
+CREATE INDEX IF NOT EXISTS idx_traces_repo ON traces(repo_name, start_time, trace_id);
+CREATE INDEX IF NOT EXISTS idx_traces_start ON traces(start_time, trace_id);
+CREATE INDEX IF NOT EXISTS idx_traces_tests_passed ON traces(tests_passed, start_time, trace_id);
+CREATE INDEX IF NOT EXISTS idx_traces_score ON traces(reasoning_score, start_time, trace_id);
+
+CREATE TABLE IF NOT EXISTS events (
+    trace_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    event_type TEXT NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (trace_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_events_time ON events(trace_id, timestamp);
+"""
+
+_event_adapter = TypeAdapter(Event)
+
+
+def _connect() -> sqlite3.Connection:
+    return connect(DB_PATH, SCHEMA)
+
+
+def _event_row(trace_id: str, seq: int, event) -> tuple:
+    if not isinstance(event, BaseModel):
+        event = _event_adapter.validate_python(event)
+    body = json.dumps(externalize_event(event.model_dump(mode="json")))
+    return (trace_id, seq, epoch(event.timestamp), event.event_type, body)
+
+
+def _header_row(trace: Trace) -> tuple:
+    header = trace.model_dump_json(exclude={"events"})
+    qa = trace.qa_results
+    return (
+        trace.trace_id,
+        trace.developer_id,
+        trace.bug_id,
+        trace.repo.name,
+        epoch(trace.start_time),
+        None if qa is None or qa.tests_passed is None else int(qa.tests_passed),
+        None if qa is None else qa.reasoning_score,
+        len(trace.events),
+        header,
+    )
+
+
+def _insert_trace(conn: sqlite3.Connection, trace: Trace) -> None:
+    if not trace.trace_id:
+        trace.trace_id = str(uuid4())
+
+    conn.execute(
+        """
+        INSERT INTO traces (trace_id, developer_id, bug_id, repo_name, start_time,
+                            tests_passed, reasoning_score, event_count, header)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(trace_id) DO UPDATE SET
+            developer_id = excluded.developer_id,
+            bug_id = excluded.bug_id,
+            repo_name = excluded.repo_name,
+            start_time = excluded.start_time,
+            tests_passed = excluded.tests_passed,
+            reasoning_score = excluded.reasoning_score,
+            event_count = excluded.event_count,
+            header = excluded.header,
+            pending_appends = 0,
+            version = traces.version + 1
+        """,
+        _header_row(trace),
+    )
+    conn.execute("DELETE FROM events WHERE trace_id = ?", (trace.trace_id,))
+    conn.executemany(
+        "INSERT INTO events (trace_id, seq, timestamp, event_type, body) VALUES (?, ?, ?, ?, ?)",
+        [_event_row(trace.trace_id, seq, event) for seq, event in enumerate(trace.events)],
+    )
+
+
+def save_traces(traces: list[Trace]) -> list[str]:
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for trace in traces:
+            _insert_trace(conn, trace)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    for trace in traces:
+        trace_cache.invalidate(trace.trace_id)
+
+    return [trace.trace_id for trace in traces]
+
+
+def save_trace(trace: Trace) -> str:
+    return save_traces([trace])[0]
+
+
+def load_trace(trace_id: str, resolve_blobs: bool = True) -> Trace:
+    conn = _connect()
+    row = conn.execute("SELECT version FROM traces WHERE trace_id = ?", (trace_id,)).fetchone()
+    if row is None:
+        raise FileNotFoundError(f"Trace {trace_id} not found")
+
+    cached = trace_cache.get(trace_id, resolve_blobs, (str(DB_PATH), row[0]))
+    if cached is not None:
+        return cached
+
+    conn.execute("BEGIN")
+    try:
+        row = conn.execute(
+            "SELECT header, pending_appends, version FROM traces WHERE trace_id = ?", (trace_id,)
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Trace {trace_id} not found")
+        bodies = [
+            body
+            for (body,) in conn.execute(
+                "SELECT body FROM events WHERE trace_id = ? ORDER BY seq", (trace_id,)
+            )
+        ]
+    finally:
+        conn.execute("COMMIT")
+
+    header, pending_appends, version = row
+    data = json.loads(header)
+    data["events"] = [json.loads(body) for body in bodies]
+    if resolve_blobs:
+        data["events"] = [resolve_event(event) for event in data["events"]]
+
+    trace = Trace.model_validate(data)
+    if pending_appends:
+        # By epoch, like the timestamp column read_events orders by; stored
+        # events may be naive while appended ones are UTC-aware
+        trace.events.sort(key=lambda e: epoch(e.timestamp))
+
+    size = len(header) + sum(len(body) for body in bodies)
+    return trace_cache.put(trace_id, resolve_blobs, (str(DB_PATH), version), trace, size)
+
+
+def trace_exists(trace_id: str) -> bool:
+    row = _connect().execute("SELECT 1 FROM traces WHERE trace_id = ?", (trace_id,)).fetchone()
+    return row is not None
+
+
+def compact_trace(trace_id: str) -> int:
+    row = _connect().execute(
+        "SELECT pending_appends FROM traces WHERE trace_id = ?", (trace_id,)
+    ).fetchone()
+    if row is None or not row[0]:
+        return 0
+    save_trace(load_trace(trace_id, resolve_blobs=False))
+    logger.info(f"Renumbered events of trace {trace_id} after {row[0]} appends")
+    return row[0]
+
+
+def update_qa_state(trace_id: str, qa_status: str, qa_results: QAResults = None) -> None:
+    # Only the header row changes, so events are left untouched
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT header FROM traces WHERE trace_id = ?", (trace_id,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Trace {trace_id} not found")
+
+        header = json.loads(row[0])
+        header["qa_status"] = qa_status
+        if qa_results is not None:
+            header["qa_results"] = qa_results.model_dump(mode="json")
+        qa = header.get("qa_results") or {}
+        conn.execute(
+            "UPDATE traces SET header = ?, tests_passed = ?, reasoning_score = ?, version = version + 1 "
+            "WHERE trace_id = ?",
+            (
+                json.dumps(header),
+                None if qa.get("tests_passed") is None else int(qa["tests_passed"]),
+                qa.get("reasoning_score"),
+                trace_id,
+            ),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    trace_cache.invalidate(trace_id)
+
+
+def append_events(trace_id: str, events: list) -> int:
+    # Written in UTC so mixed naive and aware timestamps still sort
+    events = [event if isinstance(event, BaseModel) else _event_adapter.validate_python(event) for event in events]
+    events = [event.model_copy(update={"timestamp": utc(event.timestamp)}) for event in events]
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not trace_exists(trace_id):
+            raise FileNotFoundError(f"Trace {trace_id} not found")
+
+        next_seq = conn.execute(
+            "SELECT COALESCE(MAX(seq) + 1, 0) FROM events WHERE trace_id = ?", (trace_id,)
+        ).fetchone()[0]
+        conn.executemany(
+            "INSERT INTO events (trace_id, seq, timestamp, event_type, body) VALUES (?, ?, ?, ?, ?)",
+            [_event_row(trace_id, next_seq + i, event) for i, event in enumerate(events)],
+        )
+        conn.execute(
+            "UPDATE traces SET pending_appends = pending_appends + ?, event_count = event_count + ?, "
+            "version = version + 1 WHERE trace_id = ?",
+            (len(events), len(events), trace_id),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    trace_cache.invalidate(trace_id)
+
+    return len(events)
+
+
+def list_traces(**filters) -> dict:
+    return query_traces(_connect(), "traces", **filters)
+
+
+def read_events(
+    trace_id: str,
+    offset: int = 0,
+    limit: int = 100,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    event_type: Optional[str] = None,
+) -> dict:
+    clauses = ["trace_id = ?"]
+    params = [trace_id]
+    if start is not None:
+        clauses.append("timestamp >= ?")
+        params.append(epoch(start))
+    if end is not None:
+        clauses.append("timestamp < ?")
+        params.append(epoch(end))
+    if event_type is not None:
+        clauses.append("event_type = ?")
+        params.append(event_type)
+    where = " AND ".join(clauses)
+
+    conn = _connect()
+    conn.execute("BEGIN")
+    try:
+        row = conn.execute("SELECT pending_appends FROM traces WHERE trace_id = ?", (trace_id,)).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Trace {trace_id} not found")
+        # Same order load_trace produces: seq order, re-sorted by time once appends arrived
+        order = "timestamp, seq" if row[0] else "seq"
+        total = conn.execute(f"SELECT COUNT(*) FROM events WHERE {where}", params).fetchone()[0]
+        bodies = [
+            body
+            for (body,) in conn.execute(
+                f"SELECT body FROM events WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            )
+        ]
+    finally:
+        conn.execute("COMMIT")
+
+    events = [_event_adapter.validate_python(resolve_event(json.loads(body))) for body in bodies]
+    return {"trace_id": trace_id, "offset": offset, "limit": limit, "total": total, "events": events}
@@ -0,0 +1,172 @@
+import os
+import json
+import base64
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+from app.models import Trace
+from .db import connect, epoch
+
+INDEX_PATH = Path(os.getenv("TRACE_INDEX_PATH", "data/trace_index.db"))
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trace_index (
+    trace_id TEXT PRIMARY KEY,
+    developer_id TEXT NOT NULL,
+    bug_id TEXT,
+    repo_name TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    tests_passed INTEGER,
+    reasoning_score REAL,
+    event_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_index_start ON trace_index(start_time, trace_id);
+CREATE INDEX IF NOT EXISTS idx_index_developer ON trace_index(developer_id, start_time, trace_id);
+CREATE INDEX IF NOT EXISTS idx_index_bug ON trace_index(bug_id, start_time, trace_id);
+CREATE INDEX IF NOT EXISTS idx_index_repo ON trace_index(repo_name, start_time, trace_id);
+CREATE INDEX IF NOT EXISTS idx_index_tests_passed ON trace_index(tests_passed, start_time, trace_id);
+CREATE INDEX IF NOT EXISTS idx_index_score ON trace_index(reasoning_score, start_time, trace_id);
+"""
+
+SUMMARY_COLUMNS = [
+    "trace_id",
+    "developer_id",
+    "bug_id",
+    "repo_name",
+    "start_time",
+    "tests_passed",
+    "reasoning_score",
+    "event_count",
+]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _connect() -> sqlite3.Connection:
+    return connect(INDEX_PATH, SCHEMA)
+
+
+def encode_cursor(start_time: float, trace_id: str) -> str:
+    raw = json.dumps([start_time, trace_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        start_time, trace_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(start_time), str(trace_id)
+    except Exception:
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+
+
+def _index_row(trace: Trace) -> tuple:
+    qa = trace.qa_results
+    return (
+        trace.trace_id,
+        trace.developer_id,
+        trace.bug_id,
+        trace.repo.name,
+        epoch(trace.start_time),
+        None if qa is None or qa.tests_passed is None else int(qa.tests_passed),
+        None if qa is None else qa.reasoning_score,
+        len(trace.events),
+    )
+
+
+def index_traces(traces: list[Trace]) -> None:
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO trace_index (trace_id, developer_id, bug_id, repo_name, start_time,
+                                                tests_passed, reasoning_score, event_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [_index_row(trace) for trace in traces],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def index_trace(trace: Trace) -> None:
+    index_traces([trace])
+
+
+def index_append(trace_id: str, count: int) -> None:
+    _connect().execute(
+        "UPDATE trace_index SET event_count = event_count + ? WHERE trace_id = ?",
+        (count, trace_id),
+    )
+
+
+def query_traces(
+    conn: sqlite3.Connection,
+    table: str,
+    developer_id: Optional[str] = None,
+    repo: Optional[str] = None,
+    bug_id: Optional[str] = None,
+    tests_passed: Optional[bool] = None,
+    min_score: Optional[float] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> dict:
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    clauses = []
+    params = []
+
+    for column, value in [("developer_id", developer_id), ("repo_name", repo), ("bug_id", bug_id)]:
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if tests_passed is not None:
+        clauses.append("tests_passed = ?")
+        params.append(int(tests_passed))
+    if min_score is not None:
+        clauses.append("reasoning_score >= ?")
+        params.append(min_score)
+    if since is not None:
+        clauses.append("start_time >= ?")
+        params.append(epoch(since))
+    if until is not None:
+        clauses.append("start_time < ?")
+        params.append(epoch(until))
+    if cursor is not None:
+        clauses.append("(start_time, trace_id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(
+        f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM {table} {where} "
+        f"ORDER BY start_time DESC, trace_id DESC LIMIT ?",
+        params + [limit + 1],
+    ).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][4], rows[-1][0])
+
+    traces = []
+    for row in rows:
+        summary = dict(zip(SUMMARY_COLUMNS, row))
+        summary["start_time"] = datetime.fromtimestamp(summary["start_time"], tz=timezone.utc)
+        if summary["tests_passed"] is not None:
+            summary["tests_passed"] = bool(summary["tests_passed"])
+        traces.append(summary)
+
+    return {"traces": traces, "next_cursor": next_cursor}
+
+
+def list_traces(**filters) -> dict:
+    return query_traces(_connect(), "trace_index", **filters)
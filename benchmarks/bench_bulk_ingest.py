@@ -0,0 +1,77 @@
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+from main import app
+from app.storage import file_store, sqlite_store, trace_index, blob_store, STORAGE_BACKEND
+
+
+def build_body(trace_count: int, events_per_trace: int) -> bytes:
+    lines = []
+    for i in range(trace_count):
+        lines.append(json.dumps({
+            "trace_id": f"bench-bulk-{i}",
+            "developer_id": f"bench-dev-{i % 20}",
+            "repo": {
+                "name": "bench-repo",
+                "url": "https://github.com/bench/repo",
+                "branch": "main",
+                "commit_before": "abc",
+                "commit_after": "def",
+                "test_command": "pytest"
+            },
+            "start_time": "2025-11-27T10:00:00Z",
+            "events": [
+                {
+                    "event_type": "reasoning_step",
+                    "timestamp": f"2025-11-27T10:{j // 60 % 60:02d}:{j % 60:02d}Z",
+                    "data": {"content": f"Step {j}: narrowing down the failing branch"}
+                }
+                for j in range(events_per_trace)
+            ]
+        }))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure POST /traces:bulk ingest throughput")
+    parser.add_argument("--traces", type=int, default=5_000)
+    parser.add_argument("--events", type=int, default=10)
+    parser.add_argument("--token", default="bench-token")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        file_store.DATA_DIR = tmp_path
+        trace_index.INDEX_PATH = tmp_path / "trace_index.db"
+        blob_store.BLOB_DIR = tmp_path / "blobs"
+        sqlite_store.DB_PATH = tmp_path / "traces.db"
+
+        import os
+        os.environ["API_TOKEN"] = args.token
+        body = build_body(args.traces, args.events)
+
+        def chunks():
+            for start in range(0, len(body), 64 * 1024):
+                yield body[start:start + 64 * 1024]
+
+        client = TestClient(app)
+        started = time.perf_counter()
+        response = client.post(
+            "/traces:bulk", content=chunks(), headers={"Authorization": f"Bearer {args.token}"}
+        )
+        elapsed = time.perf_counter() - started
+
+        summary = json.loads(response.text.splitlines()[-1])["summary"]
+        print(f"backend={STORAGE_BACKEND} traces={args.traces} events/trace={args.events} body={len(body)} bytes")
+        print(f"{summary} in {elapsed:.2f}s -> {summary['stored'] / elapsed:.0f} traces/s")
+
+
+if __name__ == "__main__":
+    main()
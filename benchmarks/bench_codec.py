@@ -0,0 +1,76 @@
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models import Trace, RepoInfo, ReasoningStepEvent, TerminalCommandEvent
+from app.storage import file_store, trace_index, blob_store, codec
+
+
+def build_trace(event_count: int) -> Trace:
+    start = datetime(2025, 11, 27, 10, 0, 0)
+    events = []
+    for i in range(event_count):
+        timestamp = start + timedelta(seconds=i)
+        if i % 4 == 0:
+            events.append(TerminalCommandEvent(
+                timestamp=timestamp,
+                data={"command": "pytest -q", "exit_code": i % 2, "output": f"{i} passed in 0.{i % 10}s", "duration_ms": i}
+            ))
+        else:
+            events.append(ReasoningStepEvent(
+                timestamp=timestamp,
+                data={"content": f"Step {i}: checking whether the parser handles empty input in module_{i % 37}.py"}
+            ))
+    return Trace(
+        trace_id=f"bench-{event_count}",
+        developer_id="bench-dev",
+        repo=RepoInfo(
+            name="bench-repo",
+            url="https://github.com/bench/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=start,
+        events=events
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare on-disk size and save/load latency per trace codec")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 100_000])
+    parser.add_argument("--codecs", nargs="+", default=list(codec.CODEC_SUFFIXES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        file_store.DATA_DIR = tmp_path
+        trace_index.INDEX_PATH = tmp_path / "trace_index.db"
+        blob_store.BLOB_DIR = tmp_path / "blobs"
+
+        print(f"{'events':>8} {'codec':>6} {'bytes':>12} {'save ms':>10} {'load ms':>10}")
+        for size in args.sizes:
+            trace = build_trace(size)
+            for codec_name in args.codecs:
+                codec.TRACE_CODEC = codec_name
+
+                started = time.perf_counter()
+                file_store.save_trace(trace)
+                save_ms = (time.perf_counter() - started) * 1000
+
+                started = time.perf_counter()
+                file_store.load_trace(trace.trace_id)
+                load_ms = (time.perf_counter() - started) * 1000
+
+                size_bytes = file_store._find_trace_file(trace.trace_id).stat().st_size
+                print(f"{size:>8} {codec_name:>6} {size_bytes:>12} {save_ms:>10.1f} {load_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
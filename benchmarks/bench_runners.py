@@ -0,0 +1,45 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+from statistics import median
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.qa import test_runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-run overhead of the test runner backends")
+    parser.add_argument("--backends", nargs="+", default=sorted(test_runner.runners))
+    parser.add_argument("--repo", default="sample_repo")
+    parser.add_argument("--command", default="true", help="Command to time; 'true' measures pure overhead")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'backend':>8} {'runs':>5} {'first ms':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for backend in args.backends:
+        runner = test_runner.get_runner(args.repo, backend)
+        try:
+            abs_repo_path, _ = runner.resolve(args.repo)
+            sandbox = runner.sandbox(args.repo, abs_repo_path, args.command)
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                exit_code, output, _ = sandbox.run(sandbox.command)
+                timings.append((time.perf_counter() - started) * 1000)
+                if exit_code != 0:
+                    raise RuntimeError(f"exit code {exit_code}: {output[:200]}")
+        except Exception as e:
+            print(f"{backend:>8} unavailable: {e}")
+            continue
+
+        ordered = sorted(timings)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        print(f"{backend:>8} {len(timings):>5} {timings[0]:>10.1f} {median(timings):>10.1f} {p95:>10.1f}")
+
+    test_runner.container_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,53 @@
+import os
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api import router
+from app.storage import STORAGE_BACKEND, file_store
+from app.storage.cache import trace_cache
+from app.storage.layout_migrator import LayoutMigrator
+from app.qa.jobs import job_queue
+from app.qa.reaper import SandboxReaper
+from app.qa.resource_usage import load_cost_profiles
+from app.qa.llm_judge import judge_cache, judge_client
+from app.qa.test_runner import (
+    container_pool,
+    image_cache,
+    result_cache,
+    prewarm_container_pool,
+    get_docker_client,
+    live_sandbox_ids,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    migrator = None
+    if STORAGE_BACKEND == "file" and file_store.SHARD_DEPTH > 0 and os.getenv("TRACE_SHARD_MIGRATE_ON_STARTUP") == "1":
+        migrator = LayoutMigrator()
+        migrator.start()
+    job_queue.recover()
+    # Starting containers can take a while (image pulls and builds), so it must not hold up startup
+    threading.Thread(target=prewarm_container_pool, name="sandbox-prewarm", daemon=True).start()
+    reaper = SandboxReaper(get_docker_client, live_sandbox_ids)
+    reaper.start()
+
+    yield
+
+    reaper.stop()
+    job_queue.shutdown()
+    container_pool.close()
+    judge_client.close()
+    if migrator is not None:
+        migrator.stop()
+
 
 app = FastAPI(
     title="PR Telemetry Trace API",
     version="1.0.0",
     description="Backend for collecting and validating developer debugging traces",
-    max_body_size=10_000_000
+    max_body_size=10_000_000,
+    lifespan=lifespan
 )
 
 app.include_router(router)
@@ -18,4 +60,17 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "trace_cache": trace_cache.stats(),
+        "container_pool": container_pool.stats(),
+        "image_cache": image_cache.stats(),
+        "test_result_cache": result_cache.stats(),
+        "test_cost_profiles": load_cost_profiles(),
+        "judge_cache": judge_cache.stats(),
+        "judge_client": judge_client.stats(),
+    }
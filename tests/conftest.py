@@ -1,12 +1,44 @@
 import os
+import importlib
 import pytest
 
+# Every location the app writes under data/, as (module, global, env var,
+# path relative to the data dir). The env vars reach spawned worker
+# processes, which import the modules afresh instead of inheriting patches
+STATE_PATHS = [
+    ("app.storage.file_store", "DATA_DIR", None, "."),
+    ("app.storage.trace_index", "INDEX_PATH", "TRACE_INDEX_PATH", "trace_index.db"),
+    ("app.storage.blob_store", "BLOB_DIR", "BLOB_DIR", "blobs"),
+    ("app.storage.sqlite_store", "DB_PATH", "SQLITE_DB_PATH", "traces.db"),
+    ("app.storage.locks", "LOCK_FILE", "TRACE_LOCK_FILE", ".trace_locks"),
+    ("app.qa.jobs", "JOBS_DIR", "QA_JOBS_DIR", "jobs"),
+    ("app.qa.result_cache", "RESULT_CACHE_DIR", "QA_RESULT_CACHE_DIR", "test_results"),
+    ("app.qa.judge_cache", "JUDGE_CACHE_DIR", "QA_JUDGE_CACHE_DIR", "judge_results"),
+    ("app.qa.batch_judge", "BATCH_DIR", "QA_BATCH_DIR", "judge_batches"),
+    ("app.qa.test_impact", "IMPORT_GRAPH_DIR", "QA_IMPORT_GRAPH_DIR", "import_graphs"),
+    ("app.qa.resource_usage", "COST_PROFILES_PATH", "QA_COST_PROFILES_PATH", "qa/cost_profiles.json"),
+    ("app.qa.sharding", "TEST_DURATIONS_PATH", "QA_TEST_DURATIONS_PATH", "qa/test_durations.json"),
+    ("app.qa.image_cache", "IMAGE_CACHE_INDEX", "QA_IMAGE_CACHE_INDEX", "qa/image_cache.json"),
+]
+
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_env():
     os.environ["API_TOKEN"] = "test-token-123"
     os.environ.setdefault("OPENAI_API_KEY", "test-key")
 
+@pytest.fixture(autouse=True)
+def isolated_data(setup_test_env, tmp_path, monkeypatch):
+    # Traces, indexes, locks, jobs and QA state go to a per-test directory
+    # rather than the working tree's data/
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for module, name, env_var, relative in STATE_PATHS:
+        path = data_dir / relative
+        monkeypatch.setattr(importlib.import_module(module), name, path)
+        if env_var:
+            monkeypatch.setenv(env_var, str(path))
+    yield data_dir
+
 @pytest.fixture
 def auth_headers():
     return {"Authorization": "Bearer test-token-123"}
-
@@ -0,0 +1,183 @@
+import json
+import pytest
+from datetime import datetime
+from app.qa import batch_judge, llm_judge
+from app.qa.judge_cache import JudgeCache
+from app.models import Trace, RepoInfo, QAResults, ReasoningStepEvent, ReasoningStepEventData, CodeEditEvent
+from app.models.events import CodeEditEventData
+from app.storage import blob_store, save_trace, load_trace
+
+
+@pytest.fixture(autouse=True)
+def batch_env(tmp_path, monkeypatch):
+    # Pool workers are spawned processes that do not see patched globals:
+    # they find DATA_DIR from the working directory, and the other storage
+    # locations from the environment isolated_data sets
+    monkeypatch.chdir(tmp_path)
+
+
+def _trace(trace_id: str, steps: list[str]) -> Trace:
+    return Trace(
+        trace_id=trace_id,
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="sample-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0),
+        events=[
+            ReasoningStepEvent(timestamp=datetime(2025, 11, 27, 10, 1, i), data=ReasoningStepEventData(content=step))
+            for i, step in enumerate(steps)
+        ],
+        qa_status="completed",
+        qa_results=QAResults(tests_passed=True, reasoning_score=2.0, reasoning_feedback="Old prompt"),
+    )
+
+
+def _complete(body):
+    return '{"score": 4.5, "feedback": "Re-scored in batch"}', 120
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_batch_rescores_traces_end_to_end():
+    for i in range(3):
+        save_trace(_trace(f"test-batch-e2e-{i}", [f"Step one of trace {i}", "Checked the null guard"]))
+    save_trace(_trace("test-batch-e2e-empty", []))
+
+    run_dir = batch_judge.create_run("run-e2e")
+    progress = batch_judge.prepare_batch(run_dir, workers=2)
+    assert progress["done"] and progress["requests"] == 3
+    assert progress["skipped"]["no_reasoning"] == 1
+
+    requests = _lines(run_dir / "requests-0000.jsonl")
+    assert {line["url"] for line in requests} == {"/v1/chat/completions"}
+    assert all(line["method"] == "POST" and line["body"]["model"] == llm_judge.JUDGE_MODEL for line in requests)
+    assert sorted(line["custom_id"].rpartition(":")[0] for line in requests) == [f"test-batch-e2e-{i}" for i in range(3)]
+
+    assert batch_judge.run_local(run_dir, complete=_complete) == 1
+    results = _lines(run_dir / "results-0000.jsonl")
+    assert results[0]["response"]["status_code"] == 200 and results[0]["error"] is None
+
+    assert batch_judge.ingest_batch(run_dir, workers=2) == {"applied": 3, "stale": 0, "failed": 0, "skipped": 0}
+    trace = load_trace("test-batch-e2e-1")
+    assert trace.qa_status == "completed"
+    assert trace.qa_results.tests_passed is True
+    assert trace.qa_results.reasoning_score == 4.5
+    assert trace.qa_results.reasoning_feedback == "Re-scored in batch"
+    assert trace.qa_results.reasoning_usage.mode == "batch"
+    assert trace.qa_results.reasoning_usage.tokens == 120
+
+    # Online evaluations of the same reasoning now hit the cache
+    key = llm_judge.reasoning_key(["Step one of trace 1", "Checked the null guard"])
+    assert JudgeCache().get(key)["reasoning_score"] == 4.5
+
+    assert batch_judge.ingest_batch(run_dir, workers=2)["skipped"] == 3
+    assert batch_judge.batch_status(run_dir)["ingested"] == 3
+
+
+def test_changed_reasoning_is_not_overwritten():
+    save_trace(_trace("test-batch-stale", ["The first guess"]))
+    run_dir = batch_judge.create_run("run-stale")
+    batch_judge.prepare_batch(run_dir, workers=1)
+    batch_judge.run_local(run_dir, complete=_complete)
+
+    save_trace(_trace("test-batch-stale", ["The first guess", "A step added after the batch was written"]))
+
+    assert batch_judge.ingest_batch(run_dir, workers=1)["stale"] == 1
+    assert load_trace("test-batch-stale").qa_results.reasoning_score == 2.0
+
+
+def test_failed_requests_are_retried_by_a_later_ingest(monkeypatch):
+    monkeypatch.setattr(batch_judge, "_pool", lambda workers: _InlinePool())
+    save_trace(_trace("test-batch-retry", ["Bisected to the cache layer"]))
+    run_dir = batch_judge.create_run("run-retry")
+    batch_judge.prepare_batch(run_dir)
+
+    def unavailable(body):
+        raise RuntimeError("upstream overloaded")
+
+    batch_judge.run_local(run_dir, complete=unavailable)
+    assert _lines(run_dir / "results-0000.jsonl")[0]["error"]["message"] == "upstream overloaded"
+    assert batch_judge.ingest_batch(run_dir)["failed"] == 1
+
+    (run_dir / "results-0000.jsonl").unlink()
+    batch_judge.run_local(run_dir, complete=_complete)
+    assert batch_judge.ingest_batch(run_dir)["applied"] == 1
+    assert load_trace("test-batch-retry").qa_results.reasoning_score == 4.5
+
+
+def test_prepare_resumes_from_its_checkpoint(monkeypatch):
+    monkeypatch.setattr(batch_judge, "_pool", lambda workers: _InlinePool())
+    monkeypatch.setattr(batch_judge, "BATCH_PAGE_SIZE", 2)
+    monkeypatch.setattr(batch_judge, "BATCH_MAX_REQUESTS", 3)
+    for i in range(5):
+        save_trace(_trace(f"test-batch-resume-{i}", [f"Reasoning {i}"]))
+
+    original = batch_judge.list_traces
+    pages = []
+
+    def interrupted(**kwargs):
+        pages.append(kwargs["cursor"])
+        if len(pages) == 2:
+            raise KeyboardInterrupt
+        return original(**kwargs)
+
+    monkeypatch.setattr(batch_judge, "list_traces", interrupted)
+    run_dir = batch_judge.create_run("run-resume")
+    with pytest.raises(KeyboardInterrupt):
+        batch_judge.prepare_batch(run_dir)
+    # A write that never reached the checkpoint
+    with open(run_dir / "requests-0000.jsonl", "a") as f:
+        f.write('{"custom_id": "partial')
+
+    monkeypatch.setattr(batch_judge, "list_traces", original)
+    progress = batch_judge.prepare_batch(batch_judge.create_run("run-resume"))
+
+    assert progress["done"] and progress["requests"] == 5
+    assert [entry["requests"] for entry in progress["files"]] == [3, 2]
+    custom_ids = [line["custom_id"] for name in ("requests-0000.jsonl", "requests-0001.jsonl") for line in _lines(run_dir / name)]
+    assert len(set(custom_ids)) == 5
+
+
+def test_scan_and_write_back_read_no_blobs(monkeypatch):
+    monkeypatch.setattr(batch_judge, "_pool", lambda workers: _InlinePool())
+    trace = _trace("test-batch-blobs", ["Diffed the two configs"])
+    trace.events.append(CodeEditEvent(
+        timestamp=datetime(2025, 11, 27, 10, 2, 0),
+        data=CodeEditEventData(file_path="app/config.py", diff="+" * (blob_store.BLOB_MIN_CHARS + 1)),
+    ))
+    save_trace(trace)
+
+    def unexpected_read(ref):
+        raise AssertionError(f"blob {ref} was read")
+
+    get_blob = blob_store.get_blob
+    monkeypatch.setattr(blob_store, "get_blob", unexpected_read)
+    run_dir = batch_judge.create_run("run-blobs")
+    assert batch_judge.prepare_batch(run_dir)["requests"] == 1
+    batch_judge.run_local(run_dir, complete=_complete)
+    assert batch_judge.ingest_batch(run_dir)["applied"] == 1
+
+    monkeypatch.setattr(blob_store, "get_blob", get_blob)
+    saved = load_trace("test-batch-blobs")
+    assert saved.qa_results.reasoning_score == 4.5
+    assert saved.events[-1].data.diff == "+" * (blob_store.BLOB_MIN_CHARS + 1)
+
+
+class _InlinePool:
+    # Same interface as the process pool, for tests that patch module state
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, items, chunksize=1):
+        return map(fn, items)
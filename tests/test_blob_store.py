@@ -0,0 +1,110 @@
+import json
+import pytest
+from datetime import datetime
+from app.storage import blob_store, file_store, sqlite_store
+from app.models import Trace, RepoInfo, CodeEditEvent, TerminalCommandEvent, ReasoningStepEvent
+
+
+@pytest.fixture(autouse=True)
+def small_blobs(monkeypatch):
+    monkeypatch.setattr(blob_store, "BLOB_MIN_CHARS", 100)
+
+
+@pytest.fixture
+def trace_with_payloads():
+    big_output = "collected 3 items\n" + "." * 500
+    return Trace(
+        trace_id="test-blob-001",
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="test-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0),
+        events=[
+            CodeEditEvent(
+                timestamp=datetime(2025, 11, 27, 10, 1, 0),
+                data={"file_path": "src/app.py", "diff": "+x", "snapshot_after": "x = 1\n" * 100}
+            ),
+            TerminalCommandEvent(
+                timestamp=datetime(2025, 11, 27, 10, 2, 0),
+                data={"command": "pytest", "exit_code": 0, "output": big_output, "duration_ms": 10}
+            ),
+            TerminalCommandEvent(
+                timestamp=datetime(2025, 11, 27, 10, 3, 0),
+                data={"command": "pytest", "exit_code": 0, "output": big_output, "duration_ms": 12}
+            ),
+            ReasoningStepEvent(
+                timestamp=datetime(2025, 11, 27, 10, 4, 0),
+                data={"content": "r" * 500}
+            ),
+        ]
+    )
+
+
+def test_put_blob_is_content_addressed():
+    first = blob_store.put_blob("same payload")
+    second = blob_store.put_blob("same payload")
+
+    assert first == second
+    assert blob_store.is_blob_ref(first)
+    assert len(list(blob_store.BLOB_DIR.rglob("*.z"))) == 1
+    assert blob_store.get_blob(first) == "same payload"
+
+
+def test_large_fields_are_swapped_for_refs_on_disk(trace_with_payloads):
+    file_store.save_trace(trace_with_payloads)
+
+    stored = json.loads((file_store.DATA_DIR / "test-blob-001.json").read_text())
+    events = stored["events"]
+    assert blob_store.is_blob_ref(events[0]["data"]["snapshot_after"])
+    assert events[0]["data"]["diff"] == "+x"
+    assert events[1]["data"]["output"] == events[2]["data"]["output"]
+    assert events[3]["data"]["content"] == "r" * 500
+    assert len(list(blob_store.BLOB_DIR.rglob("*.z"))) == 2
+
+
+def test_load_resolves_refs(trace_with_payloads):
+    file_store.save_trace(trace_with_payloads)
+
+    loaded = file_store.load_trace("test-blob-001")
+    assert loaded.events[0].data.snapshot_after == "x = 1\n" * 100
+    assert loaded.events[1].data.output.startswith("collected 3 items")
+
+
+def test_load_without_resolving_never_reads_blobs(trace_with_payloads, monkeypatch):
+    file_store.save_trace(trace_with_payloads)
+
+    def fail(ref):
+        raise AssertionError("blob store should not be touched")
+
+    monkeypatch.setattr(blob_store, "get_blob", fail)
+    loaded = file_store.load_trace("test-blob-001", resolve_blobs=False)
+
+    assert blob_store.is_blob_ref(loaded.events[0].data.snapshot_after)
+    file_store.save_trace(loaded)
+
+
+def test_appended_events_are_externalized(trace_with_payloads):
+    events = trace_with_payloads.events
+    trace_with_payloads.events = []
+    file_store.save_trace(trace_with_payloads)
+
+    file_store.append_events("test-blob-001", events)
+
+    segment = (file_store.DATA_DIR / "test-blob-001.events.jsonl").read_text()
+    assert "x = 1" not in segment
+    assert file_store.load_trace("test-blob-001").events[0].data.snapshot_after == "x = 1\n" * 100
+
+
+def test_sqlite_backend_uses_blob_refs(trace_with_payloads):
+    sqlite_store.save_trace(trace_with_payloads)
+
+    loaded = sqlite_store.load_trace("test-blob-001")
+    raw = sqlite_store.load_trace("test-blob-001", resolve_blobs=False)
+    assert loaded.events[1].data.output.startswith("collected 3 items")
+    assert blob_store.is_blob_ref(raw.events[1].data.output)
@@ -0,0 +1,120 @@
+import json
+import asyncio
+from fastapi.testclient import TestClient
+from main import app
+from app.api import bulk
+from app.storage import load_trace, list_traces
+
+client = TestClient(app)
+
+
+def _trace(trace_id: str, test_command: str = "pytest") -> dict:
+    return {
+        "trace_id": trace_id,
+        "developer_id": "dev-bulk",
+        "repo": {
+            "name": "test-repo",
+            "url": "https://github.com/test/repo",
+            "branch": "main",
+            "commit_before": "abc",
+            "commit_after": "def",
+            "test_command": test_command
+        },
+        "start_time": "2025-11-27T10:00:00Z",
+        "events": [
+            {"event_type": "file_open", "timestamp": "2025-11-27T10:00:30Z", "data": {"file_path": "src/app.py"}}
+        ]
+    }
+
+
+def _events(trace_id: str, minute: int, file_path: str = "src/app.py") -> dict:
+    return {
+        "trace_id": trace_id,
+        "events": [
+            {"event_type": "file_close", "timestamp": f"2025-11-27T10:{minute:02d}:00Z", "data": {"file_path": file_path}}
+        ]
+    }
+
+
+def _ndjson(lines: list) -> bytes:
+    return b"".join((line if isinstance(line, bytes) else json.dumps(line).encode()) + b"\n" for line in lines)
+
+
+def _post(body: bytes, auth_headers) -> list:
+    response = client.post("/traces:bulk", content=body, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_bulk_ingest_stores_traces_and_appends_events(auth_headers):
+    results = _post(_ndjson([
+        _trace("test-bulk-001"),
+        _trace("test-bulk-002"),
+        _events("test-bulk-001", 5),
+    ]), auth_headers)
+
+    assert results[:3] == [
+        {"line": 1, "status": "stored", "trace_id": "test-bulk-001"},
+        {"line": 2, "status": "stored", "trace_id": "test-bulk-002"},
+        {"line": 3, "status": "appended", "trace_id": "test-bulk-001", "appended_events": 1},
+    ]
+    assert results[3] == {"summary": {"lines": 3, "stored": 2, "appended": 1, "errors": 0}}
+    assert [e.event_type for e in load_trace("test-bulk-001").events] == ["file_open", "file_close"]
+    assert {t["trace_id"] for t in list_traces()["traces"]} == {"test-bulk-001", "test-bulk-002"}
+
+
+def test_bad_lines_are_reported_without_failing_the_stream(auth_headers):
+    results = _post(_ndjson([
+        _trace("test-bulk-003", test_command="pytest; rm -rf /"),
+        b"{not json",
+        _events("test-bulk-missing", 5),
+        _events("test-bulk-004", 5, file_path="../etc/passwd"),
+        b"",
+        _trace("test-bulk-004"),
+    ]), auth_headers)
+
+    errors = {result["line"]: result["error"] for result in results if result.get("status") == "error"}
+    assert "dangerous patterns" in errors[1]
+    assert 2 in errors
+    assert "not found" in errors[3]
+    assert "Invalid file path" in errors[4]
+    assert results[4] == {"line": 6, "status": "stored", "trace_id": "test-bulk-004"}
+    assert results[-1]["summary"] == {"lines": 5, "stored": 1, "appended": 0, "errors": 4}
+
+
+def test_results_stream_per_batch(auth_headers, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_BATCH_LINES", 2)
+    lines = [_trace(f"test-bulk-{i:03d}") for i in range(5)]
+
+    results = _post(_ndjson(lines), auth_headers)
+
+    assert [result["line"] for result in results[:-1]] == [1, 2, 3, 4, 5]
+    assert results[-1]["summary"]["stored"] == 5
+
+
+def test_oversized_line_is_rejected(auth_headers, monkeypatch):
+    monkeypatch.setattr(bulk, "BULK_MAX_LINE_BYTES", 1000)
+    big = _trace("test-bulk-big")
+    big["events"][0]["data"]["file_path"] = "src/" + "a" * 2000 + ".py"
+
+    results = _post(_ndjson([big, _trace("test-bulk-small")]), auth_headers)
+
+    assert results[0]["status"] == "error" and "exceeds" in results[0]["error"]
+    assert results[1] == {"line": 2, "status": "stored", "trace_id": "test-bulk-small"}
+
+
+def test_iter_lines_handles_chunk_boundaries():
+    async def chunks():
+        for chunk in [b'{"a"', b':1}\n{"b":2}\n{', b'"c":3}']:
+            yield chunk
+
+    async def collect():
+        return [line async for line in bulk.iter_lines(chunks())]
+
+    assert asyncio.run(collect()) == [(1, b'{"a":1}'), (2, b'{"b":2}'), (3, b'{"c":3}')]
+
+
+def test_bulk_requires_auth():
+    response = client.post("/traces:bulk", content=_ndjson([_trace("test-bulk-auth")]))
+    assert response.status_code in (401, 403)
@@ -0,0 +1,88 @@
+import gzip
+import json
+import lzma
+import pytest
+from datetime import datetime
+from app.storage import codec, file_store
+from app.models import Trace, RepoInfo, ReasoningStepEvent, ReasoningStepEventData
+
+
+@pytest.fixture
+def sample_trace():
+    return Trace(
+        trace_id="test-codec-001",
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="test-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0),
+        events=[
+            ReasoningStepEvent(
+                timestamp=datetime(2025, 11, 27, 10, 1, 0),
+                data=ReasoningStepEventData(content="Checking the parser")
+            )
+        ]
+    )
+
+
+@pytest.mark.parametrize("codec_name", ["json", "gzip", "lzma"])
+def test_roundtrip_per_codec(sample_trace, monkeypatch, codec_name):
+    monkeypatch.setattr(codec, "TRACE_CODEC", codec_name)
+
+    file_store.save_trace(sample_trace)
+    loaded = file_store.load_trace("test-codec-001")
+
+    assert (file_store.DATA_DIR / f"test-codec-001{codec.suffix_for(codec_name)}").exists()
+    assert loaded.events[0].data.content == "Checking the parser"
+    assert file_store.trace_exists("test-codec-001")
+
+
+def test_gzip_file_is_compressed(sample_trace, monkeypatch):
+    monkeypatch.setattr(codec, "TRACE_CODEC", "gzip")
+    file_store.save_trace(sample_trace)
+
+    with gzip.open(file_store.DATA_DIR / "test-codec-001.json.gz", "rt") as f:
+        assert json.load(f)["trace_id"] == "test-codec-001"
+
+
+def test_json_codec_writes_compact_json(sample_trace):
+    file_store.save_trace(sample_trace)
+    assert "\n" not in (file_store.DATA_DIR / "test-codec-001.json").read_text()
+
+
+def test_legacy_indented_json_still_loads(sample_trace, monkeypatch):
+    (file_store.DATA_DIR / "test-codec-001.json").write_text(json.dumps(sample_trace.model_dump(mode="json"), indent=2))
+    monkeypatch.setattr(codec, "TRACE_CODEC", "lzma")
+
+    loaded = file_store.load_trace("test-codec-001")
+    assert loaded.trace_id == "test-codec-001"
+
+
+def test_switching_codec_removes_old_encoding(sample_trace, monkeypatch):
+    file_store.save_trace(sample_trace)
+    monkeypatch.setattr(codec, "TRACE_CODEC", "gzip")
+    file_store.save_trace(sample_trace)
+
+    assert not (file_store.DATA_DIR / "test-codec-001.json").exists()
+    assert (file_store.DATA_DIR / "test-codec-001.json.gz").exists()
+
+
+def test_reencode_trace_migrates_in_place(sample_trace):
+    file_store.save_trace(sample_trace)
+
+    assert file_store.reencode_trace("test-codec-001", "lzma")
+    assert not file_store.reencode_trace("test-codec-001", "lzma")
+
+    with lzma.open(file_store.DATA_DIR / "test-codec-001.json.xz", "rt") as f:
+        assert json.load(f)["developer_id"] == "dev-test"
+    assert not (file_store.DATA_DIR / "test-codec-001.json").exists()
+
+
+def test_unknown_codec_rejected():
+    with pytest.raises(ValueError):
+        codec.suffix_for("zstd")
@@ -0,0 +1,133 @@
+import json
+import threading
+import multiprocessing
+import pytest
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from app.storage import file_store, trace_index, durability, locks
+from app.storage.durability import GroupCommitter
+from app.models import Trace, RepoInfo, ReasoningStepEvent, ReasoningStepEventData
+
+
+def _trace(trace_id: str) -> Trace:
+    return Trace(
+        trace_id=trace_id,
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="test-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0)
+    )
+
+
+def _step(i: int) -> ReasoningStepEvent:
+    return ReasoningStepEvent(
+        timestamp=datetime(2025, 11, 27, 10, 0, 0) + timedelta(seconds=i),
+        data=ReasoningStepEventData(content=f"step-{i}")
+    )
+
+
+def _hammer(trace_id: str, workers: int, batches_per_worker: int):
+    def worker(w):
+        for b in range(batches_per_worker):
+            file_store.append_events(trace_id, [_step(w * 1000 + b)])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(worker, range(workers)))
+
+
+@pytest.mark.parametrize("append_mode", ["segment", "rewrite"])
+def test_concurrent_appends_lose_no_events(monkeypatch, append_mode):
+    monkeypatch.setattr(file_store, "APPEND_MODE", append_mode)
+    monkeypatch.setattr(file_store, "SEGMENT_COMPACT_BYTES", 4096)
+    file_store.save_trace(_trace("test-concurrency-001"))
+
+    _hammer("test-concurrency-001", workers=16, batches_per_worker=20)
+
+    contents = {e.data.content for e in file_store.load_trace("test-concurrency-001").events}
+    assert len(contents) == 16 * 20
+
+
+def _process_worker(data_dir, worker, batches):
+    file_store.DATA_DIR = data_dir
+    trace_index.INDEX_PATH = data_dir / "trace_index.db"
+    file_store.APPEND_MODE = "rewrite"
+    for b in range(batches):
+        file_store.append_events("test-concurrency-mp", [_step(worker * 1000 + b)])
+
+
+def test_cross_process_appends_lose_no_events(isolated_data):
+    file_store.save_trace(_trace("test-concurrency-mp"))
+
+    ctx = multiprocessing.get_context("fork")
+    processes = [ctx.Process(target=_process_worker, args=(isolated_data, w, 15)) for w in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    file_store.trace_cache.clear()
+    assert len(file_store.load_trace("test-concurrency-mp").events) == 60
+
+
+def test_different_traces_do_not_block_each_other():
+    first, second = "test-concurrency-a", "test-concurrency-b"
+    n = 0
+    while locks._stripe(second) == locks._stripe(first):
+        n += 1
+        second = f"test-concurrency-b{n}"
+    file_store.save_trace(_trace(second))
+
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold_first():
+        with locks.trace_lock(first):
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_first)
+    holder.start()
+    held.wait(5)
+    try:
+        file_store.append_events(second, [_step(1)])
+    finally:
+        release.set()
+        holder.join()
+
+    assert len(file_store.load_trace(second).events) == 1
+
+
+def test_crash_mid_write_keeps_previous_document(isolated_data, monkeypatch):
+    file_store.save_trace(_trace("test-concurrency-crash"))
+    path = isolated_data / "test-concurrency-crash.json"
+    before = path.read_text()
+
+    def torn_dump(data, f):
+        f.write(b'{"schema_version": "1.0", "trace_')
+        raise OSError("disk full")
+
+    monkeypatch.setattr(file_store.offset_index, "dump_document", torn_dump)
+    with pytest.raises(OSError):
+        file_store.save_trace(_trace("test-concurrency-crash"))
+
+    assert path.read_text() == before
+    assert json.loads(before)["trace_id"] == "test-concurrency-crash"
+    assert not list(isolated_data.glob(".*.tmp"))
+
+
+def test_group_commit_shares_fsyncs(monkeypatch, isolated_data):
+    committer = GroupCommitter(window_ms=20)
+    monkeypatch.setattr(durability, "group_committer", committer)
+    file_store.save_trace(_trace("test-concurrency-gc"))
+
+    _hammer("test-concurrency-gc", workers=8, batches_per_worker=4)
+
+    assert len(file_store.load_trace("test-concurrency-gc").events) == 32
+    assert committer.batches < 32
@@ -0,0 +1,234 @@
+import time
+import pytest
+from pathlib import Path
+from app.qa import container_pool, test_runner
+from app.qa.runners import SandboxTimeout
+from app.qa.container_pool import ContainerPool, RESET_COMMAND, SANDBOX_LABEL, OWNER_LABEL, INSTANCE_ID
+
+
+class FakeContainer:
+    def __init__(self, number: int, exit_code: int = 0):
+        self.id = f"fake-id-{number}"
+        self.short_id = f"fake{number}"
+        self.exit_code = exit_code
+        self.commands = []
+        self.removed = False
+        self.killed = False
+
+    def kill(self):
+        self.killed = True
+
+    def get_archive(self, path):
+        import docker
+        raise docker.errors.NotFound(path)
+
+    def exec_run(self, cmd, workdir=None):
+        self.commands.append(cmd[-1])
+        if cmd[-1] == RESET_COMMAND:
+            return 0, b""
+        return self.exit_code, b"1 passed"
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeContainers:
+    def __init__(self):
+        self.started = []
+        self.run_kwargs = []
+
+    def run(self, **kwargs):
+        self.run_kwargs.append(kwargs)
+        container = FakeContainer(len(self.started))
+        self.started.append(container)
+        return container
+
+
+class FakeAPI:
+    # Runs the container's exec_run at create time and streams its output
+    def __init__(self, containers):
+        self.containers = containers
+        self.execs = []
+
+    def exec_create(self, container_id, cmd, workdir=None):
+        container = next(c for c in self.containers.started if c.id == container_id)
+        self.execs.append(container.exec_run(cmd, workdir=workdir))
+        return {"Id": len(self.execs) - 1}
+
+    def exec_start(self, exec_id, stream=False):
+        output = self.execs[exec_id][1]
+        yield output[:3]
+        yield output[3:]
+
+    def exec_inspect(self, exec_id):
+        return {"ExitCode": self.execs[exec_id][0]}
+
+
+class FakeClient:
+    def __init__(self):
+        self.containers = FakeContainers()
+        self.api = FakeAPI(self.containers)
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+def test_containers_are_reused_and_reset_between_runs(client):
+    pool = ContainerPool(lambda: client, size=1, max_uses=10)
+
+    assert pool.run(Path("/repo"), "pytest") == (0, "1 passed", None)
+    assert pool.run(Path("/repo"), "pytest -x") == (0, "1 passed", None)
+
+    assert len(client.containers.started) == 1
+    container = client.containers.started[0]
+    assert container.commands == [RESET_COMMAND, "pytest", RESET_COMMAND, "pytest -x"]
+
+    kwargs = client.containers.run_kwargs[0]
+    assert kwargs["volumes"] == {"/repo": {"bind": "/repo", "mode": "ro"}}
+    assert "/work" in kwargs["tmpfs"]
+    assert kwargs["labels"] == {SANDBOX_LABEL: "1", OWNER_LABEL: INSTANCE_ID}
+    assert kwargs["mem_limit"] and kwargs["nano_cpus"] and kwargs["pids_limit"]
+
+
+def test_container_is_recycled_after_max_uses(client):
+    pool = ContainerPool(lambda: client, size=1, max_uses=2)
+
+    for _ in range(3):
+        pool.run(Path("/repo"), "pytest")
+
+    assert len(client.containers.started) == 2
+    assert client.containers.started[0].removed
+    assert pool.stats()["recycled"] == 1
+
+
+def test_container_is_recycled_on_error(client):
+    pool = ContainerPool(lambda: client, size=1, max_uses=10)
+    pooled = pool.acquire(Path("/repo"))
+
+    def broken_exec(cmd, workdir=None):
+        raise RuntimeError("exec failed")
+
+    pooled.container.exec_run = broken_exec
+    pool.release(pooled)
+    with pytest.raises(RuntimeError):
+        pool.run(Path("/repo"), "pytest")
+
+    assert pooled.container.removed
+    pool.run(Path("/repo"), "pytest")
+    assert len(client.containers.started) == 2
+
+
+def test_prewarm_fills_pool_per_repo(client):
+    pool = ContainerPool(lambda: client, size=3, max_uses=10)
+
+    assert pool.prewarm(Path("/repo")) == 3
+    assert pool.prewarm(Path("/repo")) == 0
+    pool.run(Path("/repo"), "pytest")
+
+    assert len(client.containers.started) == 3
+    assert pool.stats()["idle"] == 3
+
+    pool.close()
+    assert all(container.removed for container in client.containers.started)
+    assert pool.stats()["idle"] == 0
+
+
+def test_idle_containers_beyond_pool_size_are_removed(client):
+    pool = ContainerPool(lambda: client, size=1, max_uses=10)
+    first = pool.acquire(Path("/repo"))
+    second = pool.acquire(Path("/repo"))
+
+    pool.release(first)
+    pool.release(second)
+
+    assert not first.container.removed
+    assert second.container.removed
+
+
+def test_docker_client_and_host_path_are_cached(monkeypatch):
+    calls = []
+
+    class NoSelfContainer:
+        class containers:
+            @staticmethod
+            def get(name):
+                import docker
+                raise docker.errors.NotFound("not running in a container")
+
+    def fake_from_env():
+        calls.append(1)
+        return NoSelfContainer()
+
+    monkeypatch.setattr(test_runner, "_client", None)
+    monkeypatch.setattr(test_runner, "_host_paths", {})
+    monkeypatch.setattr(test_runner.docker, "from_env", fake_from_env)
+
+    assert test_runner._get_host_sample_repo_path() is None
+    assert test_runner._get_host_sample_repo_path() is None
+    assert test_runner.get_docker_client() is test_runner.get_docker_client()
+    assert calls == [1]
+
+
+def test_run_with_timeout_wraps_command_and_reports_expiry(client):
+    pool = ContainerPool(lambda: client, size=1, max_uses=10)
+    pooled = pool.acquire(Path("/repo"))
+    pool.release(pooled)
+
+    def hanging_exec(cmd, workdir=None):
+        pooled.container.commands.append(cmd[-1])
+        return (0, b"") if cmd[-1] == RESET_COMMAND else (124, b"collected 3 items")
+
+    pooled.container.exec_run = hanging_exec
+
+    with pytest.raises(SandboxTimeout) as excinfo:
+        pool.run(Path("/repo"), "pytest", timeout=30)
+
+    assert pooled.container.commands[-1] == "timeout -k 5 30 sh -c pytest"
+    assert excinfo.value.output == "collected 3 items"
+    assert pooled.container.removed
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_stuck_exec_is_ended_by_killing_the_container(client, monkeypatch):
+    monkeypatch.setattr(container_pool, "TIMEOUT_KILL_GRACE_SECONDS", 0)
+    pool = ContainerPool(lambda: client, size=1, max_uses=10)
+    pooled = pool.acquire(Path("/repo"))
+    pool.release(pooled)
+
+    def stuck_exec(cmd, workdir=None):
+        if cmd[-1] != RESET_COMMAND:
+            deadline = time.monotonic() + 5
+            while not pooled.container.killed and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return 137, b""
+        return 0, b""
+
+    pooled.container.exec_run = stuck_exec
+
+    with pytest.raises(SandboxTimeout):
+        pool.run(Path("/repo"), "pytest", timeout=0.1)
+    assert pooled.container.killed
+    assert pooled.container.removed
+
+
+def test_old_idle_containers_are_retired(client, monkeypatch):
+    pool = ContainerPool(lambda: client, size=1, max_uses=10)
+    pool.run(Path("/repo"), "pytest")
+    monkeypatch.setattr(container_pool, "SANDBOX_MAX_AGE_SECONDS", 0)
+
+    pool.run(Path("/repo"), "pytest")
+
+    assert client.containers.started[0].removed
+    assert len(client.containers.started) == 2
+
+
+def test_live_ids_cover_idle_and_busy_containers(client):
+    pool = ContainerPool(lambda: client, size=1, max_uses=10)
+    busy = pool.acquire(Path("/repo"))
+    idle = pool.acquire(Path("/repo"))
+    pool.release(idle)
+
+    assert pool.live_ids() == {busy.container.id, idle.container.id}
+    assert pool.stats()["in_use"] == 1
@@ -0,0 +1,186 @@
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from main import app
+from app.storage import file_store, sqlite_store, offset_index
+from app.models import (
+    Trace,
+    RepoInfo,
+    ReasoningStepEvent,
+    ReasoningStepEventData,
+    TerminalCommandEvent,
+)
+from app.models.events import TerminalCommandEventData
+
+client = TestClient(app)
+
+
+def _step(minute: int, content: str) -> ReasoningStepEvent:
+    return ReasoningStepEvent(
+        timestamp=datetime(2025, 11, 27, 10, minute, 0),
+        data=ReasoningStepEventData(content=content)
+    )
+
+
+def _command(minute: int, command: str) -> TerminalCommandEvent:
+    return TerminalCommandEvent(
+        timestamp=datetime(2025, 11, 27, 10, minute, 0),
+        data=TerminalCommandEventData(command=command, exit_code=0, output="ok", duration_ms=10)
+    )
+
+
+@pytest.fixture
+def sample_trace():
+    return Trace(
+        trace_id="test-ranges-001",
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="test-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0),
+        events=[
+            _step(1, "Read the failing test"),
+            _command(2, "pytest -x"),
+            _step(3, "Found the off-by-one"),
+            _command(4, "pytest"),
+            _step(5, "All green"),
+        ]
+    )
+
+
+def _contents(page: dict) -> list:
+    return [event.data.content if event.event_type == "reasoning_step" else event.data.command
+            for event in page["events"]]
+
+
+def test_offset_and_limit_slice_events(sample_trace):
+    file_store.save_trace(sample_trace)
+
+    page = file_store.read_events("test-ranges-001", offset=1, limit=2)
+
+    assert page["total"] == 5
+    assert _contents(page) == ["pytest -x", "Found the off-by-one"]
+
+
+def test_time_window_and_type_filter(sample_trace):
+    file_store.save_trace(sample_trace)
+
+    window = file_store.read_events(
+        "test-ranges-001",
+        start=datetime(2025, 11, 27, 10, 2, 0),
+        end=datetime(2025, 11, 27, 10, 5, 0),
+    )
+    assert window["total"] == 3
+    assert _contents(window) == ["pytest -x", "Found the off-by-one", "pytest"]
+
+    commands = file_store.read_events("test-ranges-001", event_type="terminal_command")
+    assert commands["total"] == 2
+    assert _contents(commands) == ["pytest -x", "pytest"]
+
+
+def test_appended_events_are_merged_in_timestamp_order(sample_trace, isolated_data):
+    sample_trace.events = [_step(2, "Base"), _step(4, "Base later")]
+    file_store.save_trace(sample_trace)
+
+    file_store.append_events("test-ranges-001", [_step(3, "Appended")])
+    file_store.append_events("test-ranges-001", [_step(1, "Appended early")])
+
+    index = offset_index.read_index(isolated_data / "test-ranges-001.idx")
+    assert index.segment_bytes == (isolated_data / "test-ranges-001.events.jsonl").stat().st_size
+
+    page = file_store.read_events("test-ranges-001")
+    assert _contents(page) == [event.data.content for event in file_store.load_trace("test-ranges-001").events]
+    assert _contents(page) == ["Appended early", "Base", "Appended", "Base later"]
+
+
+def test_appends_extend_the_index_from_its_header(sample_trace, isolated_data, monkeypatch):
+    file_store.save_trace(sample_trace)
+
+    def unexpected_load(path):
+        raise AssertionError("append loaded every index record")
+
+    read_index = offset_index.read_index
+    monkeypatch.setattr(offset_index, "read_index", unexpected_load)
+    file_store.append_events("test-ranges-001", [_step(6, "Appended")])
+    monkeypatch.setattr(offset_index, "read_index", read_index)
+
+    index = offset_index.read_index(isolated_data / "test-ranges-001.idx")
+    assert len(index.records) == 6
+    assert index.segment_bytes == (isolated_data / "test-ranges-001.events.jsonl").stat().st_size
+
+
+def test_missing_index_is_rebuilt(sample_trace, isolated_data):
+    file_store.save_trace(sample_trace)
+    file_store.append_events("test-ranges-001", [_step(6, "Appended")])
+    (isolated_data / "test-ranges-001.idx").unlink()
+
+    page = file_store.read_events("test-ranges-001", offset=4)
+
+    assert page["total"] == 6
+    assert _contents(page) == ["All green", "Appended"]
+    assert (isolated_data / "test-ranges-001.idx").exists()
+
+
+def test_index_catches_up_on_unindexed_segment_lines(sample_trace, isolated_data):
+    file_store.save_trace(sample_trace)
+    segment = isolated_data / "test-ranges-001.events.jsonl"
+    segment.write_text(file_store._event_json(_step(7, "Written out of band")) + "\n")
+
+    page = file_store.read_events("test-ranges-001", offset=5)
+
+    assert _contents(page) == ["Written out of band"]
+
+
+def test_compressed_traces_fall_back_to_full_load(sample_trace, monkeypatch):
+    monkeypatch.setattr(file_store.codec, "TRACE_CODEC", "gzip")
+    file_store.save_trace(sample_trace)
+
+    page = file_store.read_events("test-ranges-001", event_type="reasoning_step", offset=1)
+
+    assert page["total"] == 3
+    assert _contents(page) == ["Found the off-by-one", "All green"]
+
+
+def test_sqlite_backend_reads_ranges(sample_trace):
+    sample_trace.events = [_step(2, "Base"), _command(4, "pytest")]
+    sqlite_store.save_trace(sample_trace)
+    sqlite_store.append_events("test-ranges-001", [_step(3, "Appended")])
+
+    page = sqlite_store.read_events("test-ranges-001", offset=1, limit=1)
+    assert page["total"] == 3
+    assert _contents(page) == ["Appended"]
+
+    steps = sqlite_store.read_events("test-ranges-001", event_type="reasoning_step",
+                                     end=datetime(2025, 11, 27, 10, 3, 0))
+    assert _contents(steps) == ["Base"]
+
+
+def test_events_endpoint(sample_trace, auth_headers, monkeypatch):
+    monkeypatch.setattr("app.api.routes.read_events", file_store.read_events)
+    file_store.save_trace(sample_trace)
+
+    response = client.get(
+        "/traces/test-ranges-001/events",
+        params={"from": "2025-11-27T10:03:00", "limit": 2},
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 3
+    assert [event["timestamp"] for event in body["events"]] == ["2025-11-27T10:03:00", "2025-11-27T10:04:00"]
+
+
+def test_events_endpoint_errors(auth_headers, monkeypatch):
+    monkeypatch.setattr("app.api.routes.read_events", file_store.read_events)
+
+    missing = client.get("/traces/does-not-exist/events", headers=auth_headers)
+    assert missing.status_code == 404
+
+    bad_type = client.get("/traces/test-ranges-001/events", params={"event_type": "nope"}, headers=auth_headers)
+    assert bad_type.status_code == 400
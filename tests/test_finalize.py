@@ -1,3 +1,4 @@
+import time
 import pytest
 from fastapi.testclient import TestClient
 from pathlib import Path
@@ -5,6 +6,7 @@ from unittest.mock import patch, MagicMock
 from datetime import datetime
 from main import app
 from app.storage import save_trace
+from app.qa import llm_judge
 from app.models import Trace, RepoInfo, ReasoningStepEvent, ReasoningStepEventData
 
 client = TestClient(app)
@@ -18,6 +20,27 @@ def cleanup():
         file.unlink()
 
 
+@pytest.fixture(autouse=True)
+def sync_judge(monkeypatch):
+    # The judge is mocked on the sync client
+    monkeypatch.setattr(llm_judge, "JUDGE_ASYNC", False)
+
+
+def _finalize_and_wait(trace_id: str, auth_headers, timeout: float = 600) -> dict:
+    response = client.post(f"/traces/{trace_id}/finalize", headers=auth_headers)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}", headers=auth_headers).json()
+        if job["status"] in ("completed", "failed"):
+            break
+        time.sleep(0.5)
+    assert job["status"] == "completed"
+    return client.get(f"/traces/{trace_id}", headers=auth_headers).json()
+
+
 @pytest.fixture
 def trace_with_reasoning():
     return Trace(
@@ -56,10 +79,9 @@ def test_finalize_endpoint_success(trace_with_reasoning, auth_headers):
         mock_response.choices[0].message.content = '{"score": 4.0, "feedback": "Good reasoning"}'
         mock_client.chat.completions.create.return_value = mock_response
         
-        response = client.post("/traces/test-finalize-001/finalize", headers=auth_headers)
-        
-        assert response.status_code == 200
-        data = response.json()
+        data = _finalize_and_wait("test-finalize-001", auth_headers)
+
+        assert data["qa_status"] == "completed"
         assert data["qa_results"] is not None
         assert data["qa_results"]["tests_passed"] is True
         assert data["qa_results"]["reasoning_score"] == 4.0
@@ -87,9 +109,7 @@ def test_finalize_without_reasoning_steps(auth_headers):
     )
     save_trace(trace)
     
-    response = client.post("/traces/test-finalize-002/finalize", headers=auth_headers)
-    
-    assert response.status_code == 200
-    data = response.json()
+    data = _finalize_and_wait("test-finalize-002", auth_headers)
+
     assert data["qa_results"]["tests_passed"] is True
     assert data["qa_results"]["reasoning_score"] is None
\ No newline at end of file
@@ -0,0 +1,141 @@
+import time
+import tarfile
+import threading
+import docker
+from app.qa import manage, test_runner
+from app.qa.image_cache import ImageCache
+
+
+class FakeImage:
+    def __init__(self, size):
+        self.attrs = {"Size": size}
+
+
+class FakeImages:
+    def __init__(self, size=100):
+        self.size = size
+        self.built = {}
+        self.contexts = []
+        self.removed = []
+
+    def get(self, tag):
+        if tag not in self.built:
+            raise docker.errors.ImageNotFound(tag)
+        return self.built[tag]
+
+    def build(self, fileobj, custom_context, tag, labels, rm):
+        time.sleep(0.05)
+        with tarfile.open(fileobj=fileobj) as tar:
+            self.contexts.append({m.name: tar.extractfile(m).read().decode() for m in tar.getmembers()})
+        self.built[tag] = FakeImage(self.size)
+        return self.built[tag], []
+
+    def remove(self, tag):
+        self.removed.append(tag)
+        del self.built[tag]
+
+
+class FakeClient:
+    def __init__(self, size=100):
+        self.images = FakeImages(size)
+
+
+def _repo(tmp_path, name, requirements):
+    repo = tmp_path / name
+    repo.mkdir()
+    if requirements is not None:
+        (repo / "requirements.txt").write_text(requirements)
+    return repo
+
+
+def test_tag_depends_on_requirements_and_base_image(tmp_path):
+    first = _repo(tmp_path, "a", "pytest\n")
+    same = _repo(tmp_path, "b", "pytest\n")
+    other = _repo(tmp_path, "c", "pytest==8.0\n")
+    cache = ImageCache(FakeClient)
+
+    assert cache.image_tag(first) == cache.image_tag(same)
+    assert cache.image_tag(first) != cache.image_tag(other)
+    assert ImageCache(FakeClient, base_image="python:3.12-slim").image_tag(first) != cache.image_tag(first)
+    assert cache.image_tag(_repo(tmp_path, "empty", None)) is None
+
+
+def test_image_is_built_once_and_reused(tmp_path):
+    client = FakeClient()
+    cache = ImageCache(lambda: client)
+    repo = _repo(tmp_path, "repo", "pytest\n")
+
+    tag = cache.ensure_image(repo)
+    assert cache.ensure_image(repo) == tag
+
+    assert list(client.images.built) == [tag]
+    context = client.images.contexts[0]
+    assert context["deps/requirements.txt"] == "pytest\n"
+    assert "pip install --no-cache-dir -r /deps/requirements.txt" in context["Dockerfile"]
+    assert cache.stats()["builds"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_concurrent_callers_share_one_build(tmp_path):
+    client = FakeClient()
+    cache = ImageCache(lambda: client)
+    repo = _repo(tmp_path, "repo", "pytest\n")
+    tags = []
+
+    threads = [threading.Thread(target=lambda: tags.append(cache.ensure_image(repo))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(tags)) == 1
+    assert len(client.images.contexts) == 1
+
+
+def test_least_recently_used_images_are_evicted_over_budget(tmp_path):
+    client = FakeClient(size=100)
+    cache = ImageCache(lambda: client, max_bytes=250)
+    repos = [_repo(tmp_path, f"repo{n}", f"package{n}\n") for n in range(3)]
+
+    first = cache.ensure_image(repos[0])
+    second = cache.ensure_image(repos[1])
+    cache.ensure_image(repos[0])
+    third = cache.ensure_image(repos[2])
+
+    assert client.images.removed == [second]
+    assert set(client.images.built) == {first, third}
+    assert cache.stats()["bytes"] == 200
+
+
+def test_prebuild_command_builds_images(tmp_path, monkeypatch, capsys):
+    client = FakeClient()
+    monkeypatch.setattr(test_runner, "image_cache", ImageCache(lambda: client))
+    monkeypatch.setattr(manage, "image_cache", test_runner.image_cache)
+    repo = _repo(tmp_path, "repo", "pytest\n")
+
+    manage.main(["prebuild-images", str(repo)])
+
+    assert len(client.images.built) == 1
+    assert "pr-telemetry-deps:" in capsys.readouterr().out
+
+
+def test_sandbox_falls_back_to_install_when_build_fails(tmp_path, monkeypatch):
+    class BrokenImages(FakeImages):
+        def build(self, **kwargs):
+            raise docker.errors.BuildError("pip failed", [])
+
+    client = FakeClient()
+    client.images = BrokenImages()
+    monkeypatch.setattr(test_runner, "image_cache", ImageCache(lambda: client))
+    repo = _repo(tmp_path, "repo", "pytest\n")
+
+    image, command, network = test_runner.select_sandbox(str(repo), "pytest")
+    assert image == test_runner.SANDBOX_IMAGE
+    assert command.startswith("pip install")
+    assert network is True
+
+    client.images = FakeImages()
+    image, command, network = test_runner.select_sandbox(str(repo), "pytest")
+    assert image.startswith("pr-telemetry-deps:")
+    assert command == "pytest"
+    assert network is False
@@ -0,0 +1,196 @@
+import os
+import time
+import threading
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from main import app
+from app.qa import jobs, pipeline
+from app.qa.jobs import JobQueue
+from app.models import QAJob, Trace, RepoInfo, ReasoningStepEvent, ReasoningStepEventData
+from app.storage import save_trace, load_trace
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def fake_qa(monkeypatch):
+    calls = []
+
+    def fake_tests(repo_path, test_command):
+        calls.append(("tests", test_command))
+        return {"tests_passed": True, "test_exit_code": 0, "test_output_snippet": "1 passed"}
+
+    def fake_judge(steps, use_cache=True):
+        calls.append(("judge", len(steps)) if use_cache else ("judge", len(steps), "refresh"))
+        return {"reasoning_score": 4.0, "reasoning_feedback": "Methodical"}
+
+    monkeypatch.setattr(pipeline, "run_tests_in_docker", fake_tests)
+    monkeypatch.setattr(pipeline, "evaluate_reasoning", fake_judge)
+    return calls
+
+
+def _trace(trace_id: str) -> Trace:
+    return Trace(
+        trace_id=trace_id,
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="sample-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0),
+        events=[
+            ReasoningStepEvent(
+                timestamp=datetime(2025, 11, 27, 10, 1, 0),
+                data=ReasoningStepEventData(content="The off-by-one is in the pagination helper")
+            )
+        ]
+    )
+
+
+def _wait(job_id: str, auth_headers, timeout: float = 10) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}", headers=auth_headers).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_finalize_returns_202_and_job_completes(fake_qa, auth_headers):
+    save_trace(_trace("test-jobs-001"))
+
+    response = client.post("/traces/test-jobs-001/finalize", headers=auth_headers)
+    assert response.status_code == 202
+    body = response.json()
+    assert body["trace_id"] == "test-jobs-001"
+
+    job = _wait(body["job_id"], auth_headers)
+    assert job["status"] == "completed"
+    assert job["started_at"] is not None and job["finished_at"] is not None
+
+    trace = load_trace("test-jobs-001")
+    assert trace.qa_status == "completed"
+    assert trace.qa_results.tests_passed is True
+    assert trace.qa_results.reasoning_score == 4.0
+    assert fake_qa == [("tests", "pytest"), ("judge", 1)]
+
+
+def test_failed_pipeline_marks_job_and_trace(monkeypatch, auth_headers):
+    def broken_tests(repo_path, test_command):
+        raise RuntimeError("sandbox unavailable")
+
+    monkeypatch.setattr(pipeline, "run_tests_in_docker", broken_tests)
+    save_trace(_trace("test-jobs-002"))
+
+    job_id = client.post("/traces/test-jobs-002/finalize", headers=auth_headers).json()["job_id"]
+    job = _wait(job_id, auth_headers)
+
+    assert job["status"] == "failed"
+    assert "sandbox unavailable" in job["error"]
+    assert load_trace("test-jobs-002").qa_status == "failed"
+
+
+def test_finalize_unknown_trace_and_job(auth_headers):
+    assert client.post("/traces/does-not-exist/finalize", headers=auth_headers).status_code == 404
+    assert client.get("/jobs/does-not-exist", headers=auth_headers).status_code == 404
+
+
+def test_active_job_is_reused(monkeypatch, fake_qa):
+    release = threading.Event()
+    original = pipeline.run_tests_in_docker
+
+    def slow_tests(repo_path, test_command):
+        release.wait(5)
+        return original(repo_path, test_command)
+
+    monkeypatch.setattr(pipeline, "run_tests_in_docker", slow_tests)
+    save_trace(_trace("test-jobs-003"))
+    queue = JobQueue(workers=1)
+
+    first = queue.submit("test-jobs-003")
+    second = queue.submit("test-jobs-003")
+    release.set()
+    queue.shutdown(wait=True)
+
+    assert second.job_id == first.job_id
+    assert queue.get(first.job_id).status == "completed"
+
+
+def test_docker_concurrency_limit(monkeypatch, fake_qa):
+    monkeypatch.setattr(pipeline, "docker_slots", threading.BoundedSemaphore(1))
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def tracked_tests(repo_path, test_command):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return {"tests_passed": True, "test_exit_code": 0, "test_output_snippet": ""}
+
+    monkeypatch.setattr(pipeline, "run_tests_in_docker", tracked_tests)
+    queue = JobQueue(workers=4)
+    for i in range(4):
+        save_trace(_trace(f"test-jobs-limit-{i}"))
+        queue.submit(f"test-jobs-limit-{i}")
+    queue.shutdown(wait=True)
+
+    assert len(peak) == 4
+    assert max(peak) == 1
+
+
+def test_unfinished_jobs_are_recovered(fake_qa, isolated_data):
+    save_trace(_trace("test-jobs-004"))
+    queue = JobQueue(workers=1)
+    interrupted = QAJob(
+        job_id="6f1c1c2e-0000-4000-8000-000000000001",
+        trace_id="test-jobs-004",
+        status="running",
+        created_at=datetime(2025, 11, 27, 10, 0, 0),
+        started_at=datetime(2025, 11, 27, 10, 0, 1)
+    )
+    queue._save(interrupted)
+
+    assert queue.recover() == 1
+    queue.shutdown(wait=True)
+
+    assert queue.get(interrupted.job_id).status == "completed"
+    assert load_trace("test-jobs-004").qa_status == "completed"
+
+
+def test_finalize_can_bypass_the_judge_cache(fake_qa, auth_headers):
+    save_trace(_trace("test-jobs-005"))
+
+    job_id = client.post("/traces/test-jobs-005/finalize?refresh_judge=true", headers=auth_headers).json()["job_id"]
+    job = _wait(job_id, auth_headers)
+
+    assert job["status"] == "completed"
+    assert job["refresh_judge"] is True
+    assert ("judge", 1, "refresh") in fake_qa
+
+
+def test_finished_jobs_are_archived_and_pruned(fake_qa, isolated_data, monkeypatch):
+    save_trace(_trace("test-jobs-006"))
+    queue = JobQueue(workers=1)
+    job = queue.submit("test-jobs-006")
+    queue.shutdown(wait=True)
+
+    jobs_dir = isolated_data / "jobs"
+    assert list(jobs_dir.glob("*.json")) == []
+    assert queue.get(job.job_id).status == "completed"
+    assert queue.recover() == 0
+
+    archived = jobs_dir / "finished" / f"{job.job_id}.json"
+    expired = time.time() - jobs.JOB_RETENTION_SECONDS - 60
+    os.utime(archived, (expired, expired))
+    assert queue.prune() == 1
+    assert queue.get(job.job_id) is None
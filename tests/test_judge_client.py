@@ -0,0 +1,241 @@
+import json
+import time
+import asyncio
+import threading
+import pytest
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from openai import BadRequestError
+from app.qa import judge_client, llm_judge
+from app.qa.judge_cache import JudgeCache
+from app.qa.judge_client import JudgeClient, TokenBucket
+from app.qa.llm_judge import evaluate_reasoning, evaluate_reasoning_async
+
+
+def _completion(content: str) -> dict:
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+    }
+
+
+VERDICT = _completion('{"score": 4.0, "feedback": "Systematic"}')
+
+
+class FakeOpenAI:
+    # OpenAI-compatible /chat/completions endpoint that replays scripted
+    # (status, body, headers) responses and then succeeds
+    def __init__(self):
+        self.script = deque()
+        self.delay = 0.0
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                with fake.lock:
+                    fake.calls += 1
+                    fake.active += 1
+                    fake.max_active = max(fake.max_active, fake.active)
+                    status, body, headers = fake.script.popleft() if fake.script else (200, VERDICT, {})
+                try:
+                    time.sleep(fake.delay)
+                    payload = json.dumps(body).encode("utf-8")
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with fake.lock:
+                        fake.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def fail(self, status: int, times: int = 1, headers: dict = None):
+        for _ in range(times):
+            self.script.append((status, {"error": {"message": f"HTTP {status}", "type": "error"}}, headers or {}))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    monkeypatch.setattr(judge_client, "JUDGE_BACKOFF_BASE_SECONDS", 0.01)
+    server = FakeOpenAI()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_client(fake_openai):
+    clients = []
+
+    def make(**kwargs):
+        client = JudgeClient(base_url=fake_openai.url, api_key="test-key", **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+REQUEST = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "judge this"}]}
+
+
+def test_retries_rate_limits_and_server_errors(fake_openai, make_client):
+    fake_openai.fail(429, headers={"retry-after": "0.05"})
+    fake_openai.fail(503)
+    client = make_client()
+
+    content, tokens = client.complete(REQUEST, 100)
+
+    assert json.loads(content)["score"] == 4.0
+    assert tokens == 20
+    assert fake_openai.calls == 3
+    assert client.stats()["retries"] == 2
+
+
+def test_client_errors_are_not_retried(fake_openai, make_client):
+    fake_openai.fail(400)
+    client = make_client()
+
+    with pytest.raises(BadRequestError):
+        client.complete(REQUEST, 100)
+
+    assert fake_openai.calls == 1
+    assert client.stats()["failures"] == 1
+
+
+def test_gives_up_after_max_retries(fake_openai, make_client):
+    fake_openai.fail(500, times=10)
+    client = make_client(max_retries=2)
+
+    with pytest.raises(Exception):
+        client.complete(REQUEST, 100)
+
+    assert fake_openai.calls == 3
+
+
+def test_concurrency_is_bounded_across_threads(fake_openai, make_client):
+    fake_openai.delay = 0.2
+    client = make_client(concurrency=2)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda _: client.complete(REQUEST, 100), range(6)))
+
+    assert len(results) == 6
+    assert fake_openai.max_active == 2
+
+
+def test_deadline_covers_the_whole_call(fake_openai, make_client):
+    fake_openai.delay = 3
+    client = make_client(deadline_seconds=0.5)
+
+    started = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        client.complete(REQUEST, 100)
+
+    assert time.perf_counter() - started < 2
+
+
+def test_token_bucket_waits_for_refill():
+    async def drain():
+        bucket = TokenBucket(per_minute=600)
+        assert await bucket.acquire(600) == 0
+        started = time.monotonic()
+        await bucket.acquire(5)
+        return time.monotonic() - started
+
+    assert 0.4 <= asyncio.run(drain()) < 1.5
+
+
+def test_request_rate_limit_spaces_out_calls(fake_openai, make_client):
+    # 120 per minute: a full bucket of 120, then one request every 0.5s
+    client = make_client(requests_per_minute=120)
+    loop = client._ensure_loop()
+    asyncio.run_coroutine_threadsafe(client._request_bucket.acquire(119), loop).result()
+
+    started = time.perf_counter()
+    client.complete(REQUEST, 100)
+    client.complete(REQUEST, 100)
+
+    assert time.perf_counter() - started >= 0.4
+    assert client.stats()["throttled_seconds"] > 0
+
+
+@pytest.fixture
+def async_judge(monkeypatch, make_client):
+    monkeypatch.setattr(llm_judge, "judge_cache", JudgeCache())
+    monkeypatch.setattr(llm_judge, "JUDGE_ASYNC", True)
+    monkeypatch.setattr(llm_judge, "judge_client", make_client())
+
+
+def test_evaluate_reasoning_uses_the_async_client(fake_openai, async_judge):
+    fake_openai.fail(429)
+
+    result = evaluate_reasoning(["Reproduced it", "Fixed the race"])
+
+    assert result["reasoning_score"] == 4.0
+    assert result["reasoning_feedback"] == "Systematic"
+    assert result["reasoning_cached"] is False
+    assert result["reasoning_usage"]["calls"] == 1
+    assert result["reasoning_usage"]["tokens"] == 20
+    assert fake_openai.calls == 2
+
+
+def test_evaluate_reasoning_async_shares_the_cache(fake_openai, async_judge):
+    first = asyncio.run(evaluate_reasoning_async(["Read the stack trace"]))
+    second = evaluate_reasoning(["Read the stack trace"])
+
+    assert first["reasoning_cached"] is False
+    assert second["reasoning_cached"] is True
+    assert fake_openai.calls == 1
+
+
+def test_unavailable_judge_is_not_a_score(fake_openai, async_judge):
+    fake_openai.fail(400)
+
+    result = asyncio.run(evaluate_reasoning_async(["Guessed"]))
+
+    assert result["reasoning_score"] is None
+    assert "unavailable" in result["reasoning_feedback"]
+
+
+def test_async_map_reduce_runs_windows_in_parallel(fake_openai, async_judge, monkeypatch):
+    monkeypatch.setattr(llm_judge, "JUDGE_MAP_REDUCE_TOKENS", 200)
+    monkeypatch.setattr(llm_judge, "JUDGE_WINDOW_TOKENS", 60)
+    monkeypatch.setattr(llm_judge, "JUDGE_WINDOW_OVERLAP_TOKENS", 0)
+    fake_openai.delay = 0.2
+    steps = [f"Step {i}: {'traced the request ' * 10}" for i in range(8)]
+
+    result = asyncio.run(evaluate_reasoning_async(steps))
+
+    usage = result["reasoning_usage"]
+    assert result["reasoning_score"] == 4.0
+    assert usage["mode"] == "map_reduce"
+    assert usage["calls"] == usage["windows"] + 1 == fake_openai.calls
+    assert usage["tokens"] == 20 * usage["calls"]
+    assert fake_openai.max_active > 1
@@ -0,0 +1,102 @@
+from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+from main import app
+from app.storage import save_trace
+from app.models import Trace, RepoInfo, QAResults
+
+client = TestClient(app)
+
+
+def _trace(n: int, developer_id: str = "dev-listing", repo: str = "listing-repo", qa: QAResults = None) -> Trace:
+    return Trace(
+        trace_id=f"test-listing-{n:03d}",
+        developer_id=developer_id,
+        bug_id=f"BUG-{n % 2}",
+        repo=RepoInfo(
+            name=repo,
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0) + timedelta(minutes=n),
+        qa_results=qa
+    )
+
+
+def test_list_filters_by_developer(auth_headers):
+    save_trace(_trace(1))
+    save_trace(_trace(2, developer_id="dev-listing-other"))
+
+    response = client.get("/traces", params={"developer_id": "dev-listing"}, headers=auth_headers)
+
+    assert response.status_code == 200
+    ids = [t["trace_id"] for t in response.json()["traces"]]
+    assert ids == ["test-listing-001"]
+
+
+def test_list_filters_by_qa_fields(auth_headers):
+    save_trace(_trace(1, qa=QAResults(tests_passed=True, reasoning_score=4.5)))
+    save_trace(_trace(2, qa=QAResults(tests_passed=False, reasoning_score=2.0)))
+    save_trace(_trace(3))
+
+    params = {"developer_id": "dev-listing", "tests_passed": "true", "min_score": 4.0}
+    traces = client.get("/traces", params=params, headers=auth_headers).json()["traces"]
+
+    assert [t["trace_id"] for t in traces] == ["test-listing-001"]
+    assert traces[0]["reasoning_score"] == 4.5
+
+
+def test_list_filters_by_time_window(auth_headers):
+    for n in range(1, 6):
+        save_trace(_trace(n))
+
+    params = {
+        "developer_id": "dev-listing",
+        "since": "2025-11-27T10:02:00Z",
+        "until": "2025-11-27T10:04:00Z",
+    }
+    traces = client.get("/traces", params=params, headers=auth_headers).json()["traces"]
+
+    assert [t["trace_id"] for t in traces] == ["test-listing-003", "test-listing-002"]
+
+
+def test_cursor_pagination_walks_all_pages(auth_headers):
+    for n in range(1, 8):
+        save_trace(_trace(n))
+
+    seen = []
+    params = {"developer_id": "dev-listing", "limit": 3}
+    while True:
+        page = client.get("/traces", params=params, headers=auth_headers).json()
+        seen.extend(t["trace_id"] for t in page["traces"])
+        if not page["next_cursor"]:
+            break
+        params["cursor"] = page["next_cursor"]
+
+    assert seen == [f"test-listing-{n:03d}" for n in range(7, 0, -1)]
+
+
+def test_append_updates_event_count(auth_headers):
+    save_trace(_trace(1))
+    events = {
+        "events": [
+            {"event_type": "reasoning_step", "timestamp": "2025-11-27T10:05:00Z", "data": {"content": "Step"}}
+        ]
+    }
+    client.post("/traces/test-listing-001/events", json=events, headers=auth_headers)
+
+    traces = client.get("/traces", params={"developer_id": "dev-listing"}, headers=auth_headers).json()["traces"]
+    counts = {t["trace_id"]: t["event_count"] for t in traces}
+    assert counts["test-listing-001"] == 1
+
+
+def test_invalid_cursor_rejected(auth_headers):
+    response = client.get("/traces", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_list_requires_auth():
+    response = client.get("/traces")
+    assert response.status_code == 401
@@ -1,6 +1,22 @@
+import json
 import pytest
 from unittest.mock import patch, MagicMock
-from app.qa import evaluate_reasoning
+from app.qa import evaluate_reasoning, llm_judge
+from app.qa.judge_cache import JudgeCache
+
+
+@pytest.fixture(autouse=True)
+def isolated_judge_cache(monkeypatch):
+    monkeypatch.setattr(llm_judge, "judge_cache", JudgeCache())
+    # These tests drive the sync client; the async path has its own tests
+    monkeypatch.setattr(llm_judge, "JUDGE_ASYNC", False)
+
+
+def _response(content):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
 
 
 def test_evaluate_reasoning_with_steps():
@@ -58,4 +74,185 @@ def test_evaluate_reasoning_formats_steps_correctly():
         
         assert "[1] First step" in prompt
         assert "[2] Second step" in prompt
-        assert "[3] Third step" in prompt
\ No newline at end of file
+        assert "[3] Third step" in prompt
+
+def test_identical_reasoning_is_served_from_cache():
+    with patch('app.qa.llm_judge.client') as mock_client:
+        mock_client.chat.completions.create.return_value = _response('{"score": 4.0, "feedback": "Solid"}')
+
+        first = evaluate_reasoning(["Reproduced the crash", "Fixed the null check"])
+        second = evaluate_reasoning(["Reproduced the crash", "Fixed the null check"])
+
+        assert mock_client.chat.completions.create.call_count == 1
+        assert first["reasoning_cached"] is False
+        assert second["reasoning_score"] == 4.0
+        assert second["reasoning_cached"] is True
+        assert second["reasoning_usage"]["calls"] == 0
+
+
+def test_failed_evaluations_are_not_cached():
+    with patch('app.qa.llm_judge.client') as mock_client:
+        mock_client.chat.completions.create.side_effect = [
+            Exception("rate limited"),
+            _response('{"score": 2.0, "feedback": "Guesswork"}'),
+        ]
+
+        assert evaluate_reasoning(["Tried things"])["reasoning_score"] is None
+        result = evaluate_reasoning(["Tried things"])
+
+        assert result["reasoning_score"] == 2.0
+        assert result["reasoning_cached"] is False
+
+
+@pytest.mark.parametrize("score", [0, 7, 5.5])
+def test_out_of_range_scores_are_unavailable_and_not_cached(score):
+    with patch('app.qa.llm_judge.client') as mock_client:
+        mock_client.chat.completions.create.side_effect = [
+            _response(json.dumps({"score": score, "feedback": "Off the scale"})),
+            _response('{"score": 5.0, "feedback": "Top of the scale"}'),
+        ]
+
+        first = evaluate_reasoning(["Checked the retry loop"])
+        assert first["reasoning_score"] is None
+        assert "outside" in first["reasoning_feedback"]
+
+        second = evaluate_reasoning(["Checked the retry loop"])
+        assert second["reasoning_score"] == 5.0
+        assert second["reasoning_cached"] is False
+
+
+@pytest.mark.parametrize("content", ['{"feedback": "No score given"}', '{"score": "high", "feedback": "Words"}'])
+def test_missing_scores_are_unavailable_and_not_cached(content):
+    with patch('app.qa.llm_judge.client') as mock_client:
+        mock_client.chat.completions.create.side_effect = [
+            _response(content),
+            _response('{"score": 3.5, "feedback": "Fine"}'),
+        ]
+
+        first = evaluate_reasoning(["Read the stack trace"])
+        assert first["reasoning_score"] is None
+        assert "no numeric score" in first["reasoning_feedback"]
+
+        second = evaluate_reasoning(["Read the stack trace"])
+        assert second["reasoning_score"] == 3.5
+        assert second["reasoning_cached"] is False
+
+
+def test_cache_key_covers_prompt_and_model(monkeypatch):
+    with patch('app.qa.llm_judge.client') as mock_client:
+        mock_client.chat.completions.create.return_value = _response('{"score": 3.0, "feedback": "Adequate"}')
+
+        evaluate_reasoning(["Read the logs"])
+        monkeypatch.setattr(llm_judge, "JUDGE_PROMPT_TEMPLATE", llm_judge.JUDGE_PROMPT_TEMPLATE + "\nBe strict.")
+        evaluate_reasoning(["Read the logs"])
+        monkeypatch.setattr(llm_judge, "JUDGE_MODEL", "gpt-4o")
+        evaluate_reasoning(["Read the logs"])
+
+        assert mock_client.chat.completions.create.call_count == 3
+
+
+def test_bypass_rescores_and_refreshes_the_cache():
+    with patch('app.qa.llm_judge.client') as mock_client:
+        mock_client.chat.completions.create.side_effect = [
+            _response('{"score": 3.0, "feedback": "First"}'),
+            _response('{"score": 4.0, "feedback": "Second"}'),
+        ]
+
+        evaluate_reasoning(["Bisected the regression"])
+        refreshed = evaluate_reasoning(["Bisected the regression"], use_cache=False)
+        cached = evaluate_reasoning(["Bisected the regression"])
+
+        assert refreshed["reasoning_score"] == 4.0
+        assert cached["reasoning_score"] == 4.0
+        assert cached["reasoning_cached"] is True
+
+
+def test_split_windows_overlap_and_cover_every_step():
+    steps = ["x" * 40] * 10  # 10 tokens each
+
+    windows = llm_judge.split_windows(steps, window_tokens=35, overlap_tokens=10)
+
+    assert windows[0] == [0, 1, 2]
+    assert all(len(window) <= 3 for window in windows)
+    assert all(later[0] == earlier[-1] for earlier, later in zip(windows, windows[1:]))
+    assert sorted({i for window in windows for i in window}) == list(range(10))
+
+
+def test_split_windows_gives_an_oversized_step_its_own_window():
+    steps = ["short", "y" * 4000, "short"]
+
+    assert llm_judge.split_windows(steps, window_tokens=100, overlap_tokens=10) == [[0], [1], [2]]
+
+
+@pytest.fixture
+def small_windows(monkeypatch):
+    monkeypatch.setattr(llm_judge, "JUDGE_MAP_REDUCE_TOKENS", 200)
+    monkeypatch.setattr(llm_judge, "JUDGE_WINDOW_TOKENS", 60)
+    monkeypatch.setattr(llm_judge, "JUDGE_WINDOW_OVERLAP_TOKENS", 25)
+
+
+def _map_reduce_client(mock_client, failing_part=None):
+    prompts = []
+
+    def create(**kwargs):
+        prompt = kwargs["messages"][0]["content"]
+        prompts.append(prompt)
+        if "You are reviewing part" in prompt:
+            part = prompt.split("part ", 1)[1].split(" ", 1)[0]
+            if part == failing_part:
+                raise Exception("context length exceeded")
+            return _response(json.dumps({"summary": f"Summary of part {part}", "score": 3.0}))
+        return _response('{"score": 4.0, "feedback": "Coherent across the session"}')
+
+    mock_client.chat.completions.create.side_effect = create
+    return prompts
+
+
+def test_long_reasoning_is_judged_map_reduce(small_windows):
+    steps = [f"Step {i}: checked the retry path and found {'detail ' * 10}" for i in range(12)]
+
+    with patch('app.qa.llm_judge.client') as mock_client:
+        prompts = _map_reduce_client(mock_client)
+        result = evaluate_reasoning(steps)
+
+    window_prompts = [p for p in prompts if "You are reviewing part" in p]
+    reduce_prompt = prompts[-1]
+    assert result["reasoning_score"] == 4.0
+    assert result["reasoning_usage"]["mode"] == "map_reduce"
+    assert result["reasoning_usage"]["windows"] == len(window_prompts) > 1
+    assert result["reasoning_usage"]["calls"] == len(window_prompts) + 1
+    assert all(f"[{i + 1}] Step {i}:" in "".join(window_prompts) for i in range(12))
+    assert "Part 1 (score 3.0): Summary of part 1" in reduce_prompt
+    assert f"split into {len(window_prompts)} overlapping parts" in reduce_prompt
+
+
+def test_failed_window_makes_the_evaluation_unavailable(small_windows):
+    steps = [f"Step {i}: {'looked at logs ' * 8}" for i in range(12)]
+
+    with patch('app.qa.llm_judge.client') as mock_client:
+        _map_reduce_client(mock_client, failing_part="2")
+        result = evaluate_reasoning(steps)
+        mock_client.chat.completions.create.side_effect = None
+        mock_client.chat.completions.create.return_value = _response('{"score": 3.5, "feedback": "Retried"}')
+        retried = evaluate_reasoning(steps)
+
+    assert result["reasoning_score"] is None
+    assert "context length exceeded" in result["reasoning_feedback"]
+    assert retried["reasoning_cached"] is False
+
+
+def test_window_without_score_makes_the_evaluation_unavailable(small_windows):
+    steps = [f"Step {i}: {'looked at logs ' * 8}" for i in range(12)]
+
+    with patch('app.qa.llm_judge.client') as mock_client:
+        def create(**kwargs):
+            if "You are reviewing part" in kwargs["messages"][0]["content"]:
+                return _response('{"summary": "Read the logs"}')
+            return _response('{"score": 4.0, "feedback": "Coherent"}')
+
+        mock_client.chat.completions.create.side_effect = create
+        result = evaluate_reasoning(steps)
+
+    assert result["reasoning_score"] is None
+    assert "no numeric score" in result["reasoning_feedback"]
+    assert llm_judge.judge_cache.get(llm_judge.reasoning_key(steps)) is None
@@ -0,0 +1,94 @@
+import io
+import tarfile
+from app.models import QAResults
+from app.qa import result_cache, test_runner
+from app.qa.container_pool import read_report
+from app.qa.junit import junit_key, parse_junit
+from app.qa.output_capture import BoundedOutput, snippet
+
+JUNIT = b"""<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" tests="4">
+<testcase classname="tests.test_calc" name="test_add" time="0.012"/>
+<testcase classname="tests.test_calc.TestDivide" name="test_zero[1]" time="1.5">
+  <failure message="ZeroDivisionError: division by zero">traceback</failure>
+</testcase>
+<testcase classname="tests.test_calc" name="test_fixture" time="0"><error message="fixture missing"/></testcase>
+<testcase classname="tests.test_calc" name="test_slow" time="0"><skipped message="slow"/></testcase>
+</testsuite></testsuites>"""
+
+
+def test_bounded_output_keeps_head_and_tail():
+    output = BoundedOutput(head_bytes=10, tail_bytes=20)
+    for n in range(10_000):
+        output.feed(f"line {n}\n".encode())
+
+    text = output.text()
+    assert text.startswith("line 0\nlin")
+    assert text.endswith("line 9998\nline 9999\n")
+    assert f"[{output.total_bytes - 30} bytes omitted]" in text
+    assert len(output._tail) <= 40
+
+
+def test_bounded_output_returns_short_streams_unchanged():
+    output = BoundedOutput(head_bytes=10, tail_bytes=20)
+    output.feed(b"hello ")
+    output.feed(b"world, all passed")
+    assert output.text() == "hello world, all passed"
+
+
+def test_snippet_keeps_the_failure_summary_at_the_end():
+    output = "Collecting pytest\n" * 500 + "FAILED tests/test_a.py::test_x - assert 1 == 2\n"
+    result = snippet(output)
+
+    assert len(result) <= 2010
+    assert result.startswith("Collecting pytest")
+    assert result.endswith("FAILED tests/test_a.py::test_x - assert 1 == 2\n")
+
+
+def test_junit_report_is_parsed_into_test_cases():
+    cases = parse_junit(JUNIT)
+
+    assert [(c["name"], c["outcome"]) for c in cases] == [
+        ("test_add", "passed"), ("test_zero[1]", "failed"), ("test_fixture", "error"), ("test_slow", "skipped")
+    ]
+    assert cases[1]["duration_ms"] == 1500
+    assert cases[1]["message"] == "ZeroDivisionError: division by zero"
+    assert QAResults(test_cases=cases).test_cases[1].outcome == "failed"
+    assert parse_junit(b"<not xml") == []
+    assert parse_junit(None) == []
+
+
+def test_junit_key_matches_node_ids():
+    assert junit_key("tests/test_calc.py::test_add") == ("tests.test_calc", "test_add")
+    assert junit_key("tests/test_calc.py::TestDivide::test_zero[1]") == ("tests.test_calc.TestDivide", "test_zero[1]")
+
+
+def test_report_is_read_from_the_container_archive():
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        info = tarfile.TarInfo("pr-telemetry-report.xml")
+        info.size = len(JUNIT)
+        tar.addfile(info, io.BytesIO(JUNIT))
+
+    class Container:
+        def get_archive(self, path):
+            data = buffer.getvalue()
+            return iter([data[:100], data[100:]]), {"size": len(JUNIT)}
+
+    assert read_report(Container()) == JUNIT
+
+
+def test_local_run_records_per_test_outcomes(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_DIR", tmp_path / "test_results")
+    repo = tmp_path / "repo"
+    (repo / "tests").mkdir(parents=True)
+    (repo / "tests" / "test_mixed.py").write_text(
+        "def test_ok():\n    print('x' * 100000)\n\ndef test_bad():\n    assert 1 == 2\n"
+    )
+
+    result = test_runner.run_tests_in_docker(str(repo), "python -m pytest -s", backend="local")
+
+    outcomes = {case["name"]: case["outcome"] for case in result["test_cases"]}
+    assert outcomes == {"test_ok": "passed", "test_bad": "failed"}
+    assert result["test_status"] == "failed"
+    assert "1 failed, 1 passed" in result["test_output_snippet"]
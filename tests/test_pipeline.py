@@ -0,0 +1,115 @@
+import time
+import pytest
+from datetime import datetime
+from app.qa import pipeline
+from app.qa.pipeline import Stage, StageFailed, run_qa_pipeline, run_stages
+from app.models import Trace, RepoInfo, ReasoningStepEvent, ReasoningStepEventData
+from app.storage import save_trace, load_trace
+
+
+@pytest.fixture
+def sample_trace():
+    trace = Trace(
+        trace_id="test-pipeline-001",
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="sample-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0),
+        events=[
+            ReasoningStepEvent(
+                timestamp=datetime(2025, 11, 27, 10, 1, 0),
+                data=ReasoningStepEventData(content="The cache key ignores the locale")
+            )
+        ]
+    )
+    save_trace(trace)
+    return trace
+
+
+def _slow_tests(repo_path, test_command):
+    time.sleep(0.3)
+    return {"tests_passed": True, "test_exit_code": 0, "test_output_snippet": "3 passed"}
+
+
+def _slow_judge(steps, use_cache=True):
+    time.sleep(0.3)
+    return {"reasoning_score": 4.0, "reasoning_feedback": "Clear hypothesis"}
+
+
+def test_tests_and_judge_run_concurrently(sample_trace, monkeypatch):
+    monkeypatch.setattr(pipeline, "run_tests_in_docker", _slow_tests)
+    monkeypatch.setattr(pipeline, "evaluate_reasoning", _slow_judge)
+
+    started = time.perf_counter()
+    qa = run_qa_pipeline("test-pipeline-001")
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.55
+    assert qa.tests_passed is True
+    assert qa.reasoning_score == 4.0
+    assert set(qa.stage_timings_ms) == {"tests", "reasoning_steps", "judge"}
+    assert qa.stage_timings_ms["tests"] >= 300
+
+    stored = load_trace("test-pipeline-001")
+    assert stored.qa_status == "completed"
+    assert stored.qa_results.stage_errors == {}
+
+
+def test_partial_results_survive_a_failed_stage(sample_trace, monkeypatch):
+    def broken_judge(steps, use_cache=True):
+        raise RuntimeError("judge unavailable")
+
+    monkeypatch.setattr(pipeline, "run_tests_in_docker", _slow_tests)
+    monkeypatch.setattr(pipeline, "evaluate_reasoning", broken_judge)
+
+    with pytest.raises(StageFailed):
+        run_qa_pipeline("test-pipeline-001")
+
+    qa = load_trace("test-pipeline-001").qa_results
+    assert qa.tests_passed is True
+    assert qa.reasoning_score is None
+    assert qa.stage_errors == {"judge": "judge unavailable"}
+    assert "tests" in qa.stage_timings_ms
+
+
+def test_dependents_of_failed_stage_are_skipped(sample_trace):
+    seen = []
+
+    def fail(trace, outputs):
+        raise ValueError("boom")
+
+    def never(trace, outputs):
+        seen.append("dependent")
+        return {}
+
+    def independent(trace, outputs):
+        return {"value": 1}
+
+    results = []
+    outputs = run_stages(
+        [Stage("a", fail), Stage("b", never, depends_on=("a",)), Stage("c", independent)],
+        sample_trace,
+        lambda stage, result, error, elapsed: results.append((stage.name, error)),
+    )
+
+    assert seen == []
+    assert outputs == {"c": {"value": 1}}
+    errors = {name: str(error) for name, error in results if error is not None}
+    assert errors == {"a": "boom", "b": "skipped because a failed"}
+
+
+def test_dependent_stage_receives_upstream_output(sample_trace):
+    stages = [
+        Stage("first", lambda trace, outputs: {"n": 2}),
+        Stage("second", lambda trace, outputs: {"n": outputs["first"]["n"] * 10}, depends_on=("first",)),
+    ]
+
+    outputs = run_stages(stages, sample_trace, lambda *args: None)
+
+    assert outputs["second"] == {"n": 20}
@@ -0,0 +1,148 @@
+import subprocess
+import pytest
+from datetime import datetime
+from app.qa import pipeline, resource_usage
+from app.qa.resource_usage import (
+    ResourceUsage,
+    estimate_cost,
+    parse_cgroup_snapshots,
+    record_cost_profile,
+    with_usage_snapshots,
+)
+from app.qa.runners import LocalRunner
+from app.models import Trace, RepoInfo
+from app.storage import save_trace
+
+CGROUP_V2 = """## before cpu.stat
+usage_usec 1500000
+user_usec 1000000
+## before io.stat
+8:0 rbytes=4096 wbytes=0 rios=1 wios=0
+## before memory.peak
+50000000
+## after cpu.stat
+usage_usec 4000000
+user_usec 3000000
+## after io.stat
+8:0 rbytes=8192 wbytes=1024 rios=2 wios=1
+8:16 rbytes=100 wbytes=200 rios=1 wios=1
+## after memory.peak
+300000000
+"""
+
+CGROUP_V1 = """## before cpuacct/cpuacct.usage
+2000000000
+## after cpuacct/cpuacct.usage
+2500000000
+## after blkio/blkio.throttle.io_service_bytes
+8:0 Read 2048
+8:0 Write 512
+8:0 Total 2560
+Total 2560
+## after memory/memory.max_usage_in_bytes
+123456
+"""
+
+
+def test_parse_cgroup_v2_snapshots():
+    snapshots = parse_cgroup_snapshots(CGROUP_V2)
+
+    assert snapshots["before"] == {"cpu_us": 1500000, "rbytes": 4096, "wbytes": 0, "memory_peak": 50000000}
+    assert snapshots["after"] == {"cpu_us": 4000000, "rbytes": 8292, "wbytes": 1224, "memory_peak": 300000000}
+
+
+def test_usage_is_the_delta_between_snapshots():
+    usage = ResourceUsage()
+    usage.add_cgroup(CGROUP_V2)
+    usage.add_cgroup(CGROUP_V1)
+
+    assert usage.result(1.5) == {
+        "wall_ms": 1500,
+        "cpu_ms": 2500 + 500,
+        "peak_memory_bytes": 300000000,
+        "io_read_bytes": 4196 + 2048,
+        "io_write_bytes": 1224 + 512,
+    }
+
+
+def test_usage_without_cgroup_files_stays_unmeasured():
+    usage = ResourceUsage()
+    usage.add_cgroup("")
+    usage.add_cgroup("## before cpu.stat\nusage_usec 10\n")
+
+    assert usage.result(0.25) == {
+        "wall_ms": 250,
+        "cpu_ms": None,
+        "peak_memory_bytes": None,
+        "io_read_bytes": None,
+        "io_write_bytes": None,
+    }
+
+
+def test_usage_snapshots_keep_the_command_exit_status(tmp_path):
+    command = with_usage_snapshots("echo 'it''s here'; exit 3", str(tmp_path / "usage"))
+
+    completed = subprocess.run(["sh", "-c", command], capture_output=True, text=True)
+
+    assert completed.returncode == 3
+    assert completed.stdout == "its here\n"
+    assert (tmp_path / "usage").exists()
+
+
+def test_local_runner_records_rusage(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    runner = LocalRunner()
+    sandbox = runner.sandbox(str(repo), repo, "true")
+
+    exit_code, _, _ = sandbox.run("python -c 'data = bytearray(64 * 1024 ** 2); sum(range(3 * 10 ** 6))'")
+
+    usage = sandbox.usage.result(1.0)
+    assert exit_code == 0
+    assert usage["cpu_ms"] > 0
+    assert usage["peak_memory_bytes"] >= 64 * 1024 ** 2
+    assert usage["io_read_bytes"] is not None
+
+
+def test_cost_profile_keeps_moving_averages_and_maximums(monkeypatch):
+    monkeypatch.setattr(resource_usage, "COST_PROFILE_WEIGHT", 0.5)
+    assert estimate_cost("sample_repo") is None
+
+    record_cost_profile("sample_repo", {"wall_ms": 1000, "cpu_ms": 800, "peak_memory_bytes": None})
+    record_cost_profile("sample_repo", {"wall_ms": 3000, "cpu_ms": 400, "peak_memory_bytes": 1024})
+
+    assert estimate_cost("sample_repo") == {"runs": 2, "wall_ms": 2000, "cpu_ms": 600, "peak_memory_bytes": 1024}
+    assert resource_usage.load_cost_profiles()["sample_repo"]["max"]["wall_ms"] == 3000
+    assert estimate_cost("other_repo") is None
+
+
+@pytest.fixture
+def usage_trace(monkeypatch):
+    monkeypatch.setattr(pipeline, "evaluate_reasoning", lambda steps, use_cache=True: {"reasoning_score": 4.0, "reasoning_feedback": "ok"})
+    save_trace(Trace(
+        trace_id="test-usage-001",
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="sample-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0),
+        events=[]
+    ))
+
+
+@pytest.mark.parametrize("cached, profiled", [(False, True), (True, False)])
+def test_pipeline_records_usage_of_fresh_full_runs(usage_trace, monkeypatch, cached, profiled):
+    usage = {"wall_ms": 5000, "cpu_ms": 4000, "peak_memory_bytes": 2 ** 28, "io_read_bytes": 0, "io_write_bytes": 4096}
+    monkeypatch.setattr(pipeline, "run_tests_in_docker", lambda repo_path, test_command: {
+        "tests_passed": True, "test_exit_code": 0, "test_status": "passed", "tests_cached": cached, "test_usage": usage,
+    })
+
+    qa = pipeline.run_qa_pipeline("test-usage-001")
+
+    assert qa.test_usage.cpu_ms == 4000
+    assert (pipeline.estimate_test_cost() is not None) is profiled
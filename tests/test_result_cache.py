@@ -0,0 +1,138 @@
+import time
+import threading
+import pytest
+from app.qa import test_runner
+from app.qa.result_cache import ResultCache
+
+PASSED = {"tests_passed": True, "test_exit_code": 0, "test_status": "passed", "test_output_snippet": "3 passed"}
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / "tests").mkdir(parents=True)
+    (repo / "tests" / "test_a.py").write_text("def test_a():\n    assert True\n")
+    (repo / "requirements.txt").write_text("pytest\n")
+    return repo
+
+
+def _always(result):
+    return True
+
+
+def test_key_changes_with_content_command_and_image(repo):
+    cache = ResultCache()
+    key = cache.key(repo, "pytest", "python:3.11-slim")
+
+    assert cache.key(repo, "pytest", "python:3.11-slim") == key
+    assert cache.key(repo, "pytest -x", "python:3.11-slim") != key
+    assert cache.key(repo, "pytest", "python:3.12-slim") != key
+
+    (repo / "__pycache__").mkdir()
+    (repo / "__pycache__" / "a.pyc").write_bytes(b"ignored")
+    assert cache.key(repo, "pytest", "python:3.11-slim") == key
+
+    (repo / "tests" / "test_a.py").write_text("def test_a():\n    assert False\n")
+    assert cache.key(repo, "pytest", "python:3.11-slim") != key
+
+
+def test_results_are_served_from_cache_until_ttl(repo):
+    cache = ResultCache(ttl_seconds=0.2)
+    runs = []
+
+    def execute():
+        runs.append(1)
+        return dict(PASSED)
+
+    assert cache.run("k", execute, _always) == (PASSED, False)
+    assert cache.run("k", execute, _always) == (PASSED, True)
+    time.sleep(0.3)
+    assert cache.run("k", execute, _always) == (PASSED, False)
+    assert len(runs) == 2
+
+
+def test_uncacheable_results_are_not_stored():
+    cache = ResultCache()
+    failure = {"tests_passed": False, "test_exit_code": -1, "test_output_snippet": "Docker error"}
+
+    cache.run("k", lambda: failure, lambda result: result["test_exit_code"] != -1)
+
+    assert cache.get("k") is None
+
+
+def test_oldest_entries_are_evicted_over_max_entries():
+    cache = ResultCache(max_entries=2)
+    for key in ["a", "b", "c"]:
+        cache.put(key, PASSED)
+        time.sleep(0.01)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == PASSED
+    assert cache.get("c") == PASSED
+
+
+def test_identical_concurrent_runs_are_coalesced():
+    cache = ResultCache()
+    runs = []
+    results = []
+
+    def execute():
+        runs.append(1)
+        time.sleep(0.2)
+        return dict(PASSED)
+
+    threads = [threading.Thread(target=lambda: results.append(cache.run("k", execute, _always))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(runs) == 1
+    assert [cached for _, cached in results].count(False) == 1
+    assert all(result == PASSED for result, _ in results)
+
+
+def test_waiters_see_the_leaders_error():
+    cache = ResultCache()
+    started = threading.Event()
+    errors = []
+
+    def execute():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("sandbox crashed")
+
+    def call():
+        try:
+            cache.run("k", execute, _always)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    waiter = threading.Thread(target=call)
+    waiter.start()
+    leader.join()
+    waiter.join()
+
+    assert errors == ["sandbox crashed", "sandbox crashed"]
+
+
+def test_run_tests_in_docker_reports_cache_hits(repo, monkeypatch):
+    runs = []
+
+    def fake_execute(repo_path, abs_repo_path, test_command, *args):
+        runs.append(test_command)
+        return dict(PASSED)
+
+    monkeypatch.setattr(test_runner, "result_cache", ResultCache())
+    monkeypatch.setattr(test_runner, "_execute_tests", fake_execute)
+
+    first = test_runner.run_tests_in_docker(str(repo), "pytest")
+    second = test_runner.run_tests_in_docker(str(repo), "pytest")
+
+    assert first["tests_cached"] is False
+    assert second["tests_cached"] is True
+    assert second["test_output_snippet"] == "3 passed"
+    assert runs == ["pytest"]
@@ -0,0 +1,106 @@
+import time
+import pytest
+from pathlib import Path
+from app.qa import result_cache, runners, test_runner
+from app.qa.runners import LocalRunner, SandboxTimeout, parse_backend_overrides
+
+
+@pytest.fixture(autouse=True)
+def isolated_result_cache(monkeypatch):
+    monkeypatch.setattr(test_runner, "result_cache", result_cache.ResultCache())
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / "tests").mkdir(parents=True)
+    (repo / "tests" / "test_ok.py").write_text("def test_ok():\n    assert 1 + 1 == 2\n")
+    return repo
+
+
+def test_local_backend_runs_pytest(repo):
+    result = test_runner.run_tests_in_docker(str(repo), "python -m pytest -q", backend="local")
+
+    assert result["tests_passed"] is True
+    assert result["test_exit_code"] == 0
+    assert "1 passed" in result["test_output_snippet"]
+
+
+def test_local_backend_reports_failures(repo):
+    (repo / "tests" / "test_bad.py").write_text("def test_bad():\n    assert 1 == 2\n")
+
+    result = test_runner.run_tests_in_docker(str(repo), "python -m pytest -q", backend="local")
+
+    assert result["tests_passed"] is False
+    assert result["test_exit_code"] == 1
+
+
+def test_local_runner_works_on_a_private_copy_with_scrubbed_env(repo, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "secret-key")
+
+    exit_code, output, report = LocalRunner().run_command(repo, "env; pwd; touch created.txt")
+
+    assert exit_code == 0
+    assert "secret-key" not in output
+    assert "API_TOKEN" not in output
+    assert str(repo) not in output
+    assert not (repo / "created.txt").exists()
+
+
+def test_local_runner_kills_the_process_group_on_timeout(repo):
+    started = time.perf_counter()
+    with pytest.raises(SandboxTimeout) as excinfo:
+        LocalRunner().run_command(repo, "sleep 30 & echo $!; sleep 30", timeout=0.5)
+
+    assert time.perf_counter() - started < 10
+    background_pid = int(excinfo.value.output.split()[0])
+    status = Path(f"/proc/{background_pid}/status")
+    assert not status.exists() or "zombie" in status.read_text()
+
+
+def test_local_runner_enforces_memory_limit(repo, monkeypatch):
+    monkeypatch.setattr(runners, "LOCAL_MEMORY_BYTES", 256 * 1024 ** 2)
+
+    exit_code, output, _ = LocalRunner().run_command(repo, "python -c 'bytearray(1024 ** 3)'")
+
+    assert exit_code != 0
+    assert "MemoryError" in output
+
+
+def test_local_runner_enforces_file_size_limit(repo, monkeypatch):
+    monkeypatch.setattr(runners, "LOCAL_FILE_BYTES", 1024 ** 2)
+
+    write = "python -c 'open(\"out.bin\", \"wb\").write(b\"0\" * {})'"
+    assert LocalRunner().run_command(repo, write.format(512 * 1024))[0] == 0
+    exit_code, output, _ = LocalRunner().run_command(repo, write.format(2 * 1024 ** 2))
+
+    assert exit_code != 0
+    assert "File too large" in output
+
+
+def test_backend_is_selected_per_repo(monkeypatch):
+    assert parse_backend_overrides("sample_repo=local, other = docker,broken") == {
+        "sample_repo": "local", "other": "docker"
+    }
+
+    monkeypatch.setattr(runners, "RUNNER_BACKEND", "docker")
+    monkeypatch.setattr(runners, "RUNNER_BACKENDS", "trusted=local")
+    assert test_runner.get_runner("repos/trusted").name == "local"
+    assert test_runner.get_runner("repos/untrusted").name == "docker"
+    assert test_runner.get_runner("repos/trusted", backend="docker").name == "docker"
+
+
+def test_unknown_backend_is_reported(repo):
+    result = test_runner.run_tests_in_docker(str(repo), "pytest", backend="vm")
+
+    assert result["test_exit_code"] == -1
+    assert "Unknown test runner backend: vm" in result["test_output_snippet"]
+
+
+def test_timed_out_run_reports_timeout_status(repo):
+    result = test_runner.run_tests_in_docker(str(repo), "sleep 30", timeout=0.5, backend="local")
+
+    assert result["tests_passed"] is False
+    assert result["test_status"] == "timeout"
+    assert "exceeded 0.5s timeout" in result["test_output_snippet"]
+    assert result["tests_cached"] is False
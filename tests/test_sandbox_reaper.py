@@ -0,0 +1,98 @@
+import pytest
+import requests
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from app.qa import test_runner
+from app.qa.container_pool import SANDBOX_LABEL, OWNER_LABEL, INSTANCE_ID
+from app.qa.reaper import reap_orphans
+from app.qa.runners import SandboxTimeout
+
+
+class FakeContainer:
+    def __init__(self, container_id, owner=INSTANCE_ID, age=0.0, wait_result=None):
+        self.id = container_id
+        self.short_id = container_id[:6]
+        created = datetime.now(timezone.utc) - timedelta(seconds=age)
+        self.attrs = {"Created": created.strftime("%Y-%m-%dT%H:%M:%S.123456789Z")}
+        self.labels = {SANDBOX_LABEL: "1", OWNER_LABEL: owner}
+        self.wait_result = wait_result
+        self.killed = False
+        self.removed = False
+
+    def wait(self, timeout=None):
+        if self.wait_result is None:
+            raise requests.exceptions.ReadTimeout("read timed out")
+        return self.wait_result
+
+    def logs(self, stream=False, follow=False):
+        return iter([b"partial ", b"output"])
+
+    def get_archive(self, path):
+        raise FileNotFoundError(path)
+
+    def kill(self):
+        self.killed = True
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeContainers:
+    def __init__(self, containers=(), started=None):
+        self.containers = list(containers)
+        self.started = started
+        self.list_filters = None
+
+    def list(self, all=False, filters=None):
+        self.list_filters = filters
+        return self.containers
+
+    def run(self, **kwargs):
+        self.run_kwargs = kwargs
+        return self.started
+
+
+class FakeClient:
+    def __init__(self, containers):
+        self.containers = containers
+
+
+def test_reaper_removes_untracked_and_stale_containers():
+    tracked = FakeContainer("tracked-own", age=7200)
+    leaked = FakeContainer("leaked-own", age=120)
+    starting = FakeContainer("starting-own", age=5)
+    other_live = FakeContainer("other-recent", owner="other-host-1", age=600)
+    other_dead = FakeContainer("other-stale", owner="crashed-host-1", age=7200)
+    client = FakeClient(FakeContainers([tracked, leaked, starting, other_live, other_dead]))
+
+    removed = reap_orphans(client, {"tracked-own"}, max_age=3600)
+
+    assert removed == ["leaked-own", "other-stale"]
+    assert client.containers.list_filters == {"label": SANDBOX_LABEL}
+    assert not tracked.removed and not starting.removed and not other_live.removed
+
+
+def test_one_shot_run_is_killed_and_removed_on_timeout(monkeypatch):
+    container = FakeContainer("oneshot")
+    client = FakeClient(FakeContainers(started=container))
+    monkeypatch.setattr(test_runner, "CONTAINER_POOL_SIZE", 0)
+    monkeypatch.setattr(test_runner, "get_docker_client", lambda: client)
+
+    with pytest.raises(SandboxTimeout) as excinfo:
+        test_runner._run_command(Path("/repo"), "pytest", "python:3.11-slim", True, timeout=1)
+
+    assert excinfo.value.output == "partial output"
+    assert container.killed and container.removed
+    assert client.containers.run_kwargs["detach"] is True
+    assert client.containers.run_kwargs["labels"][OWNER_LABEL] == INSTANCE_ID
+    assert test_runner.live_sandbox_ids() == set()
+
+
+def test_one_shot_run_returns_exit_code_and_logs(monkeypatch):
+    container = FakeContainer("oneshot", wait_result={"StatusCode": 1})
+    client = FakeClient(FakeContainers(started=container))
+    monkeypatch.setattr(test_runner, "CONTAINER_POOL_SIZE", 0)
+    monkeypatch.setattr(test_runner, "get_docker_client", lambda: client)
+
+    assert test_runner._run_command(Path("/repo"), "pytest", "python:3.11-slim", True, timeout=1) == (1, "partial output", None)
+    assert container.removed and not container.killed
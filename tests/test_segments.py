@@ -0,0 +1,135 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.storage import file_store
+from app.storage.file_store import save_trace, load_trace, append_events, compact_trace, read_events
+from app.models import Trace, RepoInfo, ReasoningStepEvent, ReasoningStepEventData
+
+
+@pytest.fixture
+def base_trace():
+    return Trace(
+        trace_id="test-segment-001",
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="test-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0),
+        events=[]
+    )
+
+
+def _step(minute: int, content: str) -> ReasoningStepEvent:
+    return ReasoningStepEvent(
+        timestamp=datetime(2025, 11, 27, 10, minute, 0),
+        data=ReasoningStepEventData(content=content)
+    )
+
+
+def test_append_does_not_rewrite_base_file(base_trace):
+    save_trace(base_trace)
+    base_path = file_store.DATA_DIR / "test-segment-001.json"
+    before = base_path.read_bytes()
+
+    append_events("test-segment-001", [_step(1, "First")])
+    append_events("test-segment-001", [_step(2, "Second")])
+
+    assert base_path.read_bytes() == before
+    segment = (file_store.DATA_DIR / "test-segment-001.events.jsonl").read_text().splitlines()
+    assert len(segment) == 2
+
+
+def test_load_merges_segments_in_timestamp_order(base_trace):
+    base_trace.events = [_step(2, "Base")]
+    save_trace(base_trace)
+
+    append_events("test-segment-001", [_step(3, "Later")])
+    append_events("test-segment-001", [_step(1, "Earlier")])
+
+    contents = [event.data.content for event in load_trace("test-segment-001").events]
+    assert contents == ["Earlier", "Base", "Later"]
+
+
+def test_compaction_folds_segment_into_base(base_trace, monkeypatch):
+    save_trace(base_trace)
+    monkeypatch.setattr(file_store, "SEGMENT_COMPACT_BYTES", 1)
+
+    append_events("test-segment-001", [_step(1, "First")])
+
+    assert not (file_store.DATA_DIR / "test-segment-001.events.jsonl").exists()
+    assert len(load_trace("test-segment-001").events) == 1
+
+
+def test_compact_trace_without_segment_is_noop(base_trace):
+    save_trace(base_trace)
+    assert compact_trace("test-segment-001") == 0
+
+
+def test_save_trace_discards_stale_segment(base_trace):
+    save_trace(base_trace)
+    append_events("test-segment-001", [_step(1, "Stale")])
+
+    save_trace(base_trace)
+
+    assert load_trace("test-segment-001").events == []
+
+
+def test_torn_trailing_line_is_ignored(base_trace):
+    save_trace(base_trace)
+    append_events("test-segment-001", [_step(1, "Complete")])
+    with open(file_store.DATA_DIR / "test-segment-001.events.jsonl", "a") as f:
+        f.write('{"event_type": "reasoning_st')
+
+    events = load_trace("test-segment-001").events
+    assert len(events) == 1
+    assert events[0].data.content == "Complete"
+
+
+def test_append_after_torn_line_keeps_segment_readable(base_trace):
+    save_trace(base_trace)
+    append_events("test-segment-001", [_step(1, "Complete")])
+    with open(file_store.DATA_DIR / "test-segment-001.events.jsonl", "a") as f:
+        f.write('{"event_type": "reasoning_st')
+
+    append_events("test-segment-001", [_step(2, "After the crash")])
+
+    contents = [event.data.content for event in load_trace("test-segment-001").events]
+    assert contents == ["Complete", "After the crash"]
+    assert [event.data.content for event in read_events("test-segment-001")["events"]] == contents
+
+
+def test_append_to_missing_trace_raises():
+    with pytest.raises(FileNotFoundError):
+        append_events("test-segment-missing", [_step(1, "Nope")])
+
+
+def test_rewrite_mode_still_supported(base_trace, monkeypatch):
+    save_trace(base_trace)
+    monkeypatch.setattr(file_store, "APPEND_MODE", "rewrite")
+
+    append_events("test-segment-001", [_step(1, "Inline")])
+
+    assert not (file_store.DATA_DIR / "test-segment-001.events.jsonl").exists()
+    assert len(load_trace("test-segment-001").events) == 1
+
+
+@pytest.mark.parametrize("mode", ["segment", "rewrite"])
+def test_aware_append_to_naive_trace_stays_readable(base_trace, monkeypatch, mode):
+    monkeypatch.setattr(file_store, "APPEND_MODE", mode)
+    base_trace.events = [_step(2, "Base")]
+    save_trace(base_trace)
+
+    # 10:03 in UTC+2 is 08:03 UTC, before the naive (UTC) base event
+    aware = _step(3, "Aware")
+    aware.timestamp = aware.timestamp.replace(tzinfo=timezone(timedelta(hours=2)))
+    append_events("test-segment-001", [aware, _step(4, "Naive")])
+
+    events = load_trace("test-segment-001").events
+    assert [event.data.content for event in events] == ["Aware", "Base", "Naive"]
+    assert events[0].timestamp == datetime(2025, 11, 27, 8, 3, tzinfo=timezone.utc)
+    page = read_events("test-segment-001")
+    assert [event.data.content for event in page["events"]] == ["Aware", "Base", "Naive"]
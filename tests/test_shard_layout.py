@@ -0,0 +1,103 @@
+import shutil
+from datetime import datetime
+from app.storage import file_store
+from app.storage.layout_migrator import migrate_layout, LayoutMigrator
+from app.models import Trace, RepoInfo, ReasoningStepEvent, ReasoningStepEventData
+
+
+def _trace(n: int) -> Trace:
+    return Trace(
+        trace_id=f"test-shard-{n:03d}",
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="test-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0)
+    )
+
+
+def _step(minute: int, content: str) -> ReasoningStepEvent:
+    return ReasoningStepEvent(
+        timestamp=datetime(2025, 11, 27, 10, minute, 0),
+        data=ReasoningStepEventData(content=content)
+    )
+
+
+def test_sharded_layout_uses_hash_prefix_dirs(isolated_data, monkeypatch):
+    monkeypatch.setattr(file_store, "SHARD_DEPTH", 2)
+    file_store.save_trace(_trace(1))
+
+    files = list(isolated_data.glob("*/*/test-shard-001.json"))
+    assert len(files) == 1
+    assert all(len(part) == 2 for part in files[0].relative_to(isolated_data).parts[:2])
+    assert not (isolated_data / "test-shard-001.json").exists()
+
+
+def test_reads_find_legacy_traces_after_enabling_shards(monkeypatch):
+    file_store.save_trace(_trace(1))
+    file_store.append_events("test-shard-001", [_step(1, "Before")])
+    monkeypatch.setattr(file_store, "SHARD_DEPTH", 2)
+
+    assert file_store.trace_exists("test-shard-001")
+    file_store.append_events("test-shard-001", [_step(2, "After")])
+    contents = [e.data.content for e in file_store.load_trace("test-shard-001").events]
+    assert contents == ["Before", "After"]
+
+
+def test_migration_moves_documents_and_segments(isolated_data, monkeypatch):
+    for n in range(5):
+        file_store.save_trace(_trace(n))
+    file_store.append_events("test-shard-000", [_step(1, "Pending")])
+    monkeypatch.setattr(file_store, "SHARD_DEPTH", 2)
+
+    result = migrate_layout(max_files_per_sec=0, max_bytes_per_sec=0)
+
+    assert result["migrated"] == 5
+    assert not list(isolated_data.glob("test-shard-*"))
+    assert len(list(isolated_data.glob("*/*/test-shard-*.json"))) == 5
+    assert file_store.load_trace("test-shard-000").events[0].data.content == "Pending"
+
+
+def test_migration_merges_segment_written_mid_migration(isolated_data, monkeypatch):
+    file_store.save_trace(_trace(1))
+    file_store.append_events("test-shard-001", [_step(1, "Legacy")])
+    monkeypatch.setattr(file_store, "SHARD_DEPTH", 2)
+
+    target_dir = file_store._shard_dir("test-shard-001")
+    target_dir.mkdir(parents=True)
+    shutil.move(str(isolated_data / "test-shard-001.json"), str(target_dir / "test-shard-001.json"))
+    file_store.append_events("test-shard-001", [_step(2, "Sharded")])
+
+    file_store.migrate_trace_layout("test-shard-001")
+
+    assert not (isolated_data / "test-shard-001.events.jsonl").exists()
+    contents = [e.data.content for e in file_store.load_trace("test-shard-001").events]
+    assert contents == ["Legacy", "Sharded"]
+
+
+def test_migration_is_resumable(isolated_data, monkeypatch):
+    for n in range(4):
+        file_store.save_trace(_trace(n))
+    monkeypatch.setattr(file_store, "SHARD_DEPTH", 1)
+
+    assert migrate_layout(max_files_per_sec=0, max_bytes_per_sec=0, limit=3)["migrated"] == 3
+    assert migrate_layout(max_files_per_sec=0, max_bytes_per_sec=0)["migrated"] == 1
+    assert sorted(file_store.iter_trace_ids()) == [f"test-shard-{n:03d}" for n in range(4)]
+
+
+def test_background_migrator_drains_legacy_dir(isolated_data, monkeypatch):
+    for n in range(3):
+        file_store.save_trace(_trace(n))
+    monkeypatch.setattr(file_store, "SHARD_DEPTH", 2)
+
+    migrator = LayoutMigrator(interval=0.01, max_files_per_sec=0, max_bytes_per_sec=0)
+    migrator.start()
+    migrator.join(timeout=5)
+
+    assert not migrator.is_alive()
+    assert list(file_store.iter_unmigrated_trace_ids()) == []
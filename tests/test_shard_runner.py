@@ -0,0 +1,105 @@
+import pytest
+from app.qa import sharding, test_runner
+from app.qa.sharding import merge_results, parse_collected, parse_durations, run_sharded, split_shards
+
+
+@pytest.fixture(autouse=True)
+def isolated_durations(monkeypatch):
+    monkeypatch.setattr(sharding, "SHARD_MIN_TESTS", 2)
+
+
+NODE_IDS = [f"tests/test_mod.py::test_{n}" for n in range(6)]
+
+
+class FakeSandbox:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.commands = []
+
+    def __call__(self, command):
+        self.commands.append(command)
+        if "--collect-only" in command:
+            return 0, "\n".join(NODE_IDS) + "\n\n6 tests collected in 0.01s\n", None
+        node_ids = [n for n in NODE_IDS if f" {n}" in command]
+        lines = [f"{0.5 if n.endswith('_0') else 0.1:.2f}s call     {n}" for n in node_ids]
+        failed = [n for n in node_ids if n in self.failing]
+        lines += [f"FAILED {n} - assert 1 == 2" for n in failed]
+        return (1 if failed else 0), "\n".join(lines), None
+
+
+def test_split_balances_by_duration():
+    durations = {"a": 5.0, "b": 3.0, "c": 2.0, "d": 1.0, "e": 1.0}
+
+    shards = split_shards(list(durations), 2, durations)
+
+    loads = sorted(sum(durations[n] for n in shard) for shard in shards)
+    assert loads == [6.0, 6.0]
+    assert sorted(n for shard in shards for n in shard) == sorted(durations)
+
+
+def test_split_assumes_median_for_unknown_tests():
+    durations = {"slow": 4.0, "fast": 1.0, "other": 1.0}
+    shards = split_shards(["slow", "new1", "new2"], 2, durations)
+    assert ["slow"] in shards
+
+
+def test_shard_count_adapts_to_budget_and_suite_size(monkeypatch):
+    monkeypatch.setattr(sharding, "SHARD_MIN_TESTS", 10)
+    assert sharding.shard_count(1000, cpu_budget=4) == 4
+    assert sharding.shard_count(25, cpu_budget=4) == 2
+    assert sharding.shard_count(5, cpu_budget=4) == 1
+
+
+def test_parsers():
+    assert parse_collected("tests/a.py::test_x\ntests/a.py::test_y[1]\n\n2 tests collected\n") == [
+        "tests/a.py::test_x", "tests/a.py::test_y[1]"
+    ]
+    output = "0.20s call     tests/a.py::test_x\n0.05s setup    tests/a.py::test_x\n"
+    assert parse_durations(output) == {"tests/a.py::test_x": pytest.approx(0.25)}
+
+
+def test_run_sharded_merges_results_and_records_durations(monkeypatch):
+    monkeypatch.setattr(sharding, "SHARD_CPU_BUDGET", 3)
+    sandbox = FakeSandbox(failing={"tests/test_mod.py::test_3"})
+
+    result = run_sharded("repo", "pytest", sandbox)
+
+    assert result["test_shards"] == 3
+    assert result["exit_code"] == 1
+    assert result["test_failures"] == ["tests/test_mod.py::test_3"]
+    assert "=== shard 3/3" in result["output"]
+    shard_commands = [c for c in sandbox.commands if "--collect-only" not in c]
+    assert len(shard_commands) == 3
+    assert all(sum(f" {n}" in c for c in shard_commands) == 1 for n in NODE_IDS)
+
+    durations = sharding.load_durations("repo")
+    assert durations["tests/test_mod.py::test_0"] == 0.5
+
+    # With history, the slow test gets a shard of its own
+    sandbox = FakeSandbox()
+    result = run_sharded("repo", "pytest", sandbox)
+    assert result["exit_code"] == 0
+    assert any(c.endswith(" tests/test_mod.py::test_0") and c.count("::") == 1 for c in sandbox.commands)
+
+
+def test_run_sharded_falls_back_when_collection_fails():
+    assert run_sharded("repo", "pytest", lambda command: (4, "usage error", None)) is None
+
+
+def test_merge_prefers_crashes_over_failures():
+    assert merge_results([(0, ""), (1, ""), (-1, "")])[0] == -1
+    assert merge_results([(0, ""), (0, "")])[0] == 0
+
+
+def test_execute_tests_uses_shards(tmp_path, monkeypatch):
+    sandbox = FakeSandbox(failing={"tests/test_mod.py::test_1"})
+    monkeypatch.setattr(test_runner, "TEST_SHARDING_ENABLED", True)
+    monkeypatch.setattr(sharding, "SHARD_CPU_BUDGET", 2)
+    monkeypatch.setattr(test_runner, "select_sandbox", lambda repo, command: ("deps:1", command, False))
+    monkeypatch.setattr(test_runner, "_run_command", lambda path, command, image, network, timeout=None, usage=None: sandbox(command))
+
+    result = test_runner._execute_tests("repo", tmp_path, "pytest")
+
+    assert result["tests_passed"] is False
+    assert result["test_shards"] == 2
+    assert result["test_failures"] == ["tests/test_mod.py::test_1"]
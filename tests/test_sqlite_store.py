@@ -0,0 +1,116 @@
+import sqlite3
+import pytest
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from app.storage import sqlite_store
+from app.models import Trace, RepoInfo, QAResults, ReasoningStepEvent, ReasoningStepEventData
+
+
+@pytest.fixture
+def sample_trace():
+    return Trace(
+        trace_id="test-sqlite-001",
+        developer_id="dev-test",
+        bug_id="BUG-1",
+        repo=RepoInfo(
+            name="test-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0)
+    )
+
+
+def _step(minute: int, content: str) -> ReasoningStepEvent:
+    return ReasoningStepEvent(
+        timestamp=datetime(2025, 11, 27, 10, minute, 0),
+        data=ReasoningStepEventData(content=content)
+    )
+
+
+def test_database_uses_wal(sample_trace):
+    sqlite_store.save_trace(sample_trace)
+    mode = sqlite3.connect(sqlite_store.DB_PATH).execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_roundtrip_preserves_saved_event_order(sample_trace):
+    sample_trace.events = [_step(2, "B"), _step(1, "A")]
+    sqlite_store.save_trace(sample_trace)
+
+    loaded = sqlite_store.load_trace("test-sqlite-001")
+    assert [e.data.content for e in loaded.events] == ["B", "A"]
+    assert loaded.bug_id == "BUG-1"
+
+
+def test_header_columns_are_indexed(sample_trace):
+    sample_trace.qa_results = QAResults(tests_passed=True, reasoning_score=4.0)
+    sqlite_store.save_trace(sample_trace)
+
+    row = sqlite3.connect(sqlite_store.DB_PATH).execute(
+        "SELECT developer_id, bug_id, repo_name, tests_passed, reasoning_score FROM traces"
+    ).fetchone()
+    assert row == ("dev-test", "BUG-1", "test-repo", 1, 4.0)
+
+    indexes = {r[1] for r in sqlite3.connect(sqlite_store.DB_PATH).execute("PRAGMA index_list(traces)")}
+    assert {"idx_traces_developer", "idx_traces_bug", "idx_traces_repo",
+            "idx_traces_start", "idx_traces_tests_passed", "idx_traces_score"} <= indexes
+
+
+def test_appended_events_are_rows_sorted_on_read(sample_trace):
+    sample_trace.events = [_step(2, "Base")]
+    sqlite_store.save_trace(sample_trace)
+
+    sqlite_store.append_events("test-sqlite-001", [_step(3, "Later"), _step(1, "Earlier")])
+
+    count = sqlite3.connect(sqlite_store.DB_PATH).execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    assert count == 3
+    loaded = sqlite_store.load_trace("test-sqlite-001")
+    assert [e.data.content for e in loaded.events] == ["Earlier", "Base", "Later"]
+
+
+def test_aware_append_to_naive_trace_sorts_by_instant(sample_trace):
+    sample_trace.events = [_step(2, "Base")]
+    sqlite_store.save_trace(sample_trace)
+
+    # 10:03 in UTC+2 is 08:03 UTC, before the naive (UTC) base event
+    aware = _step(3, "Aware")
+    aware.timestamp = aware.timestamp.replace(tzinfo=timezone(timedelta(hours=2)))
+    sqlite_store.append_events("test-sqlite-001", [aware, _step(4, "Naive")])
+
+    loaded = sqlite_store.load_trace("test-sqlite-001")
+    assert [e.data.content for e in loaded.events] == ["Aware", "Base", "Naive"]
+    page = sqlite_store.read_events("test-sqlite-001")
+    assert [e.data.content for e in page["events"]] == ["Aware", "Base", "Naive"]
+
+
+def test_save_replaces_events(sample_trace):
+    sample_trace.events = [_step(1, "Old")]
+    sqlite_store.save_trace(sample_trace)
+    sample_trace.events = []
+    sqlite_store.save_trace(sample_trace)
+
+    assert sqlite_store.load_trace("test-sqlite-001").events == []
+
+
+def test_missing_trace(sample_trace):
+    assert not sqlite_store.trace_exists("test-sqlite-missing")
+    with pytest.raises(FileNotFoundError):
+        sqlite_store.load_trace("test-sqlite-missing")
+    with pytest.raises(FileNotFoundError):
+        sqlite_store.append_events("test-sqlite-missing", [_step(1, "Nope")])
+
+
+def test_concurrent_appends_are_not_lost(sample_trace):
+    sqlite_store.save_trace(sample_trace)
+
+    def append(i):
+        sqlite_store.append_events("test-sqlite-001", [_step(i % 60, f"step-{i}")])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(append, range(64)))
+
+    assert len(sqlite_store.load_trace("test-sqlite-001").events) == 64
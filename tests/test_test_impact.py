@@ -0,0 +1,160 @@
+import pytest
+from datetime import datetime
+from app.qa import pipeline, test_impact
+from app.qa.pipeline import run_qa_pipeline
+from app.qa.test_impact import affected_tests, build_import_graph, impacted_command, load_import_graph
+from app.models import Trace, RepoInfo, CodeEditEvent
+from app.models.events import CodeEditEventData
+from app.storage import save_trace
+
+
+def _write(root, files):
+    for path, source in files.items():
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(source)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    _write(root, {
+        "src/calc/__init__.py": "",
+        "src/calc/core.py": "def add(a, b):\n    return a + b\n",
+        "src/calc/ops.py": "from .core import add\n",
+        "src/calc/report.py": "import json\n",
+        "tests/conftest.py": "",
+        "tests/test_ops.py": "from calc.ops import add\n",
+        "tests/test_report.py": "from calc import report\n",
+        "tests/unit/conftest.py": "from calc.core import add\n",
+        "tests/unit/test_misc.py": "",
+    })
+    return root
+
+
+def test_build_import_graph_resolves_src_layout_and_relative_imports(repo):
+    graph = build_import_graph(repo)
+
+    assert graph["src/calc/ops.py"] == ["src/calc/__init__.py", "src/calc/core.py"]
+    assert graph["tests/test_report.py"] == ["src/calc/__init__.py", "src/calc/report.py"]
+    assert graph["src/calc/report.py"] == []
+
+
+def test_affected_tests_follows_transitive_imports_and_conftest(repo):
+    graph = build_import_graph(repo)
+
+    assert affected_tests(graph, ["/home/dev/work/repo/src/calc/report.py"]) == ["tests/test_report.py"]
+    # core is imported by ops (-> test_ops) and by a conftest, which applies
+    # to every test below it
+    assert affected_tests(graph, ["src/calc/core.py"]) == ["tests/test_ops.py", "tests/unit/test_misc.py"]
+    assert affected_tests(graph, ["tests/conftest.py"]) == [
+        "tests/test_ops.py", "tests/test_report.py", "tests/unit/test_misc.py",
+    ]
+
+
+def test_affected_tests_is_undetermined_for_files_outside_the_graph(repo):
+    graph = build_import_graph(repo)
+
+    assert affected_tests(graph, ["src/calc/core.py", "setup.cfg"]) is None
+
+
+def test_import_graph_is_cached_per_revision(repo, tmp_path, monkeypatch):
+    monkeypatch.setattr(test_impact, "IMPORT_GRAPH_DIR", tmp_path / "graphs")
+    monkeypatch.setattr(test_impact, "_graphs", {})
+
+    graph = load_import_graph(repo, "rev1")
+    assert (tmp_path / "graphs" / "rev1.json").exists()
+
+    monkeypatch.setattr(test_impact, "_graphs", {})
+    monkeypatch.setattr(test_impact, "build_import_graph", lambda path: pytest.fail("graph rebuilt"))
+    assert load_import_graph(repo, "rev1") == graph
+
+
+def test_impacted_command_narrows_plain_pytest_only():
+    assert impacted_command("pytest", ["tests/test_a.py"]) == "pytest tests/test_a.py"
+    assert impacted_command("python -m pytest", ["tests/test a.py"]) == "python -m pytest 'tests/test a.py'"
+    assert impacted_command("pytest -q --tb=short", ["tests/test_a.py"]) == "pytest -q --tb=short tests/test_a.py"
+    assert impacted_command("make test", ["tests/test_a.py"]) is None
+
+
+def test_impacted_command_keeps_the_requested_scope():
+    # Narrowing these would run tests outside the selection or drop options
+    # that decide the verdict, so the full command alone decides
+    assert impacted_command("pytest tests/test_x.py::test_a -k foo", ["tests/test_x.py"]) is None
+    assert impacted_command("pytest tests", ["tests/test_a.py"]) is None
+    assert impacted_command("pytest -m 'not slow'", ["tests/test_a.py"]) is None
+    assert impacted_command("pytest -x", ["tests/test_a.py"]) is None
+
+
+@pytest.fixture
+def impact_pipeline(repo, monkeypatch):
+    monkeypatch.setattr(test_impact, "_graphs", {})
+    monkeypatch.setattr(pipeline, "TEST_IMPACT_ENABLED", True)
+    monkeypatch.chdir(repo.parent)
+    (repo.parent / "repo").rename(repo.parent / "sample_repo")
+
+    commands = []
+
+    def fake_tests(repo_path, test_command):
+        commands.append(test_command)
+        return {"tests_passed": True, "test_exit_code": 0, "test_output_snippet": "1 passed", "test_status": "passed"}
+
+    monkeypatch.setattr(pipeline, "run_tests_in_docker", fake_tests)
+    monkeypatch.setattr(pipeline, "evaluate_reasoning", lambda steps, use_cache=True: {"reasoning_score": 4.0, "reasoning_feedback": "ok"})
+    return commands
+
+
+def _trace_with_edits(*paths):
+    trace = Trace(
+        trace_id="test-impact-001",
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="sample-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0),
+        events=[
+            CodeEditEvent(timestamp=datetime(2025, 11, 27, 10, 1, 0), data=CodeEditEventData(file_path=path, diff="+x"))
+            for path in paths
+        ]
+    )
+    save_trace(trace)
+    return trace
+
+
+def test_pipeline_runs_impacted_tests_before_full_suite(impact_pipeline):
+    _trace_with_edits("src/calc/report.py")
+
+    qa = run_qa_pipeline("test-impact-001")
+
+    assert impact_pipeline == ["pytest tests/test_report.py", "pytest"]
+    assert qa.impacted_test_files == ["tests/test_report.py"]
+    assert qa.impacted_tests_passed is True
+    assert qa.test_scope == "full"
+    assert "impacted_tests" in qa.stage_timings_ms
+
+
+def test_pipeline_can_use_impacted_verdict_as_final(impact_pipeline, monkeypatch):
+    monkeypatch.setattr(pipeline, "TEST_IMPACT_FULL_RUN", False)
+    _trace_with_edits("src/calc/report.py")
+
+    qa = run_qa_pipeline("test-impact-001")
+
+    assert impact_pipeline == ["pytest tests/test_report.py"]
+    assert qa.test_scope == "impacted"
+    assert qa.tests_passed is True
+
+
+def test_pipeline_runs_full_suite_when_impact_is_undetermined(impact_pipeline, monkeypatch):
+    monkeypatch.setattr(pipeline, "TEST_IMPACT_FULL_RUN", False)
+    _trace_with_edits("src/calc/report.py", "README.md")
+
+    qa = run_qa_pipeline("test-impact-001")
+
+    assert impact_pipeline == ["pytest"]
+    assert qa.impacted_test_files == []
+    assert qa.test_scope == "full"
@@ -0,0 +1,110 @@
+import os
+import json
+import pytest
+from fastapi.testclient import TestClient
+from datetime import datetime
+from main import app
+from app.storage import file_store
+from app.storage.cache import TraceCache, trace_cache
+from app.models import Trace, RepoInfo, ReasoningStepEvent, ReasoningStepEventData
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def cleanup():
+    trace_cache.clear()
+    yield
+
+
+@pytest.fixture
+def sample_trace():
+    return Trace(
+        trace_id="test-cache-001",
+        developer_id="dev-test",
+        repo=RepoInfo(
+            name="test-repo",
+            url="https://github.com/test/repo",
+            branch="main",
+            commit_before="abc",
+            commit_after="def",
+            test_command="pytest"
+        ),
+        start_time=datetime(2025, 11, 27, 10, 0, 0)
+    )
+
+
+def _step(minute: int, content: str) -> ReasoningStepEvent:
+    return ReasoningStepEvent(
+        timestamp=datetime(2025, 11, 27, 10, minute, 0),
+        data=ReasoningStepEventData(content=content)
+    )
+
+
+def test_repeated_loads_hit_cache(sample_trace):
+    file_store.save_trace(sample_trace)
+    before = trace_cache.stats()
+
+    file_store.load_trace("test-cache-001")
+    file_store.load_trace("test-cache-001")
+
+    after = trace_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_append_invalidates_cached_trace(sample_trace):
+    file_store.save_trace(sample_trace)
+    file_store.load_trace("test-cache-001")
+
+    file_store.append_events("test-cache-001", [_step(1, "New")])
+
+    assert len(file_store.load_trace("test-cache-001").events) == 1
+
+
+def test_out_of_band_write_is_detected(sample_trace):
+    file_store.save_trace(sample_trace)
+    file_store.load_trace("test-cache-001")
+
+    path = file_store.DATA_DIR / "test-cache-001.json"
+    data = json.loads(path.read_text())
+    data["developer_id"] = "dev-edited-elsewhere"
+    path.write_text(json.dumps(data))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert file_store.load_trace("test-cache-001").developer_id == "dev-edited-elsewhere"
+
+
+def test_cached_copies_are_isolated_from_callers(sample_trace):
+    file_store.save_trace(sample_trace)
+
+    first = file_store.load_trace("test-cache-001")
+    first.events.append(_step(1, "Local only"))
+    first.developer_id = "mutated"
+
+    second = file_store.load_trace("test-cache-001")
+    assert second.events == []
+    assert second.developer_id == "dev-test"
+
+
+def test_lru_evicts_by_size(sample_trace):
+    cache = TraceCache(max_bytes=100)
+    cache.put("a", True, 1, sample_trace, 60)
+    cache.put("b", True, 1, sample_trace, 60)
+
+    assert cache.get("a", True, 1) is None
+    assert cache.get("b", True, 1) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_oversized_entries_are_not_cached(sample_trace):
+    cache = TraceCache(max_bytes=10)
+    cache.put("a", True, 1, sample_trace, 11)
+    assert cache.stats()["entries"] == 0
+
+
+def test_metrics_endpoint_exposes_cache_counters():
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert {"hits", "misses", "evictions"} <= set(response.json()["trace_cache"])